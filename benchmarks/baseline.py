@@ -0,0 +1,88 @@
+"""
+Shared reporting for the benchmark suite: latency summaries, peak RSS, and saving/comparing
+JSON baselines so regressions show up between runs.
+"""
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(round(p / 100.0 * (len(samples) - 1))))]
+
+
+def summarize(latencies, elapsed=None):
+    """Returns count, throughput (per second of `elapsed`, default the summed latency) and percentiles in ms."""
+    elapsed = sum(latencies) if elapsed is None else elapsed
+    return {
+        "n": len(latencies),
+        "throughput_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def print_table(results):
+    print(f"{'benchmark':<34} {'n':>6} {'ops/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, r in results.items():
+        print(f"{name:<34} {r['n']:>6} {r['throughput_per_s']:>10.1f} {r['p50_ms']:>9.3f} "
+              f"{r['p95_ms']:>9.3f} {r['p99_ms']:>9.3f}")
+
+
+def save(path, results, config=None, rss_mb=None):
+    """Writes the results, peak RSS (default: this process) and run configuration to `path` as JSON."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    payload = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "config": config or {},
+        "peak_rss_mb": peak_rss_mb() if rss_mb is None else rss_mb,
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    print(f"INFO: Baseline saved to {path}")
+
+
+def compare(path, results, tolerance=0.25, config=None, rss_mb=None):
+    """
+    Compares `results` against the baseline at `path`. A benchmark regresses when its p50 or
+    p95 grows, or its throughput drops, by more than `tolerance`. Returns the regressed names.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {path} (created {baseline['created']}, tolerance {tolerance:.0%}):")
+    if config is not None and config != baseline.get("config"):
+        print(f"  NOTE: run configuration differs from the baseline's {baseline.get('config')}")
+    regressions = []
+    for name, r in results.items():
+        old = baseline["results"].get(name)
+        if old is None:
+            print(f"  {name:<34} new")
+            continue
+        p50 = r["p50_ms"] / old["p50_ms"] - 1 if old["p50_ms"] else 0.0
+        p95 = r["p95_ms"] / old["p95_ms"] - 1 if old["p95_ms"] else 0.0
+        ops = r["throughput_per_s"] / old["throughput_per_s"] - 1 if old["throughput_per_s"] else 0.0
+        worse = p50 > tolerance or p95 > tolerance or ops < -tolerance
+        if worse:
+            regressions.append(name)
+        detail = f"p50 {p50:+.0%}  p95 {p95:+.0%}  ops/s {ops:+.0%}"
+        print(f"  {name:<34} {'REGRESSED' if worse else 'ok':<10} {detail}")
+    old_rss = baseline.get("peak_rss_mb")
+    if old_rss:
+        rss_mb = peak_rss_mb() if rss_mb is None else rss_mb
+        print(f"  {'peak RSS':<34} {rss_mb:.0f} MB (baseline {old_rss:.0f} MB)")
+    return regressions
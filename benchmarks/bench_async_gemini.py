@@ -0,0 +1,58 @@
+"""
+Serial vs. concurrent Gemini generations against the local fake server.
+
+With every call delayed by DELAY seconds, a story and a tip generated back to back take
+about 2 x DELAY, while generate_story_and_tip should finish in about 1 x DELAY (the maximum
+of the calls, not their sum). Run from the repository root:
+
+    python -m benchmarks.bench_async_gemini --delay 0.5
+"""
+import argparse
+import os
+import sys
+import time
+
+from benchmarks.fake_gemini import FakeGeminiServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--delay", type=float, default=0.5, help="fake server latency per call (seconds)")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(delay=args.delay).start()
+    os.environ["GEMINI_BASE_URL"] = server.url
+    os.environ["GEMINI_API_KEY"] = "fake"
+    os.environ["MINDSPARK_DISABLE_WARMUP"] = "1"
+    os.environ["MINDSPARK_RESPONSE_CACHE_DB"] = ""
+    import chat_logic
+
+    # Connect once so the first measured round doesn't pay client setup
+    chat_logic.generate_story_and_tip("Sad", "Student")
+
+    serial, concurrent = [], []
+    for _ in range(args.rounds):
+        start = time.perf_counter()
+        chat_logic.generate_story("Sad")
+        chat_logic.generate_contextual_tip("Sad", "Student")
+        serial.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        chat_logic.generate_story_and_tip("Sad", "Student")
+        concurrent.append(time.perf_counter() - start)
+
+    serial_s, concurrent_s = min(serial), min(concurrent)
+    print(f"fake latency per call : {args.delay:.3f}s")
+    print(f"serial story + tip    : {serial_s:.3f}s")
+    print(f"concurrent story + tip: {concurrent_s:.3f}s")
+
+    # Concurrent total should track the slowest call, well below the serial sum
+    if concurrent_s > args.delay * 1.5:
+        print("FAIL: concurrent generations did not overlap")
+        sys.exit(1)
+    print("OK: concurrent latency ~ max of the calls")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Microbenchmarks for the chat_logic functions a chat turn depends on.
+
+Every Gemini call goes to the local fake server (benchmarks/fake_gemini.py) with a fixed
+latency, so runs are reproducible and offline. The emotion model is benchmarked only when it
+can be loaded. Results can be saved as a baseline and later runs compared against it:
+
+    python -m benchmarks.bench_chat_logic --save benchmarks/baselines/chat_logic.json
+    python -m benchmarks.bench_chat_logic --compare benchmarks/baselines/chat_logic.json
+
+Run from the repository root so the resource files are found.
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+
+from benchmarks import baseline
+from benchmarks.fake_gemini import FakeGeminiServer
+
+MESSAGES = [
+    "I'm so stressed about my exams next week",
+    "I feel so sad today",
+    "Today was amazing, we went to the beach",
+    "I'm so angry at my roommate right now",
+    "I'm scared of what the doctor will say",
+    "I went to the store and bought some milk",
+    "Honestly I'm fine, just a bit tired",
+    "Nothing I do seems to matter anymore",
+    "I want to end my life",
+    "Can you recommend a movie?",
+]
+
+MOODS = ["Stressed", "Sad", "Happy", "Angry", "Fear", "Neutral"]
+ROLES = ["Student", "Working Professional", "General Public"]
+
+
+def _bench(fn, arguments, iterations):
+    """Calls fn(*args) for each of `iterations` argument tuples; returns a summary."""
+    latencies = []
+    args_cycle = itertools.cycle(arguments) if isinstance(arguments, list) else arguments
+    start = time.perf_counter()
+    for _ in range(iterations):
+        args = next(args_cycle)
+        t = time.perf_counter()
+        fn(*args)
+        latencies.append(time.perf_counter() - t)
+    return baseline.summarize(latencies, time.perf_counter() - start)
+
+
+_SUFFIX = itertools.count()
+
+
+def _unique(texts):
+    # A fresh suffix per call (across benchmarks) defeats the mood cache, so the
+    # lexicon/model path is measured
+    for i in _SUFFIX:
+        yield (f"{texts[i % len(texts)]} {i}",)
+
+
+def _wait_for_pool(pool, keys, timeout=30.0):
+    pool.prefill(keys)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and any(pool.size(key) == 0 for key in keys):
+        time.sleep(0.05)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000, help="calls per local benchmark")
+    parser.add_argument("--gemini-calls", type=int, default=50, help="calls per Gemini-backed benchmark")
+    parser.add_argument("--delay", type=float, default=0.05, help="fake Gemini latency (seconds)")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(delay=args.delay).start()
+    os.environ.update({
+        "GEMINI_BASE_URL": server.url,
+        "GEMINI_API_KEY": "fake",
+        "MINDSPARK_DISABLE_WARMUP": "1",
+        "MINDSPARK_GEMINI_HEDGE": "0",
+        "MINDSPARK_RESPONSE_CACHE_DB": "",  # measure the Gemini calls, not cache hits
+    })
+    import chat_logic
+
+    model_ready = chat_logic.MODELS.get("emotion") is not None
+    n, g = args.iterations, args.gemini_calls
+    results = {}
+
+    def run(name, fn, arguments, iterations):
+        results[name] = _bench(fn, arguments, iterations)
+        print(f"  {name}: {results[name]['n']} calls", file=sys.stderr)
+
+    run("check_for_crisis", chat_logic.check_for_crisis, [(m,) for m in MESSAGES], n)
+    run("clean_text", chat_logic.clean_text, [(m,) for m in MESSAGES], n)
+
+    for message in MESSAGES:
+        chat_logic.detect_mood(message)
+    run("detect_mood[cached]", chat_logic.detect_mood, [(m,) for m in MESSAGES], n)
+    run("detect_mood[uncached]", chat_logic.detect_mood, _unique(MESSAGES), n)
+    if model_ready:
+        run("detect_mood_batch[model,1]", lambda t: chat_logic.detect_mood_batch([t], threshold=2.0),
+            _unique(MESSAGES), max(n // 50, 20))
+        run("detect_mood_batch[model,16]", lambda t: chat_logic.detect_mood_batch(
+            [f"{t} {i}" for i in range(16)], threshold=2.0), _unique(MESSAGES), max(n // 500, 10))
+    else:
+        print("NOTE: emotion model not available; skipping the model benchmarks.", file=sys.stderr)
+
+    run("ai_response", chat_logic.ai_response, [(f"chat: responded to {m}",) for m in MOODS], n)
+    run("get_exercise_suggestion", chat_logic.get_exercise_suggestion, [(m,) for m in MOODS], n)
+
+    # Live Gemini calls first (pools switched off), then the same answers from warm pools
+    pairs = [(m, r) for m in MOODS for r in ROLES]
+    tip_pool, story_pool = chat_logic.TIP_POOL, chat_logic.STORY_POOL
+    chat_logic.TIP_POOL = chat_logic.STORY_POOL = None
+    run("generate_contextual_tip", chat_logic.generate_contextual_tip, pairs, g)
+    run("generate_story", chat_logic.generate_story, [(m,) for m in MOODS], g)
+    run("generate_story_stream", lambda m: "".join(chat_logic.generate_story_stream(m)), [(m,) for m in MOODS], g)
+    run("generate_story_and_tip[async]", chat_logic.generate_story_and_tip, pairs, g)
+    run("get_media_and_tips[live]", chat_logic.get_media_and_tips, pairs, g)
+    chat_logic.TIP_POOL, chat_logic.STORY_POOL = tip_pool, story_pool
+    if tip_pool is not None:
+        _wait_for_pool(tip_pool, pairs)
+        _wait_for_pool(story_pool, MOODS)
+        run("get_media_and_tips[pooled]", chat_logic.get_media_and_tips, pairs, n)
+        run("serve_story[pooled]", chat_logic.serve_story, [(m,) for m in MOODS], n)
+
+    print()
+    baseline.print_table(results)
+    print(f"\npeak RSS: {baseline.peak_rss_mb():.0f} MB  (fake Gemini latency {args.delay * 1000:.0f} ms, "
+          f"emotion model {'loaded' if model_ready else 'not loaded'})")
+
+    config = {"iterations": n, "gemini_calls": g, "delay": args.delay, "model": model_ready}
+    if args.save:
+        baseline.save(args.save, results, config)
+    if args.compare and baseline.compare(args.compare, results, args.tolerance, config):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Content pools with the persistent response cache switched on, against the local fake Gemini server.
+
+Serves stories and tips from the pools with a fresh cache file and checks that refills keep
+producing new variants instead of replaying the first cached answer, and that the cache only
+answers a key once it holds MINDSPARK_RESPONSE_CACHE_VARIANTS responses. Run from the
+repository root:
+
+    python -m benchmarks.bench_content_pools
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.fake_gemini import FakeGeminiServer
+
+
+def _fill(pool, key, timeout):
+    """Schedules a refill of `key` and waits until it has finished (buffer full or given up)."""
+    pool.prefill([key])
+    deadline = time.monotonic() + timeout
+    # _scheduled holds the key until its refill job returns, however many attempts it took
+    while key in pool._scheduled and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return [pool.take(key) for _ in range(pool.capacity)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--timeout", type=float, default=30.0, help="give up on a refill after this many seconds")
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(delay=0.01).start()
+    workdir = tempfile.mkdtemp(prefix="mindspark-pools-")
+    os.environ.update({
+        "GEMINI_BASE_URL": server.url,
+        "GEMINI_API_KEY": "fake",
+        "MINDSPARK_DISABLE_WARMUP": "1",
+        "MINDSPARK_CONTENT_POOLS": "1",
+        "MINDSPARK_GEMINI_HEDGE": "0",
+        "MINDSPARK_RESPONSE_CACHE_DB": os.path.join(workdir, "response_cache.db"),
+    })
+    import chat_logic
+    from response_cache import cache_key
+    failures = []
+
+    def report(name, check, detail):
+        print(f"{name:<12} [{'ok' if check else 'FAIL'}: {detail}]")
+        if not check:
+            failures.append(name)
+
+    # 1. Story refills: the fake server answers each prompt with its canned replies in turn, so
+    #    a refill that really calls Gemini fills the buffer with distinct stories
+    before = server.requests
+    pool = chat_logic.STORY_POOL
+    stories = _fill(pool, "Sad", args.timeout)
+    fresh = {story for story in stories if story != chat_logic._get_mock_story("Sad")}
+    report("story-pool", len(fresh) == pool.capacity,
+           f"{len(fresh)}/{pool.capacity} distinct stories, produced={pool.stats['produced']} "
+           f"duplicates={pool.stats['duplicates']} upstream={server.requests - before}")
+
+    # 2. Tip refills, same rule
+    key = ("Sad", "Student")
+    pool = chat_logic.TIP_POOL
+    tips = _fill(pool, key, args.timeout)
+    fresh = {tip for tip in tips if tip != chat_logic._get_fixed_tip(key[1])}
+    report("tip-pool", len(fresh) == pool.capacity,
+           f"{len(fresh)}/{pool.capacity} distinct tips, produced={pool.stats['produced']} "
+           f"duplicates={pool.stats['duplicates']}")
+
+    # 3. The refills filled the cache; once a key holds every variant, calls are served from it.
+    #    (Counted on the cache: the takes above may have started refills that call upstream.)
+    cache = chat_logic.RESPONSE_CACHE
+    prompt, config, _ = chat_logic.story_request("Sad")
+    stored = len(cache.variants_for(cache_key(prompt, chat_logic.GEMINI_MODEL, config.temperature, config.system_instruction)))
+    hits = cache.stats["hits"]
+    chat_logic.generate_story("Sad")
+    served = cache.stats["hits"] - hits
+    report("cache-hit", stored >= cache.variants and served == 1,
+           f"{stored}/{cache.variants} variants cached, generate_story served from the cache: {bool(served)}")
+
+    if failures:
+        print(f"FAIL: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
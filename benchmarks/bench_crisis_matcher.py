@@ -0,0 +1,75 @@
+"""
+Crisis matcher latency vs. lexicon size.
+
+Compares the compiled CrisisMatcher with the old per-keyword substring scan on the same
+messages while the lexicon grows. Run from the repository root:
+
+    python -m benchmarks.bench_crisis_matcher
+"""
+import argparse
+import random
+import string
+import time
+
+from crisis_matcher import CrisisMatcher
+
+BASE_PHRASES = ["hurt myself", "end my life", "suicide", "want to die", "kill myself", "crisis"]
+
+MESSAGES = [
+    "I had a long day at work and I'm just really tired of everything",
+    "feeling sad today, nothing seems to go right",
+    "i'm stressed about my exams next week, can you help?",
+    "Honestly I'm happy, my friend surprised me with a cake!",
+    "I don't know anymore, sometimes I just want to die",
+    "Why does everyone keep ignoring me at school",
+    "My manager yelled at me again and I am so angry right now",
+    "I think I need a calming video or maybe a breathing exercise",
+]
+
+
+def _synthetic_phrases(count, seed=7):
+    rng = random.Random(seed)
+    phrases = set()
+    while len(phrases) < count:
+        words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(rng.randint(1, 4))]
+        phrases.add(" ".join(words))
+    return sorted(phrases)
+
+
+def _linear_scan(keywords, text):
+    clean_input = text.lower()
+    for keyword in keywords:
+        if keyword in clean_input:
+            return True
+    return False
+
+
+def _time_per_message(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for message in MESSAGES:
+            fn(message)
+    return (time.perf_counter() - start) / (repeat * len(MESSAGES)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="6,50,200,1000,5000", help="comma-separated lexicon sizes")
+    parser.add_argument("--repeat", type=int, default=500, help="passes over the message set per size")
+    args = parser.parse_args()
+
+    print(f"{'phrases':>8} {'compile ms':>11} {'matcher us/msg':>15} {'linear us/msg':>14}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        lexicon = BASE_PHRASES + _synthetic_phrases(max(0, size - len(BASE_PHRASES)))
+
+        start = time.perf_counter()
+        matcher = CrisisMatcher(lexicon)
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        matcher_us = _time_per_message(matcher.matches, args.repeat)
+        linear_us = _time_per_message(lambda text: _linear_scan(lexicon, text), args.repeat)
+        print(f"{len(lexicon):>8} {compile_ms:>11.1f} {matcher_us:>15.2f} {linear_us:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
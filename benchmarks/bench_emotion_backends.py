@@ -0,0 +1,167 @@
+"""
+Parity and speed of the emotion classifier backends (PyTorch pipeline vs. quantized ONNX).
+
+Each backend runs in its own subprocess so its resident memory can be measured in
+isolation. On a fixed corpus the script reports label agreement with the PyTorch path
+(raw labels and mapped chatbot moods), single-message and batched latency, and RSS.
+The result is recorded in the export directory (onnx_backend.VALIDATION_FILE); the app only
+serves the ONNX model once a run against the production model has passed. Export the ONNX
+model first (`python -m onnx_backend export`), then run from the
+repository root:
+
+    python -m benchmarks.bench_emotion_backends
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+CORPUS = [
+    "I'm so angry that they cancelled my shift again without telling me.",
+    "Why does nobody ever listen to what I say? It's infuriating.",
+    "He lied to me for months and I can't stop shaking with rage.",
+    "That comment in the meeting was completely disrespectful.",
+    "I'm terrified about the test results coming back tomorrow.",
+    "Every time the phone rings I panic that it's bad news.",
+    "I keep hearing noises downstairs and I can't sleep.",
+    "What if I fail and everyone sees it?",
+    "I miss my grandmother so much, the house feels empty.",
+    "Nothing I do seems to matter anymore.",
+    "I cried the whole way home from school today.",
+    "My best friend moved away and I feel alone.",
+    "We won the match and the whole team went out to celebrate!",
+    "I finally got the internship I applied for!",
+    "Spending the afternoon in the park with my dog was perfect.",
+    "My sister had her baby this morning and everyone is thrilled.",
+    "I went to the store and bought some bread and milk.",
+    "The meeting has been moved to three o'clock.",
+    "I'm reading a book about the history of trains.",
+    "It's cloudy today and the bus was on time.",
+    "Wait, they already finished the whole project?",
+    "I can't believe she showed up at my door after ten years!",
+    "Whoa, I did not expect the exam to be that short.",
+    "The smell in the cafeteria today was revolting.",
+    "People who litter in the park really disgust me.",
+    "The way he treats waiters is gross.",
+    "I have so much homework and no time to do any of it.",
+    "Work deadlines are piling up and my chest feels tight.",
+    "I don't know how I'm going to pay rent this month.",
+    "Honestly I'm fine, just a bit tired.",
+    "Can you recommend a song for a rainy evening?",
+    "I'm proud of how far I've come this year.",
+]
+
+
+def _rss_kb():
+    # Current resident set size from /proc (Linux); falls back to the peak
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _load(backend, model_name, model_dir, threads):
+    if backend == "onnx":
+        from onnx_backend import OnnxEmotionClassifier
+        return OnnxEmotionClassifier(model_dir, intra_op_threads=threads)
+    import torch
+    if threads:
+        torch.set_num_threads(threads)
+    from transformers import pipeline
+    return pipeline("text-classification", model=model_name)
+
+
+def _labels(results):
+    return [(r[0] if isinstance(r, list) else r)["label"] for r in results]
+
+
+def worker(backend, model_name, model_dir, threads, repeat, batch_size):
+    rss_before = _rss_kb()
+    start = time.perf_counter()
+    detector = _load(backend, model_name, model_dir, threads)
+    load_s = time.perf_counter() - start
+
+    labels = _labels(detector(CORPUS, batch_size=batch_size, padding=True, truncation=True))
+
+    single = []
+    for _ in range(repeat):
+        for text in CORPUS:
+            start = time.perf_counter()
+            detector(text)
+            single.append(time.perf_counter() - start)
+    single.sort()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for i in range(0, len(CORPUS), batch_size):
+            detector(CORPUS[i:i + batch_size], batch_size=batch_size, padding=True, truncation=True)
+    batched_s = time.perf_counter() - start
+
+    print(json.dumps({
+        "backend": backend,
+        "labels": labels,
+        "load_s": load_s,
+        "single_p50_ms": single[len(single) // 2] * 1000,
+        "single_p95_ms": single[int(len(single) * 0.95)] * 1000,
+        "batched_msgs_per_s": repeat * len(CORPUS) / batched_s,
+        "model_rss_mb": (_rss_kb() - rss_before) / 1024,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="j-hartmann/emotion-english-distilroberta-base", help="PyTorch reference model")
+    parser.add_argument("--model-dir", default=os.path.join("models", "emotion-onnx-int8"), help="ONNX export directory")
+    parser.add_argument("--threads", type=int, default=None, help="intra-op threads for both backends")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--worker", choices=["torch", "onnx"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.model, args.model_dir, args.threads, args.repeat, args.batch_size)
+        return
+
+    results = {}
+    for backend in ("torch", "onnx"):
+        command = [sys.executable, "-m", "benchmarks.bench_emotion_backends", "--worker", backend,
+                   "--model", args.model, "--model-dir", args.model_dir, "--repeat", str(args.repeat), "--batch-size", str(args.batch_size)]
+        if args.threads:
+            command += ["--threads", str(args.threads)]
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        results[backend] = json.loads(output.strip().splitlines()[-1])
+
+    os.environ.setdefault("MINDSPARK_DISABLE_WARMUP", "1")
+    os.environ.setdefault("MINDSPARK_CONTENT_POOLS", "0")
+    from chat_logic import HUGGINGFACE_TO_CHATBOT_MOOD
+
+    def mood(label):
+        return HUGGINGFACE_TO_CHATBOT_MOOD.get(label, ("Neutral", "😐"))[0]
+
+    reference, candidate = results["torch"]["labels"], results["onnx"]["labels"]
+    label_agreement = sum(a == b for a, b in zip(reference, candidate)) / len(CORPUS)
+    mood_agreement = sum(mood(a) == mood(b) for a, b in zip(reference, candidate)) / len(CORPUS)
+
+    print(f"{'backend':<8} {'load s':>7} {'p50 ms':>7} {'p95 ms':>7} {'batched msg/s':>14} {'model RSS MB':>13} {'peak RSS MB':>12}")
+    for backend, r in results.items():
+        print(f"{backend:<8} {r['load_s']:>7.2f} {r['single_p50_ms']:>7.2f} {r['single_p95_ms']:>7.2f} "
+              f"{r['batched_msgs_per_s']:>14.1f} {r['model_rss_mb']:>13.1f} {r['peak_rss_mb']:>12.1f}")
+    print(f"label agreement: {label_agreement:.1%}   mood agreement: {mood_agreement:.1%}   ({len(CORPUS)} texts)")
+    for text, a, b in zip(CORPUS, reference, candidate):
+        if a != b:
+            print(f"  differs: torch={a:<9} onnx={b:<9} {text}")
+
+    from onnx_backend import VALIDATION_FILE, validation_error, write_validation
+    write_validation(args.model_dir, args.model, label_agreement, mood_agreement, results)
+    problem = validation_error(args.model_dir)
+    print(f"\n{os.path.join(args.model_dir, VALIDATION_FILE)}: "
+          f"{'passed, MINDSPARK_EMOTION_BACKEND=onnx will use this export' if problem is None else problem}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Deadline, hedging and circuit-breaker behaviour against the local fake Gemini server.
+
+Runs generate_story through a series of injected conditions (healthy, slow tail, hung
+upstream, outage, recovery) and checks that each one is handled the way GeminiGuard
+promises. Run from the repository root:
+
+    python -m benchmarks.bench_gemini_guard
+"""
+import argparse
+import os
+import sys
+import time
+
+from benchmarks.fake_gemini import FakeGeminiServer
+
+
+def _percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(round(p / 100.0 * (len(samples) - 1))))]
+
+
+def _run(chat_logic, calls):
+    latencies, fallbacks = [], 0
+    for _ in range(calls):
+        start = time.perf_counter()
+        story = chat_logic.generate_story("Sad")
+        latencies.append(time.perf_counter() - start)
+        fallbacks += story == chat_logic._get_mock_story("Sad")
+    return latencies, fallbacks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deadline", type=float, default=1.0)
+    parser.add_argument("--calls", type=int, default=40)
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(delay=0.05).start()
+    os.environ.update({
+        "GEMINI_BASE_URL": server.url,
+        "GEMINI_API_KEY": "fake",
+        "MINDSPARK_DISABLE_WARMUP": "1",
+        "MINDSPARK_CONTENT_POOLS": "0",
+        "MINDSPARK_RESPONSE_CACHE_DB": "",
+        "MINDSPARK_GEMINI_DEADLINE": str(args.deadline),
+        "MINDSPARK_BREAKER_FAILURES": "5",
+        "MINDSPARK_BREAKER_RESET": "2",
+    })
+    import chat_logic
+    guard = chat_logic.GEMINI_GUARD
+    failures = []
+
+    def report(name, latencies, fallbacks, check, detail):
+        metrics = guard.metrics()
+        print(f"{name:<10} p50={_percentile(latencies, 50) * 1000:7.1f}ms p99={_percentile(latencies, 99) * 1000:7.1f}ms "
+              f"fallbacks={fallbacks:<3} breaker={metrics['breaker_state']:<9} "
+              f"hedges={metrics['hedges_sent']}/{metrics['hedge_wins']} timeouts={metrics['timeouts']} "
+              f"short_circuited={metrics['short_circuited']}  [{'ok' if check else 'FAIL'}: {detail}]")
+        if not check:
+            failures.append(name)
+
+    # 1. Healthy upstream: also calibrates the hedge delay from observed latencies
+    latencies, fallbacks = _run(chat_logic, args.calls)
+    report("healthy", latencies, fallbacks, fallbacks == 0, "no fallbacks")
+
+    # 2. Slow tail: 20% of calls take 0.8s; a hedged request after ~p95 should rescue most of them
+    server.slow_rate, server.slow_delay = 0.2, min(0.8, args.deadline * 0.8)
+    latencies, fallbacks = _run(chat_logic, args.calls)
+    report("slow-tail", latencies, fallbacks, guard.metrics()["hedge_wins"] > 0, "hedged requests win")
+    server.slow_rate = 0.0
+
+    # 3. Hung upstream: every call is abandoned at the deadline and served the mock story
+    server.delay = args.deadline * 3
+    latencies, fallbacks = _run(chat_logic, 3)
+    report("hung", latencies, fallbacks, max(latencies) < args.deadline * 1.5, "bounded by the deadline")
+    server.delay = 0.05
+
+    # 4. Outage: after 5 failures the breaker opens and calls skip the network entirely
+    guard.breaker.record_success()
+    server.error_rate = 1.0
+    latencies, fallbacks = _run(chat_logic, args.calls)
+    open_latency = _percentile(latencies[10:], 50)
+    report("outage", latencies, fallbacks, guard.breaker.state == "open" and open_latency < 0.005,
+           f"short-circuited p50 {open_latency * 1000:.2f}ms")
+
+    # 5. Recovery: once the reset timeout passes, one probe succeeds and the breaker closes
+    server.error_rate = 0.0
+    time.sleep(guard.breaker.reset_timeout + 0.1)
+    latencies, fallbacks = _run(chat_logic, 5)
+    report("recovery", latencies, fallbacks, guard.breaker.state == "closed", "breaker closed again")
+
+    if failures:
+        print(f"FAIL: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Mood journal (mood_journal.py) write and query costs on a large database.
+
+Bulk-loads --rows synthetic entries spread over --users users and --days days into a
+temporary database, then measures:
+
+  record       time a chat turn spends handing an entry to the journal
+  (commit)     end-to-end write throughput of the batching writer thread, printed below the table
+  history / distribution / daily_distribution / recent_text
+               query latency for one user's last 30 days
+
+    python -m benchmarks.bench_mood_journal --rows 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks import baseline
+from mood_journal import MoodJournal, _INSERT
+
+MOODS = [("Happy", "😊"), ("Sad", "😔"), ("Angry", "😠"), ("Stressed", "😩"), ("Fear", "😨"), ("Neutral", "😐")]
+WORDS = "exam deadline friend beach tired work family sleep music walk coffee rain".split()
+
+
+def _bulk_load(journal, rows, users, days, now):
+    rng = random.Random(1)
+    conn = journal._connect()
+    start = now - days * 86400
+    batch = []
+    for i in range(rows):
+        mood, emoji = rng.choice(MOODS)
+        user = f"user-{rng.randrange(users)}"
+        batch.append((start + rng.random() * days * 86400, user, f"{user}-s{i % 7}", "Student", mood, emoji,
+                      " ".join(rng.choices(WORDS, k=6))))
+        if len(batch) == 50000:
+            with conn:
+                conn.executemany(_INSERT, batch)
+            batch = []
+    if batch:
+        with conn:
+            conn.executemany(_INSERT, batch)
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def _time_calls(fn, repeat):
+    latencies = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000, help="entries preloaded into the journal")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--writes", type=int, default=10000, help="entries recorded through the writer thread (one burst)")
+    parser.add_argument("--repeat", type=int, default=200, help="calls per query benchmark")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="mindspark-journal-") as tmp:
+        journal = MoodJournal(os.path.join(tmp, "journal.db"), store_text=True)
+        now = time.time()
+        start = time.perf_counter()
+        _bulk_load(journal, args.rows, args.users, args.days, now)
+        print(f"INFO: Loaded {args.rows} entries in {time.perf_counter() - start:.1f}s")
+
+        results = {}
+        rng = random.Random(2)
+
+        # Writes: what a turn pays (record) vs. when the rows are actually on disk (commit)
+        start = time.perf_counter()
+        results["record"] = baseline.summarize(_time_calls(
+            lambda i: journal.record(f"bench-s{i % 50}", *rng.choice(MOODS), "benchmark entry", f"user-{i % args.users}"),
+            args.writes))
+        journal.flush(timeout=120)
+        elapsed = time.perf_counter() - start
+        commit_rate = journal.stats["written"] / elapsed
+
+        since = now - 30 * 86400
+        users = [f"user-{rng.randrange(args.users)}" for _ in range(args.repeat)]
+        results["history"] = baseline.summarize(_time_calls(
+            lambda i: journal.mood_history(user_id=users[i], since=since, limit=50), args.repeat))
+        results["distribution"] = baseline.summarize(_time_calls(
+            lambda i: journal.mood_distribution(user_id=users[i], since=since), args.repeat))
+        results["daily_distribution"] = baseline.summarize(_time_calls(
+            lambda i: journal.mood_distribution(user_id=users[i], since=since, bucket=86400), args.repeat))
+        results["recent_text"] = baseline.summarize(_time_calls(
+            lambda i: journal.recent_text(user_id=users[i], since=since, limit=200), args.repeat))
+        results["all_users_distribution_7d"] = baseline.summarize(_time_calls(
+            lambda i: journal.mood_distribution(since=now - 7 * 86400), max(1, args.repeat // 20)))
+
+        print()
+        baseline.print_table(results)
+        print(f"\nwriter committed {journal.stats['written']} entries at {commit_rate:.0f}/s in "
+              f"{journal.stats['batches']} batches ({journal.stats['dropped']} dropped), database {os.path.getsize(journal.path) / 1e6:.0f} MB")
+        journal.close()
+
+    config = {"rows": args.rows, "users": args.users, "days": args.days, "writes": args.writes}
+    if args.save:
+        baseline.save(args.save, results, config)
+    if args.compare and baseline.compare(args.compare, results, args.tolerance, config):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
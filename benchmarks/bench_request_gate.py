@@ -0,0 +1,127 @@
+"""
+Request coalescing and admission control (request_gate.py) against the local fake Gemini server.
+
+Runs bursts of concurrent tip/story requests through chat_logic and checks what the gate
+promises: identical prompts share one upstream call, a rate-limited burst is served up to
+its budget while the rest get their fallbacks at once, and interactive calls are admitted
+ahead of queued background refills. Run from the repository root:
+
+    python -m benchmarks.bench_request_gate
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+from benchmarks import baseline
+from benchmarks.fake_gemini import FakeGeminiServer
+
+
+def _burst(fn, args_list):
+    """Calls fn(*args) for every args at the same moment; returns per-call latencies and results."""
+    barrier = threading.Barrier(len(args_list))
+    latencies, results = [None] * len(args_list), [None] * len(args_list)
+
+    def run(i, args):
+        barrier.wait()
+        start = time.perf_counter()
+        results[i] = fn(*args)
+        latencies[i] = time.perf_counter() - start
+
+    threads = [threading.Thread(target=run, args=(i, args)) for i, args in enumerate(args_list)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50, help="concurrent callers per burst")
+    parser.add_argument("--delay", type=float, default=0.3, help="fake Gemini latency (seconds)")
+    parser.add_argument("--rate", type=float, default=5.0, help="gate rate limit (requests/s)")
+    parser.add_argument("--max-wait", type=float, default=1.0, help="gate max queue wait (seconds)")
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(delay=args.delay).start()
+    os.environ.update({
+        "GEMINI_BASE_URL": server.url,
+        "GEMINI_API_KEY": "fake",
+        "MINDSPARK_DISABLE_WARMUP": "1",
+        "MINDSPARK_CONTENT_POOLS": "0",
+        "MINDSPARK_RESPONSE_CACHE_DB": "",
+        "MINDSPARK_GEMINI_HEDGE": "0",
+        "MINDSPARK_GEMINI_RATE": str(args.rate),
+        "MINDSPARK_GEMINI_BURST": str(args.rate),
+        "MINDSPARK_GEMINI_MAX_WAIT": str(args.max_wait),
+    })
+    import chat_logic
+    from request_gate import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
+    gate = chat_logic.GEMINI_GATE
+    chat_logic.get_gemini_client()
+    failures = []
+
+    def report(name, latencies, upstream, check, detail):
+        m = gate.metrics()
+        print(f"{name:<11} p50={baseline.percentile(latencies, 50) * 1000:7.1f}ms "
+              f"p99={baseline.percentile(latencies, 99) * 1000:7.1f}ms upstream={upstream:<3} "
+              f"coalesced={m['coalesced']:<4} rejected={m['rejected'] + m['timed_out']:<3} "
+              f"max_queue={m['max_queue_depth']:<3} [{'ok' if check else 'FAIL'}: {detail}]")
+        if not check:
+            failures.append(name)
+
+    # 1. Same mood and role from every session at once: one upstream call serves them all
+    before = server.requests
+    latencies, tips = _burst(chat_logic.generate_contextual_tip, [("Stressed", "Student")] * args.sessions)
+    upstream = server.requests - before
+    report("coalesced", latencies, upstream, upstream == 1 and len(set(tips)) == 1,
+           f"{args.sessions} identical tips from 1 upstream call")
+    time.sleep(2)  # let the token bucket refill
+
+    # 2. Distinct prompts beyond the rate budget: the budget is served, the rest fall back fast
+    keys = [(mood, role) for mood in chat_logic.POOL_MOODS for role in chat_logic.POOL_ROLES]
+    before = server.requests
+    latencies, _ = _burst(chat_logic.generate_contextual_tip, keys)
+    upstream = server.requests - before
+    budget = args.rate + args.rate * args.max_wait + 1
+    fast = sum(1 for t in latencies if t < 0.05)
+    report("rate-limit", latencies, upstream, upstream <= budget and fast >= len(keys) - budget,
+           f"<= {budget:.0f} upstream calls, {fast} immediate fallbacks, p99 bounded by max wait + call")
+    time.sleep(2)
+
+    # 3. Priority: with every slot taken, a queued interactive call goes before earlier background ones
+    held = gate.max_concurrent
+    for _ in range(held):
+        gate.acquire()
+    order = []
+
+    def waiter(name, priority):
+        gate.acquire(priority, max_wait=5)
+        order.append(name)
+        gate.release()
+
+    threads = [threading.Thread(target=waiter, args=(f"background-{i}", PRIORITY_BACKGROUND)) for i in range(3)]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    threads.append(threading.Thread(target=waiter, args=("interactive", PRIORITY_INTERACTIVE)))
+    threads[-1].start()
+    time.sleep(0.1)
+    depth = gate.metrics()["queue_depth"]
+    for _ in range(held):
+        gate.release()
+    for t in threads:
+        t.join()
+    report("priority", [0.0], 0, order[0] == "interactive" and depth == 4,
+           f"queue depth {depth}, grant order {order}")
+
+    print(f"\ngate: {gate.metrics()}")
+    if failures:
+        print(f"FAILED: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Accuracy vs. model-call reduction of the detect_mood lexicon cascade.
+
+For each confidence threshold, texts whose lexicon confidence reaches the threshold are
+answered by the lexicon and the rest go to the transformer. The report shows how many model
+calls are saved, how accurate the lexicon is on the texts it keeps, and (when the emotion
+model can be loaded) the accuracy of the whole cascade. "Sad" and "Depressed" count as the
+same mood, as they do in the app. Run from the repository root:
+
+    python -m benchmarks.eval_cascade [--no-model]
+"""
+import argparse
+import os
+
+LABELED = [
+    ("I'm so stressed about my exams next week", "Stressed"),
+    ("Work is piling up and I feel completely overwhelmed", "Stressed"),
+    ("I have three deadlines tomorrow and no time to sleep", "Stressed"),
+    ("I'm burnt out, I can't cope with this workload", "Stressed"),
+    ("There's so much pressure on me at home lately", "Stressed"),
+    ("My boss keeps adding tasks and I'm swamped", "Stressed"),
+    ("I feel so sad today", "Sad"),
+    ("I've been really depressed since the breakup", "Sad"),
+    ("Everything feels hopeless and empty", "Sad"),
+    ("I cried myself to sleep again", "Sad"),
+    ("I miss my dad so much it hurts", "Sad"),
+    ("I'm not happy with how my life is going", "Sad"),
+    ("I feel so lonely at my new school", "Sad"),
+    ("Nobody would notice if I disappeared", "Sad"),
+    ("Nothing I do seems to matter anymore", "Sad"),
+    ("I'm so happy, I passed my driving test!", "Happy"),
+    ("Today was amazing, we went to the beach", "Happy"),
+    ("I'm really excited about the concert tonight", "Happy"),
+    ("I feel grateful for my friends", "Happy"),
+    ("We won the match and the whole team went out to celebrate!", "Happy"),
+    ("I finally got the internship I applied for!", "Happy"),
+    ("My sister had her baby this morning", "Happy"),
+    ("I'm so angry at my roommate right now", "Angry"),
+    ("He lied to me again and I'm furious", "Angry"),
+    ("This is so frustrating, nothing works", "Angry"),
+    ("I hate how they treat me at work", "Angry"),
+    ("I'm fed up with everyone ignoring me", "Angry"),
+    ("They cancelled my shift again without telling me", "Angry"),
+    ("I'm scared of what the doctor will say", "Fear"),
+    ("I get so anxious before presentations", "Fear"),
+    ("I'm terrified of flying next week", "Fear"),
+    ("I keep worrying that something bad will happen", "Fear"),
+    ("What if I fail and everyone sees it?", "Fear"),
+    ("I keep hearing noises downstairs and I can't sleep", "Fear"),
+    ("I went to the store and bought some milk", "Neutral"),
+    ("The meeting moved to three o'clock", "Neutral"),
+    ("Can you recommend a movie?", "Neutral"),
+    ("I'm reading a book about trains", "Neutral"),
+    ("It's cloudy today and the bus was on time", "Neutral"),
+    ("I'm not angry, just tired", "Neutral"),
+    ("Honestly I'm fine", "Neutral"),
+    ("I'm not really stressed anymore", "Neutral"),
+]
+
+THRESHOLDS = [0.0, 0.3, 0.5, 0.6, 0.7, 0.8, 1.01]
+
+SAME_MOOD = {"Depressed": "Sad"}
+
+
+def _same(predicted, expected):
+    return SAME_MOOD.get(predicted, predicted) == SAME_MOOD.get(expected, expected)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--no-model", action="store_true", help="only evaluate the lexicon stage")
+    args = parser.parse_args()
+
+    os.environ.setdefault("MINDSPARK_DISABLE_WARMUP", "1")
+    os.environ.setdefault("MINDSPARK_CONTENT_POOLS", "0")
+    import chat_logic
+
+    texts = [text for text, _ in LABELED]
+    lexical = [chat_logic.MOOD_LEXICON.classify(chat_logic.clean_text(text)) for text in texts]
+
+    model_moods = None
+    if not args.no_model and chat_logic.MODELS.get("emotion") is not None:
+        model_moods = chat_logic._classify_batch(texts)
+    else:
+        print("NOTE: emotion model not available; reporting the lexicon stage only.\n")
+
+    print(f"{'threshold':>9} {'model calls saved':>18} {'lexicon accuracy':>17} {'cascade accuracy':>17} {'model-only accuracy':>20}")
+    for threshold in THRESHOLDS:
+        kept = [i for i, result in enumerate(lexical) if result is not None and result[2] >= threshold]
+        lexicon_correct = sum(_same(lexical[i][0], LABELED[i][1]) for i in kept)
+        saved = len(kept) / len(LABELED)
+        lexicon_accuracy = f"{lexicon_correct / len(kept):.1%}" if kept else "-"
+
+        cascade_accuracy = model_accuracy = "n/a"
+        if model_moods is not None:
+            kept_set = set(kept)
+            correct = sum(
+                _same(lexical[i][0] if i in kept_set else model_moods[i][0], expected)
+                for i, (_, expected) in enumerate(LABELED)
+            )
+            cascade_accuracy = f"{correct / len(LABELED):.1%}"
+            model_accuracy = f"{sum(_same(m[0], e) for m, (_, e) in zip(model_moods, LABELED)) / len(LABELED):.1%}"
+
+        print(f"{threshold:>9.2f} {saved:>18.1%} {lexicon_accuracy:>17} {cascade_accuracy:>17} {model_accuracy:>20}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+A local stand-in for the Gemini REST API, for benchmarks and manual testing.
+
+Serves `models/<model>:generateContent` and `:streamGenerateContent` with a configurable delay,
+plus injected slow calls and HTTP 503 errors. Each prompt gets a few canned replies in turn, so
+runs are reproducible. Point the app at it with
+
+    GEMINI_BASE_URL=http://127.0.0.1:<port> GEMINI_API_KEY=fake
+
+or run it standalone:
+
+    python -m benchmarks.fake_gemini --port 8765 --delay 0.5
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_PATH = re.compile(r"^/[^/]+/models/(?P<model>[^:]+):(?P<method>\w+)")
+
+
+_TIPS = [
+    "Tip: Take three slow breaths before your next task.",
+    "Tip: Write down one thing you can control today and do it first.",
+    "Tip: Step outside for five minutes and notice what you can hear.",
+]
+_STORIES = [
+    "A lantern flickered in the storm but kept its small flame close. "
+    "**Even a little light is enough to find the next step.**",
+    "A river met a boulder and, instead of fighting, curled around it and kept flowing. "
+    "**You can move around what you cannot move.**",
+    "A seed spent the winter in the dark soil, unsure it would ever see the sun. "
+    "**Growth often starts where nobody can see it.**",
+]
+
+
+def _replies_for(prompt):
+    # Shaped like the real answers so the app's post-processing ("Tip:" check) behaves the same
+    return _TIPS if "tip" in prompt.lower() else _STORIES
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        match = _PATH.match(self.path)
+        if not match:
+            self._send_json(404, {"error": {"code": 404, "message": "not found", "status": "NOT_FOUND"}})
+            return
+
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        # Fault injection: a share of calls is slow (tail latency) and a share fails
+        slow = random.random() < server.slow_rate
+        time.sleep(server.slow_delay if slow else server.delay)
+        if random.random() < server.error_rate:
+            self._send_json(503, {"error": {"code": 503, "message": "injected failure", "status": "UNAVAILABLE"}})
+            return
+
+        prompt = " ".join(
+            part.get("text", "")
+            for content in request.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        text = server.next_reply(prompt)
+        if match.group("method") == "streamGenerateContent":
+            self._send_stream(text, match.group("model"))
+            return
+        self._send_json(200, {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+            "modelVersion": match.group("model"),
+        })
+
+    def _send_stream(self, text, model):
+        # Server-sent events, one word-sized chunk per event, like `?alt=sse` on the real API
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            chunk = word if i == len(words) - 1 else word + " "
+            event = {
+                "candidates": [{"content": {"role": "model", "parts": [{"text": chunk}]}}],
+                "modelVersion": model,
+            }
+            self.wfile.write(f"data: {json.dumps(event)}\r\n\r\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(self.server.chunk_delay)
+        self.close_connection = True
+
+
+class FakeGeminiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, delay=0.0, chunk_delay=0.02, error_rate=0.0, slow_rate=0.0, slow_delay=5.0):
+        super().__init__(("127.0.0.1", port), FakeGeminiHandler)
+        # All of these can be changed while the server runs
+        self.delay = delay
+        self.chunk_delay = chunk_delay
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_delay = slow_delay
+        self.requests = 0
+        self.lock = threading.Lock()
+        self._reply_counts = {}  # prompt -> answers given so far
+
+    def handle_error(self, request, client_address):
+        # Clients that hit their deadline hang up early; that is expected here
+        pass
+
+    def next_reply(self, prompt):
+        """Cycles through the canned replies per prompt, so repeated calls get each variant in turn."""
+        replies = _replies_for(prompt)
+        with self.lock:
+            count = self._reply_counts.get(prompt, 0)
+            self._reply_counts[prompt] = count + 1
+        return replies[count % len(replies)]
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serves in a daemon thread and returns self."""
+        threading.Thread(target=self.serve_forever, name="fake-gemini", daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.5, help="seconds to wait before answering")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of calls answered with HTTP 503")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="share of calls delayed by --slow-delay instead")
+    parser.add_argument("--slow-delay", type=float, default=5.0)
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(args.port, args.delay, error_rate=args.error_rate,
+                              slow_rate=args.slow_rate, slow_delay=args.slow_delay)
+    print(f"INFO: Fake Gemini listening on {server.url} (delay {args.delay}s)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Concurrent-session load on the ASGI chat service (chat_service.py).
+
+Drives N sessions at once through the same turns as benchmarks/load_web_app.py (a chat message
+followed by a random quick action, streamed stories included), in one process and without a
+Streamlit rerun per message. Requests go through httpx's in-process ASGI transport, so the
+numbers cover the service and engine rather than the network. Gemini is the local fake server.
+
+    python -m benchmarks.load_chat_service --sessions 50 --turns 6 --delay 0.3
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+from benchmarks import baseline
+from benchmarks.fake_gemini import FakeGeminiServer
+from benchmarks.load_web_app import MESSAGES
+
+ROLES = ["Student", "Working Professional", "General Public"]
+
+
+async def _simulate_session(client, session_number, turns, samples):
+    rng = random.Random(session_number)
+
+    async def timed(action, request):
+        start = time.perf_counter()
+        response = await request
+        samples.setdefault(action, []).append(time.perf_counter() - start)
+        response.raise_for_status()
+        return response
+
+    response = await timed("create_session", client.post("/sessions", json={"role": rng.choice(ROLES)}))
+    session_id = response.json()["session_id"]
+    for _ in range(turns):
+        response = await timed("chat_message", client.post(
+            f"/sessions/{session_id}/turn", json={"message": rng.choice(MESSAGES)}))
+        actions = response.json()["actions"]
+        if actions:
+            action = rng.choice(actions)
+            # /stream carries the story text as well, so story turns are timed to the last chunk
+            await timed(f"action:{action['command']}", client.post(
+                f"/sessions/{session_id}/stream", json={"command": action["command"], "text": action["text"]}))
+
+
+async def _run(args):
+    import httpx
+    import chat_service
+
+    samples = {}
+    transport = httpx.ASGITransport(app=chat_service.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://chat-service", timeout=60.0) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[_simulate_session(client, i, args.turns, samples) for i in range(args.sessions)])
+        elapsed = time.perf_counter() - start
+    return samples, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50, help="concurrent sessions")
+    parser.add_argument("--turns", type=int, default=6, help="message + action turns per session")
+    parser.add_argument("--delay", type=float, default=0.3, help="fake Gemini latency (seconds)")
+    parser.add_argument("--chunk-delay", type=float, default=0.05, help="fake Gemini delay between streamed chunks")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(delay=args.delay, chunk_delay=args.chunk_delay).start()
+    os.environ.update({"GEMINI_BASE_URL": server.url, "GEMINI_API_KEY": "fake"})
+
+    samples, elapsed = asyncio.run(_run(args))
+
+    results = {action: baseline.summarize(latencies) for action, latencies in sorted(samples.items())}
+    turns = [t for action, latencies in samples.items() if action != "create_session" for t in latencies]
+    results["all_turns"] = baseline.summarize(turns, elapsed)
+
+    print()
+    baseline.print_table(results)
+    print(f"\n{args.sessions} sessions x {args.turns} turns in {elapsed:.1f}s, peak RSS {baseline.peak_rss_mb():.0f} MB "
+          f"(fake Gemini latency {args.delay * 1000:.0f} ms)")
+
+    config = {"sessions": args.sessions, "turns": args.turns, "delay": args.delay, "chunk_delay": args.chunk_delay}
+    if args.save:
+        baseline.save(args.save, results, config)
+    if args.compare and baseline.compare(args.compare, results, args.tolerance, config):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Multi-user load simulation of web_app.py through Streamlit's AppTest harness.
+
+Each simulated user runs in its own process with its own AppTest session (AppTest shares a
+global runtime, so sessions cannot run side by side in threads). Users pick a role,
+then alternate chat messages with a quick-action button (story, tip, song...), so full turns
+go through handle_user_input and execute_suggestion. Gemini is replaced by the local fake
+server with a configurable latency. The report shows per-action and overall throughput,
+p50/p95/p99 turn latency and the peak RSS of a user process. Results can be saved as a baseline and compared later:
+
+    python -m benchmarks.load_web_app --users 8 --turns 6 --delay 0.3 --save benchmarks/baselines/load.json
+
+Run from the repository root so the app finds its resource files.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+from benchmarks import baseline
+from benchmarks.fake_gemini import FakeGeminiServer
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "web_app.py")
+
+MESSAGES = [
+    "I feel so sad today",
+    "I'm so stressed about my exams",
+    "Today was amazing, we went to the beach",
+    "I'm so angry at my roommate right now",
+    "I'm scared of what the doctor will say",
+    "I went to the store and bought some milk",
+    "Nothing I do seems to matter anymore",
+    "I have three deadlines tomorrow and no time to sleep",
+]
+
+ROLES = ["Student 👨‍🎓", "Professional 👩‍💼", "General Public 🏠"]
+
+
+def _simulate_user(user_id, turns, timeout, env, barrier, results):
+    os.environ.update(env)
+    # Import before the barrier so model warm-up and pool prefill are not billed to the first turn
+    from chat_engine import QUICK_ACTIONS
+    from streamlit.testing.v1 import AppTest
+    # chat_logic's background threads have no script context; the warning is expected here
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").setLevel(logging.ERROR)
+
+    action_labels = {label for actions in QUICK_ACTIONS.values() for label, _, _ in actions}
+    rng = random.Random(user_id)
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    samples, errors = {}, []
+
+    def step(action, fn):
+        start = time.perf_counter()
+        fn()
+        samples.setdefault(action, []).append(time.perf_counter() - start)
+        if at.exception or not at.chat_input and action != "page_load":
+            errors.append(f"user {user_id} after {action}: "
+                          f"{at.exception[0].message if at.exception else 'no chat input rendered'}")
+            return False
+        return True
+
+    def session():
+        role = rng.choice(ROLES)
+        if not (step("page_load", at.run)
+                and step("select_role", lambda: next(b for b in at.button if b.label == role).click().run())):
+            return
+        for _ in range(turns):
+            message = rng.choice(MESSAGES)
+            if not step("chat_message", lambda: at.chat_input[0].set_value(message).run()):
+                return
+            actions = [b for b in at.button if b.label in action_labels]
+            if actions:
+                button = rng.choice(actions)
+                label = button.label.split()[0].lower()
+                if not step(f"action:{label}", lambda: button.click().run()):
+                    return
+
+    barrier.wait()
+    started = time.time()
+    try:
+        session()
+    except Exception as e:
+        errors.append(f"user {user_id}: {e!r}")
+    results.put({"samples": samples, "errors": errors, "started": started, "finished": time.time(),
+                 "peak_rss_mb": baseline.peak_rss_mb()})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=8, help="concurrent simulated users")
+    parser.add_argument("--turns", type=int, default=6, help="message + action turns per user")
+    parser.add_argument("--delay", type=float, default=0.3, help="fake Gemini latency (seconds)")
+    parser.add_argument("--chunk-delay", type=float, default=0.05, help="fake Gemini delay between streamed chunks")
+    parser.add_argument("--timeout", type=float, default=60.0, help="AppTest per-run timeout (seconds)")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(delay=args.delay, chunk_delay=args.chunk_delay).start()
+    env = {"GEMINI_BASE_URL": server.url, "GEMINI_API_KEY": "fake"}
+
+    ctx = multiprocessing.get_context("spawn")
+    barrier, queue = ctx.Barrier(args.users), ctx.Queue()
+    users = [ctx.Process(target=_simulate_user, args=(i, args.turns, args.timeout, env, barrier, queue))
+             for i in range(args.users)]
+    for user in users:
+        user.start()
+    reports = [queue.get() for _ in users]
+    for user in users:
+        user.join()
+
+    samples, errors = {}, []
+    for report in reports:
+        errors.extend(report["errors"])
+        for action, latencies in report["samples"].items():
+            samples.setdefault(action, []).extend(latencies)
+    elapsed = max(r["finished"] for r in reports) - min(r["started"] for r in reports)
+    peak_rss = max(r["peak_rss_mb"] for r in reports)
+
+    # Per-action rows report one session's rate (1 / mean latency); all_turns reports
+    # turns completed per wall-clock second across every user
+    results = {action: baseline.summarize(latencies) for action, latencies in sorted(samples.items())}
+    turns = [t for action, latencies in samples.items() if action != "page_load" for t in latencies]
+    results["all_turns"] = baseline.summarize(turns, elapsed)
+
+    print()
+    baseline.print_table(results)
+    print(f"\n{args.users} users x {args.turns} turns in {elapsed:.1f}s, peak RSS per user process {peak_rss:.0f} MB "
+          f"(fake Gemini latency {args.delay * 1000:.0f} ms)")
+    for error in errors:
+        print(f"ERROR: {error}")
+
+    config = {"users": args.users, "turns": args.turns, "delay": args.delay, "chunk_delay": args.chunk_delay}
+    if args.save:
+        baseline.save(args.save, results, config, peak_rss)
+    regressed = args.compare and baseline.compare(args.compare, results, args.tolerance, config, peak_rss)
+    if errors or regressed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+import asyncio
+import functools
+import os
+import uuid
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+import mood_journal
+from message_store import MessageStore
+from chat_logic import (
+    detect_mood,
+    detect_mood_batch,
+    check_for_crisis,
+    ai_response,
+    get_media_and_tips,
+    generate_story_stream,
+    get_exercise_suggestion,
+    CRISIS_MESSAGE
+)
+
+
+# --- Headless Chat Engine ---
+# The conversation rules that used to live in web_app.py's Streamlit callbacks. A ChatSession
+# holds one user's state; ChatEngine applies a message or quick-action command to it and
+# returns what the turn produced. Nothing here knows about Streamlit, so the same engine
+# backs web_app.py and the ASGI service (chat_service.py).
+
+COMMANDS = ["story", "exercise", "song", "video", "yes"]
+
+NEGATIVE_MOODS = ["Angry", "Sad", "Depressed"]
+ANXIOUS_MOODS = ["Stressed", "Fear"]
+POSITIVE_MOODS = ["Happy", "Neutral", "Cheerful"]
+
+# (button label, command, text shown as the user's message) offered after each mood group
+QUICK_ACTIONS = {
+    "negative": [
+        ("Story 📖", "story", "I need a story."),
+        ("Exercise 🧘", "exercise", "I'll try an exercise."),
+        ("Song/Video ▶️", "song", "I'd like a song or video."),
+    ],
+    "anxious": [
+        ("Calming Video 📽️", "video", "I need a calming video."),
+        ("Exercise 🧘", "exercise", "I'll try an exercise."),
+        ("Quick Tip 🧠", "yes", "Give me a quick tip."),
+    ],
+    "positive": [
+        ("Song 🎶", "song", "Yes, recommend a song."),
+        ("Movie 🎬", "movie", "Yes, recommend a movie."),
+        ("Story 📝", "story", "Yes, tell me a story."),
+    ],
+}
+
+
+def quick_actions(mood):
+    """Returns the (label, command, display_text) buttons offered for an awaited mood."""
+    if mood in NEGATIVE_MOODS:
+        return QUICK_ACTIONS["negative"]
+    if mood in ANXIOUS_MOODS:
+        return QUICK_ACTIONS["anxious"]
+    if mood in POSITIVE_MOODS:
+        return QUICK_ACTIONS["positive"]
+    return []
+
+
+class ChatSession:
+    """One user's conversation: role, message history, last mood and pending actions."""
+
+    __slots__ = ("session_id", "user_id", "user_role", "messages", "last_mood", "awaiting_command", "pending_story")
+
+    def __init__(self, user_role=None, session_id=None, user_id=None):
+        self.session_id = session_id or uuid.uuid4().hex
+        # Optional stable id of the person behind the session; keys their mood journal across sessions
+        self.user_id = user_id
+        self.user_role = user_role
+        self.messages = MessageStore()
+        self.last_mood = ("Neutral", "😐")
+        self.awaiting_command = None
+        # Mood of a story requested but not streamed yet (see ChatEngine.stream_story)
+        self.pending_story = None
+
+    def to_dict(self):
+        """Session state with the recent message window; older messages are paged separately."""
+        return {
+            "session_id": self.session_id,
+            "user_id": self.user_id,
+            "user_role": self.user_role,
+            "messages": [m.to_dict() for m in self.messages.recent()],
+            "message_count": len(self.messages),
+            "last_mood": list(self.last_mood),
+            "awaiting_command": self.awaiting_command,
+            "pending_story": self.pending_story,
+        }
+
+
+# What one turn produced: the messages (message_store.Message) it appended, whether the user
+# asked to pick a new role, and whether a story is waiting to be streamed.
+TurnResult = namedtuple("TurnResult", ["messages", "reset", "story_pending"])
+
+
+class ChatEngine:
+    """Applies user messages and quick-action commands to ChatSession objects."""
+
+    def __init__(self, max_workers=None, journal=mood_journal.JOURNAL):
+        # Detected moods are queued to the journal (mood_journal.py); None disables journaling
+        self.journal = journal
+        # Turns mostly wait on Gemini or the emotion batcher, so the async API gets a pool
+        # sized for concurrent sessions rather than for CPU cores
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or int(os.getenv("MINDSPARK_ENGINE_THREADS", "64")),
+            thread_name_prefix="chat-engine",
+        )
+
+    def start_session(self, role, session_id=None, user_id=None):
+        session = ChatSession(role, session_id, user_id)
+        session.messages.append("assistant", f"Hello! I see you've identified as a **{role}**. How are you feeling right now? I'm here to listen.")
+        return session
+
+    def _result(self, session, start):
+        return TurnResult(session.messages.since(start), False, session.pending_story is not None)
+
+    @metrics.timed("engine_execute_command")
+    def execute_command(self, session, command, display_text):
+        """Executes the media/exercise command based on the last detected mood."""
+        start = len(session.messages)
+        messages = session.messages
+
+        # 1. Acknowledge the user's button click
+        messages.append("user", display_text)
+
+        # 2. Reset the awaiting command state
+        session.awaiting_command = None
+
+        # 3. Proceed with execution
+        mood, _ = session.last_mood
+
+        # Command 1: Story (streamed separately by stream_story)
+        if command == "story":
+            messages.append("assistant", f"That's a lovely idea! Let me tell you a story for your **{mood}** mood...")
+            session.pending_story = mood
+
+        # Command 2: Exercise
+        elif command == "exercise":
+            exercise = get_exercise_suggestion("Stressed")
+            if exercise:
+                messages.append("assistant", f"Absolutely! Let's try the **{exercise['title']}** technique to recenter ourselves:")
+                exercise_steps = "\n".join(exercise['steps'])
+                messages.append("suggestion", f"🧘 **Exercise Steps**:\n\n{exercise_steps}")
+            else:
+                messages.append("assistant", "I'm sorry, I don't have a specific exercise right now, but a simple stretch or getting a glass of water can always help!")
+
+        # Command 3, 4, 5: Media (Song, Video, or General Yes)
+        elif command in ["song", "video", "movie", "yes"]:
+            quote, song_link, movie, contextual_tip, video_link = get_media_and_tips(mood, session.user_role)
+
+            messages.append("assistant", f"Here is a suggestion to help shift your **{mood}** mood:")
+
+            suggestions = f"**{quote}**"
+            if contextual_tip:
+                suggestions += f" | {contextual_tip}"
+
+            if video_link:
+                mood_action = 'calmer' if mood in ['Angry', 'Stressed', 'Fear'] else 'happier'
+                suggestions += f"\n\n💡 **Mood Shifter:** Try watching **[This Video on YouTube]({video_link})** to help you feel {mood_action}."
+            elif song_link and movie:
+                suggestions += f"\n\n💡 **Try a mood boost:** Maybe watch **{movie}** or listen to **[This Song on YouTube]({song_link})**."
+
+            messages.append("suggestion", suggestions)
+
+        return self._result(session, start)
+
+    @metrics.timed("engine_handle_message")
+    def handle_message(self, session, prompt, mood=None):
+        """
+        Processes user input and appends the assistant's response. `mood` may be passed in
+        when it was already detected (see handle_batch).
+        """
+        start = len(session.messages)
+        messages = session.messages
+
+        # 1. CRISIS CHECK
+        if check_for_crisis(prompt):
+            messages.append("user", prompt)
+            messages.append("suggestion", CRISIS_MESSAGE)
+            session.awaiting_command = None
+            return self._result(session, start)
+
+        # 2. Handle System Commands
+        if prompt.lower() == "role":
+            session.user_role = None
+            session.messages.clear()
+            session.awaiting_command = None
+            return TurnResult([], True, False)
+
+        # 3. Handle Previous Command Request (from text input)
+        if session.awaiting_command and any(cmd in prompt.lower() for cmd in COMMANDS):
+            command = next((c for c in COMMANDS if c in prompt.lower()), "yes")
+            return self.execute_command(session, command, prompt)
+
+        # 4. Standard Flow: Process new input
+        messages.append("user", prompt)
+        mood, emoji = mood or detect_mood(prompt)
+        session.last_mood = (mood, emoji)
+        if self.journal is not None:
+            # Only queues the entry; the journal's writer thread does the disk work
+            self.journal.record(session.session_id, mood, emoji, prompt, session.user_id, session.user_role)
+
+        # 5. Decide Next Step (Dialogue and Prompt)
+        reply = ai_response(f"chat: responded to {mood}")
+        messages.append("assistant", reply)
+
+        # Negative Moods: Offer direct intervention (Story or Exercise)
+        if mood in NEGATIVE_MOODS:
+            messages.append("assistant", "I'm here for you. Take a moment, and let's find something to lift your spirits.")
+        # Stress/Fear Moods: Offer a quick solution
+        elif mood in ANXIOUS_MOODS:
+            messages.append("assistant", "That sounds rough. Let's find a way to center your mind right now.")
+        # Neutral/Positive Moods: Ask if they want a suggestion
+        else:
+            messages.append("assistant", f"That's great! Let's boost that wonderful **{mood}** feeling even more.")
+        session.awaiting_command = mood
+
+        return self._result(session, start)
+
+    def handle_batch(self, turns):
+        """
+        Handles several (session, prompt) turns at once. Moods for every plain chat message
+        are detected in one detect_mood_batch call; returns one TurnResult per turn.
+        """
+        needs_mood = [
+            i for i, (session, prompt) in enumerate(turns)
+            if not check_for_crisis(prompt) and prompt.lower() != "role"
+            and not (session.awaiting_command and any(cmd in prompt.lower() for cmd in COMMANDS))
+        ]
+        moods = dict(zip(needs_mood, detect_mood_batch([turns[i][1] for i in needs_mood])))
+        return [self.handle_message(session, prompt, moods.get(i)) for i, (session, prompt) in enumerate(turns)]
+
+    def stream_story(self, session):
+        """Streams the pending story's text chunks, then saves the full story to the history."""
+        mood = session.pending_story
+        session.pending_story = None
+        if mood is None:
+            return
+        story = ""
+        for chunk in generate_story_stream(mood):
+            story += chunk
+            yield chunk
+        session.messages.append("assistant", f"📖 **Story Time:**\n\n{story}")
+
+    # --- Async API ---
+    # Mood detection and Gemini calls block, so each turn runs on the engine's worker threads.
+    # Many sessions proceed concurrently while the event loop stays free; concurrent mood
+    # detections still meet in the shared EMOTION_BATCHER.
+
+    async def _in_thread(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(fn, *args))
+
+    async def handle_message_async(self, session, prompt):
+        return await self._in_thread(self.handle_message, session, prompt)
+
+    async def execute_command_async(self, session, command, display_text):
+        return await self._in_thread(self.execute_command, session, command, display_text)
+
+    async def handle_batch_async(self, turns):
+        return await self._in_thread(self.handle_batch, turns)
+
+    async def stream_story_async(self, session):
+        """Async version of stream_story; each chunk is awaited from a worker thread."""
+        chunks = self.stream_story(session)
+        done = object()
+        while True:
+            chunk = await self._in_thread(next, chunks, done)
+            if chunk is done:
+                return
+            yield chunk
@@ -1,53 +1,119 @@
 import re
-import json
 import random
-from transformers import pipeline
+import asyncio
+import threading
 import time 
 import warnings 
 
 # --- Import Gemini Client and Types ---
 from google import genai
 from google.genai import types
-from google.genai.errors import APIError
 
 import os
 from dotenv import load_dotenv
 
+from model_registry import ModelRegistry
+from inference_batcher import MicroBatcher
+from ttl_cache import TTLCache
+from crisis_matcher import CrisisMatcher
+from mood_lexicon import MoodLexicon
+from content_pool import ContentPool
+from gemini_guard import CircuitBreaker, GeminiGuard, GuardError
+from request_gate import RequestGate, AdmissionRejectedError, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from emotion_backends import load_local_detector
+from response_cache import RESPONSE_CACHE
+from resource_store import ResourceStore, build_mood_media, youtube_search_link
+import metrics
+
 # Load environment variables from the .env file
 load_dotenv() 
 # --- END ADDITION ---
 
-import re
-import json
 # Suppress warnings from the generation pipeline for a cleaner console
 warnings.filterwarnings("ignore", category=UserWarning, module="transformers")
 
 # --- 1. Load Resources and Initialize Gemini Client ---
+# The media, quote and exercise JSON files are loaded by resource_store.py into RESOURCES
+# (see "Resource Snapshot" below), relative to this module rather than the working directory.
+
+# Initialize Gemini Client and Emotion Model (lazily, see model_registry.py)
+GEMINI_DEADLINE = float(os.getenv("MINDSPARK_GEMINI_DEADLINE", "10"))
+
+
+def _load_gemini_client():
+    # Client automatically uses GEMINI_API_KEY environment variable.
+    # The HTTP timeout matches the call deadline so abandoned requests free their threads.
+    http_options = types.HttpOptions(timeout=int(GEMINI_DEADLINE * 1000))
+    base_url = os.getenv("GEMINI_BASE_URL")
+    if base_url:
+        # e.g. a local fake server (benchmarks/fake_gemini.py) for testing and load runs
+        http_options.base_url = base_url
+    return genai.Client(http_options=http_options)
+
+
+# "torch" runs the transformers pipeline; "onnx" runs the int8-quantized export (onnx_backend.py)
+EMOTION_BACKEND = os.getenv("MINDSPARK_EMOTION_BACKEND", "torch")
+
+# Path of a shared mood_server.py socket. When set, every worker process sends its texts to
+# one model copy per node instead of loading its own.
+EMOTION_SERVER_SOCKET = os.getenv("MINDSPARK_EMOTION_SERVER")
+
+
+def _load_emotion_detector():
+    if EMOTION_SERVER_SOCKET:
+        from mood_server import RemoteEmotionClassifier
+        remote = RemoteEmotionClassifier(
+            EMOTION_SERVER_SOCKET, fallback_loader=lambda: load_local_detector(EMOTION_BACKEND)
+        )
+        if remote.ping():
+            print(f"INFO: Using the shared emotion model server at {EMOTION_SERVER_SOCKET}")
+            return remote
+        print(f"WARNING: Emotion model server at {EMOTION_SERVER_SOCKET} is not reachable; loading the model in-process.")
+    return load_local_detector(EMOTION_BACKEND)
+
+
+MODELS = ModelRegistry()
+MODELS.register("gemini", _load_gemini_client)
+MODELS.register("emotion", _load_emotion_detector)
 
-try:
-    with open("resources/mood_media.json", "r", encoding="utf-8") as f:
-        MEDIA_DATA = json.load(f)
-    with open("resources/quotes.json", "r", encoding="utf-8") as f:
-        QUOTES = json.load(f)
-    with open("exercises.json", "r", encoding="utf-8") as f:
-        EXERCISES = json.load(f)
-except FileNotFoundError as e:
-    print(f"ERROR: Resource file not found: {e}. Check your file structure.")
-    MEDIA_DATA, QUOTES, EXERCISES = {}, {}, {}
+# Warm both models in the background; the first Streamlit render no longer waits on them.
+if os.getenv("MINDSPARK_DISABLE_WARMUP", "0") != "1":
+    MODELS.warm_up()
 
+# Per-stage latency and call counters (metrics.py); no-ops unless MINDSPARK_METRICS=1
+metrics.start_exporters()
 
-# Initialize Gemini Client
-client = None
-try:
-    # Client automatically uses GEMINI_API_KEY environment variable
-    client = genai.Client()
-    print("INFO: Gemini client initialized successfully.")
-except Exception as e:
-    print(f"WARNING: Gemini client failed to initialize. Dynamic content will use fallback mock logic. Error: {e}")
+
+def get_gemini_client():
+    """Returns the Gemini client, or None if it could not be initialized (uses fallback logic)."""
+    return MODELS.get("gemini")
+
+
+def get_model_status():
+    """Returns the load state and load time (seconds) of every registered model."""
+    return MODELS.status()
 
 
 # --- CRISIS DATA and Mood Emojis (Remain the same) ---
-CRISIS_KEYWORDS = ["hurt myself", "end my life", "suicide", "want to die", "kill myself", "crisis"]
+CRISIS_KEYWORDS = [
+    "hurt myself", "end my life", "suicide", "want to die", "kill myself", "crisis",
+    # English variants (matched on whole words; "my self" spellings are added automatically)
+    "suicides", "suicidal", "commit suicide", "killing myself", "harm myself", "harming myself",
+    "self harm", "cut myself", "cutting myself", "hang myself", "take my own life", "taking my own life",
+    "end it all", "ending it all", "wanna die", "wish i was dead", "wish i were dead", "better off dead",
+    "don't want to live", "dont want to live", "no reason to live", "not worth living", "overdose",
+    # Spanish / Portuguese
+    "quiero morir", "me quiero morir", "no quiero vivir", "suicidarme", "matarme", "quitarme la vida",
+    "suicidio", "quero morrer", "me matar",
+    # French
+    "je veux mourir", "me suicider", "me tuer", "suicidaire",
+    # German
+    "ich will sterben", "mich umbringen", "selbstmord", "suizid",
+    # Italian
+    "voglio morire", "uccidermi", "suicidarmi",
+    # Hindi (romanized)
+    "marna chahta hoon", "marna chahti hoon", "khudkushi", "aatmahatya",
+]
 CRISIS_MESSAGE = (
     "🚨 **IMMEDIATE ATTENTION REQUIRED** 🚨\n\n"
     "I am an AI companion, not a substitute for professional care. "
@@ -67,48 +133,137 @@ def clean_text(text):
     text = re.sub(r'[^\w\s]', '', text)
     return text.strip()
 
+# Compiled once: a single pass over the message regardless of how many phrases there are.
+CRISIS_MATCHER = CrisisMatcher(CRISIS_KEYWORDS)
+
+@metrics.timed()
 def check_for_crisis(user_input):
-    clean_input = user_input.lower()
-    for keyword in CRISIS_KEYWORDS:
-        if keyword in clean_input:
-            return True
-    return False
-
-# Load emotion detection pipeline (assuming transformers is installed)
-try:
-    EMOTION_DETECTOR = pipeline(
-        "text-classification", model="j-hartmann/emotion-english-distilroberta-base", return_all_scores=False
-    )
-except Exception:
-    EMOTION_DETECTOR = None
+    return CRISIS_MATCHER.matches(user_input)
+
+
+HUGGINGFACE_TO_CHATBOT_MOOD = {
+    "anger": ("Angry", "😡"), "fear": ("Fear", "😨"), "sadness": ("Sad", "😔"),
+    "joy": ("Happy", "😀"), "neutral": ("Neutral", "😐"), "surprise": ("Happy", "🤩"),
+    "disgust": ("Angry", "😠"), "trust": ("Neutral", "😌")
+}
+
+
+# Stage 1 of the cascade: weighted lexicon with negation (mood_lexicon.py). The transformer
+# only runs when the lexicon's confidence is below the threshold.
+MOOD_LEXICON = MoodLexicon()
+LEXICON_THRESHOLD = float(os.getenv("MINDSPARK_LEXICON_THRESHOLD", "0.6"))
+
+CASCADE_STATS = {"cache": 0, "lexicon": 0, "model": 0, "fallback": 0}
+_CASCADE_LOCK = threading.Lock()
+
+def _count_stage(stage, amount=1):
+    with _CASCADE_LOCK:
+        CASCADE_STATS[stage] += amount
+    metrics.inc("mood_cascade", amount, stage=stage)
+
+def get_cascade_stats():
+    """Returns how many texts each detect_mood stage answered, with hit rates."""
+    with _CASCADE_LOCK:
+        counts = dict(CASCADE_STATS)
+    total = sum(counts.values())
+    return {**counts, **{f"{stage}_rate": (n / total if total else 0.0) for stage, n in counts.items()}}
+
+
+def _classify_batch(texts):
+    """Runs one padded forward pass over `texts` and maps each label to a chatbot mood."""
+    emotion_detector = MODELS.get("emotion")
+    metrics.inc("model_calls", model="emotion")
+    metrics.inc("model_texts", len(texts), model="emotion")
+    with metrics.span("emotion_model"):
+        results = emotion_detector(texts, batch_size=len(texts), padding=True, truncation=True)
+    moods = []
+    for result in results:
+        if isinstance(result, list):
+            result = result[0]
+        moods.append(HUGGINGFACE_TO_CHATBOT_MOOD.get(result['label'], ("Neutral", "😐")))
+    return moods
+
+
+# One shared queue for every session: texts that arrive within a few milliseconds of
+# each other are classified together instead of paying per-call overhead one by one.
+EMOTION_BATCHER = MicroBatcher(
+    _classify_batch,
+    max_batch_size=int(os.getenv("MINDSPARK_BATCH_SIZE", "16")),
+    max_wait_ms=float(os.getenv("MINDSPARK_BATCH_WAIT_MS", "5")),
+    name="emotion-batcher",
+)
 
+
+# Repeated short messages ("i'm stressed") skip the model entirely. Keyed on clean_text().
+MOOD_CACHE = TTLCache(
+    maxsize=int(os.getenv("MINDSPARK_MOOD_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("MINDSPARK_MOOD_CACHE_TTL", "3600")),
+)
+
+
+def detect_mood_batch(texts, threshold=None):
+    """
+    Detects the mood of several texts at once; returns a list of (mood, emoji) tuples.
+    Each text goes through the cascade cache -> lexicon -> transformer, stopping at the
+    first stage that is confident enough.
+    """
+    threshold = LEXICON_THRESHOLD if threshold is None else threshold
+    keys = [clean_text(text) for text in texts]
+    moods, guesses = [], {}
+    for i, key in enumerate(keys):
+        mood = MOOD_CACHE.get(key)
+        if mood is not None:
+            _count_stage("cache")
+        else:
+            lexical = MOOD_LEXICON.classify(key)
+            if lexical is not None:
+                if lexical[2] >= threshold:
+                    mood = lexical[:2]
+                    MOOD_CACHE.put(key, mood)
+                    _count_stage("lexicon")
+                else:
+                    guesses[i] = lexical[:2]
+        moods.append(mood)
+
+    # Don't block on the model while it is still warming up; use the low-confidence lexicon
+    # guess or neutral instead. Those placeholder results are not cached. Without the startup
+    # warmup, the first text that needs the model starts loading it in the background.
+    pending = {}
+    for i, mood in enumerate(moods):
+        if mood is None:
+            pending.setdefault(keys[i], []).append(i)
+    if pending and not MODELS.is_ready("emotion"):
+        MODELS.ensure_loading("emotion")
+    elif pending:
+        groups = list(pending.values())
+        futures = EMOTION_BATCHER.submit_many([texts[group[0]] for group in groups])
+        for group, future in zip(groups, futures):
+            try:
+                mood = future.result()
+            except Exception:
+                continue
+            MOOD_CACHE.put(keys[group[0]], mood)
+            _count_stage("model", len(group))
+            for i in group:
+                moods[i] = mood
+
+    for i, mood in enumerate(moods):
+        if mood is None:
+            moods[i] = guesses.get(i, ("Neutral", "😐"))
+            _count_stage("fallback")
+    return moods
+
+
+@metrics.timed()
 def detect_mood(user_input):
-    # (Full logic is assumed to be present and remains the same)
-    clean_input = clean_text(user_input)
-    if "stress" in clean_input: return "Stressed", "😫"
-    if "sad" in clean_input or "depress" in clean_input: return "Depressed", "😔"
-    if "happy" in clean_input or "joy" in clean_input: return "Happy", "😀"
-    if "angry" in clean_input: return "Angry", "😡"
-    
-    if EMOTION_DETECTOR:
-        try:
-            HUGGINGFACE_TO_CHATBOT_MOOD = {
-                "anger": ("Angry", "😡"), "fear": ("Fear", "😨"), "sadness": ("Sad", "😔"),
-                "joy": ("Happy", "😀"), "neutral": ("Neutral", "😐"), "surprise": ("Happy", "🤩"),
-                "disgust": ("Angry", "😠"), "trust": ("Neutral", "😌")
-            }
-            result = EMOTION_DETECTOR(user_input)[0]
-            dominant_emotion = result['label']
-            return HUGGINGFACE_TO_CHATBOT_MOOD.get(dominant_emotion, ("Neutral", "😐"))
-        except:
-             pass
-    return "Neutral", "😐"
+    return detect_mood_batch([user_input])[0]
 
 
 # --- 3. Generative AI Functions (Specific Integration) ---
 
 def _get_mock_story(mood):
     """Fallback story if the Gemini API call fails or is unavailable."""
+    metrics.inc("fallbacks", kind="story")
     if mood == "Angry" or mood == "Stressed":
         return "The Whispering Stream: Once, a small stone was constantly buffeted by a river's current... **Remember to let go and find your stillness.**"
     elif mood == "Sad" or mood == "Depressed":
@@ -117,6 +272,7 @@ def _get_mock_story(mood):
         return "The small turtle worried about the finish line... **Remember, your strength comes from within, every step of the way.**"
 
 
+@metrics.timed()
 def ai_response(prompt):
     """Handles fast, fixed conversational responses (No Gemini for general chat)."""
     # This remains fixed for performance and reliability on general chat
@@ -127,120 +283,463 @@ def ai_response(prompt):
     return "Thanks for sharing. What's on your mind right now? I'm all ears."
 
 
-def generate_story(mood):
-    """Generates a dynamic story using the Gemini API."""
+GEMINI_MODEL = os.getenv("MINDSPARK_GEMINI_MODEL", "gemini-2.5-flash")
+
+STORY_CONFIG = types.GenerateContentConfig(
+    temperature=0.8,
+    system_instruction="You are an empathetic, concise storyteller."
+)
+TIP_CONFIG = types.GenerateContentConfig(
+    temperature=0.4, # Lower temperature for facts/tips
+    system_instruction="You are a supportive coach. Respond with only the tip, starting with 'Tip: '"
+)
+
+
+def _story_prompt(mood):
+    return f"Write a one-paragraph, uplifting, metaphorical story about coping with {mood.lower()} that ends with a single, clear positive takeaway sentence."
+
+def _tip_prompt(mood, user_role):
+    return f"Give a single, concise, actionable mental health tip for a {user_role} feeling {mood}."
+
+def _get_fixed_tip(user_role):
+    """Fallback tip if the Gemini API call fails or is unavailable."""
+    metrics.inc("fallbacks", kind="tip")
+    if user_role == "Student":
+        return "Tip: Try the Pomodoro Technique to manage study stress efficiently."
+    return "Tip: Focus on small, manageable steps today. You can do it!"
+
+def _tip_is_valid(text):
+    return text.split('\n')[0].strip().startswith("Tip:")
+
+def _clean_tip(text):
+    # Clean up output to ensure it's just the tip
+    tip = text.split('\n')[0].strip()
+    if tip.startswith("Tip:"):
+        return tip
+    metrics.inc("fallbacks", kind="tip_format")
+    return "Tip: Focus on small, manageable steps today."
+
+
+class GeminiUnavailable(GuardError):
+    """Raised when the Gemini client could not be initialized."""
+
+
+# Single-flight coalescing of identical prompts plus rate/concurrency admission with priorities
+# (request_gate.py). A call that would queue longer than its max wait gets its fallback instead.
+GEMINI_GATE = RequestGate(
+    max_concurrent=int(os.getenv("MINDSPARK_GEMINI_CONCURRENCY", "16")),
+    rate=float(os.getenv("MINDSPARK_GEMINI_RATE", "0")),  # requests per second, 0 = unlimited
+    burst=float(os.getenv("MINDSPARK_GEMINI_BURST", "0")) or None,
+    max_wait=float(os.getenv("MINDSPARK_GEMINI_MAX_WAIT", "1")),
+)
+# Pool refills have no user waiting on them, so they may queue much longer
+BACKGROUND_MAX_WAIT = float(os.getenv("MINDSPARK_GEMINI_BACKGROUND_MAX_WAIT", "30"))
+
+# Deadline, hedged second request and circuit breaker shared by every Gemini call (gemini_guard.py)
+GEMINI_GUARD = GeminiGuard(
+    deadline=GEMINI_DEADLINE,
+    hedge=os.getenv("MINDSPARK_GEMINI_HEDGE", "1") == "1",
+    hedge_percentile=float(os.getenv("MINDSPARK_GEMINI_HEDGE_PERCENTILE", "95")),
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.getenv("MINDSPARK_BREAKER_FAILURES", "5")),
+        reset_timeout=float(os.getenv("MINDSPARK_BREAKER_RESET", "30")),
+    ),
+    # A hedged second request spends rate budget too
+    hedge_budget=GEMINI_GATE.try_take_token,
+)
+
+
+def _request_key(contents, config):
+    # Identical model, prompt and generation settings -> one upstream call for all callers
+    return GEMINI_MODEL, contents, config.model_dump_json(exclude_none=True)
+
+def _gate_max_wait(priority):
+    return BACKGROUND_MAX_WAIT if priority >= PRIORITY_BACKGROUND else None
+
+
+def _gemini_generate(contents, config, priority=PRIORITY_INTERACTIVE, store=False, accept=None):
+    """
+    Calls Gemini once through the gate and the guard; raises GuardError on any failure.
+    With `store`, the answer goes into the response cache (once per coalesced flight).
+    """
+    client = get_gemini_client()
     if client is None:
-        return _get_mock_story(mood)
+        raise GeminiUnavailable("Gemini client is not initialized")
+
+    def upstream():
+        text = GEMINI_GUARD.call(lambda: client.models.generate_content(
+            model=GEMINI_MODEL,
+            contents=contents,
+            config=config
+        )).text
+        if store:
+            _cache_store(contents, config, text, accept)
+        return text
 
-    story_prompt = f"Write a one-paragraph, uplifting, metaphorical story about coping with {mood.lower()} that ends with a single, clear positive takeaway sentence."
+    try:
+        with metrics.span("gemini_call"):
+            text = GEMINI_GATE.call(_request_key(contents, config), upstream, priority, _gate_max_wait(priority))
+    except GuardError as e:
+        metrics.inc("gemini_calls", mode="sync", outcome=type(e).__name__)
+        raise
+    metrics.inc("gemini_calls", mode="sync", outcome="ok")
+    return text
+
+async def _gemini_generate_async(contents, config, priority=PRIORITY_INTERACTIVE, store=False, accept=None):
+    """Async version of _gemini_generate."""
+    client = get_gemini_client()
+    if client is None:
+        raise GeminiUnavailable("Gemini client is not initialized")
+
+    async def upstream():
+        text = (await GEMINI_GUARD.call_async(lambda: client.aio.models.generate_content(
+            model=GEMINI_MODEL,
+            contents=contents,
+            config=config
+        ))).text
+        if store:
+            # The insert may wait on another process's write lock; keep it off the event loop
+            await asyncio.to_thread(_cache_store, contents, config, text, accept)
+        return text
 
     try:
-        response = client.models.generate_content(
-            model='gemini-2.5-flash',
-            contents=story_prompt,
-            config=types.GenerateContentConfig(
-                temperature=0.8,
-                system_instruction="You are an empathetic, concise storyteller."
-            )
-        )
-        return response.text
-    except APIError:
+        with metrics.span("gemini_call"):
+            text = await GEMINI_GATE.call_async(_request_key(contents, config), upstream, priority, _gate_max_wait(priority))
+    except GuardError as e:
+        metrics.inc("gemini_calls", mode="async", outcome=type(e).__name__)
+        raise
+    metrics.inc("gemini_calls", mode="async", outcome="ok")
+    return text
+
+# --- Persistent Response Cache ---
+# Stories and tips depend only on (prompt, model, temperature, system instruction), so answers
+# are kept on disk (response_cache.py) and reused across restarts and processes. Interactive
+# paths check the cache before the gate; pool refills skip the lookup, since the pools need
+# fresh variants. Only answers that pass the quality check are stored.
+
+def story_request(mood):
+    """Returns (prompt, config, quality check) for a story: the unit the response cache stores."""
+    return _story_prompt(mood), STORY_CONFIG, None
+
+def tip_request(mood, user_role):
+    """Returns (prompt, config, quality check) for a tip; tips without the "Tip:" prefix are not cached."""
+    return _tip_prompt(mood, user_role), TIP_CONFIG, _tip_is_valid
+
+def _cache_args(contents, config):
+    return contents, GEMINI_MODEL, config.temperature, config.system_instruction
+
+def _cache_lookup(contents, config):
+    return RESPONSE_CACHE.get(*_cache_args(contents, config)) if RESPONSE_CACHE is not None else None
+
+def _cache_store(contents, config, text, accept=None):
+    if RESPONSE_CACHE is not None:
+        RESPONSE_CACHE.put(*_cache_args(contents, config), text, accept)
+
+def generate_and_cache(contents, config, accept=None, priority=PRIORITY_INTERACTIVE):
+    """Calls Gemini (bypassing the cache lookup) and stores the answer; raises GuardError on failure."""
+    return _gemini_generate(contents, config, priority, store=RESPONSE_CACHE is not None, accept=accept)
+
+def _cached_generate(contents, config, accept=None, priority=PRIORITY_INTERACTIVE):
+    """Serves a cached answer if there is one, else generates and caches it; raises GuardError on failure."""
+    text = _cache_lookup(contents, config)
+    return text if text is not None else generate_and_cache(contents, config, accept, priority)
+
+async def _cached_generate_async(contents, config, accept=None, priority=PRIORITY_INTERACTIVE):
+    """Async version of _cached_generate."""
+    text = _cache_lookup(contents, config)
+    if text is not None:
+        return text
+    return await _gemini_generate_async(contents, config, priority, store=RESPONSE_CACHE is not None, accept=accept)
+
+def _request_story(mood):
+    """Returns one story (cached or from Gemini); raises GuardError on failure."""
+    return _cached_generate(*story_request(mood))
+
+def _request_tip(mood, user_role):
+    """Returns one raw tip (cached or from Gemini); raises GuardError on failure."""
+    return _cached_generate(*tip_request(mood, user_role))
+
+def get_gemini_metrics():
+    """
+    Returns Gemini call counters, circuit breaker state/timing and latency percentiles, plus
+    the request gate's queue depth and coalescing counters (prefixed "gate_") and the
+    response cache's hit/miss counters (prefixed "cache_").
+    """
+    cache = RESPONSE_CACHE.status() if RESPONSE_CACHE is not None else {}
+    return {**GEMINI_GUARD.metrics(), **{f"gate_{k}": v for k, v in GEMINI_GATE.metrics().items()},
+            **{f"cache_{k}": v for k, v in cache.items()}}
+
+
+@metrics.timed()
+def generate_story(mood):
+    """Generates a dynamic story using the Gemini API."""
+    try:
+        return _request_story(mood)
+    except GuardError:
         # Fallback to mock if API call fails
-        return _get_mock_story(mood) 
+        return _get_mock_story(mood)
 
+@metrics.timed()
 def generate_contextual_tip(mood, user_role):
     """Generates a brief, personalized mental health tip using Gemini."""
+    try:
+        return _clean_tip(_request_tip(mood, user_role))
+    except GuardError:
+        # Use fixed fallback
+        return _get_fixed_tip(user_role)
+
+
+@metrics.timed()
+def generate_story_stream(mood):
+    """
+    Streams a dynamic story from the Gemini API as it is generated, yielding text chunks.
+    Yields the mock story in one piece if Gemini is unavailable or fails before the first chunk.
+    """
+    # A pre-generated story is already complete; show it at once instead of streaming.
+    if STORY_POOL is not None:
+        story = STORY_POOL.take(mood, default=None)
+        if story is not None:
+            yield story
+            return
+    story = _cache_lookup(_story_prompt(mood), STORY_CONFIG)
+    if story is not None:
+        yield story
+        return
+
+    client = get_gemini_client()
     if client is None:
-        if user_role == "Student":
-            return "Tip: Try the Pomodoro Technique to manage study stress efficiently."
-        return "Tip: Focus on small, manageable steps today. You can do it!"
+        yield _get_mock_story(mood)
+        return
+    # A stream holds one gate slot from the request to its last chunk. Admission comes before
+    # the breaker check so a rejected stream never takes the breaker's half-open probe.
+    try:
+        GEMINI_GATE.acquire()
+    except AdmissionRejectedError:
+        metrics.inc("gemini_calls", mode="stream", outcome="AdmissionRejectedError")
+        yield _get_mock_story(mood)
+        return
+    try:
+        yield from _stream_story_chunks(client, mood)
+    finally:
+        GEMINI_GATE.release()
 
-    tip_prompt = f"Give a single, concise, actionable mental health tip for a {user_role} feeling {mood}."
+
+def _stream_story_chunks(client, mood):
+    # Streams share the breaker with other calls; the HTTP timeout bounds each chunk wait.
+    if not GEMINI_GUARD.breaker.allow():
+        yield _get_mock_story(mood)
+        return
+
+    start = time.perf_counter()
+    first_chunk = True
+    parts = []
     try:
-        response = client.models.generate_content(
-            model='gemini-2.5-flash',
-            contents=tip_prompt,
-            config=types.GenerateContentConfig(
-                temperature=0.4, # Lower temperature for facts/tips
-                system_instruction="You are a supportive coach. Respond with only the tip, starting with 'Tip: '"
-            )
-        )
-        # Clean up output to ensure it's just the tip
-        tip = response.text.split('\n')[0].strip()
-        return tip if tip.startswith("Tip:") else "Tip: Focus on small, manageable steps today."
-    except APIError:
-        # Use fixed fallback
-        if user_role == "Student":
-            return "Tip: Try the Pomodoro Technique to manage study stress efficiently."
-        return "Tip: Focus on small, manageable steps today. You can do it!"
+        for chunk in client.models.generate_content_stream(
+            model=GEMINI_MODEL,
+            contents=_story_prompt(mood),
+            config=STORY_CONFIG
+        ):
+            if not chunk.text:
+                continue
+            if first_chunk:
+                first_chunk = False
+                ttft = time.perf_counter() - start
+                metrics.observe("story_stream_first_chunk", ttft)
+                print(f"INFO: Story stream time-to-first-token: {ttft:.3f}s")
+            parts.append(chunk.text)
+            yield chunk.text
+    except Exception as e:
+        GEMINI_GUARD.breaker.record_failure()
+        metrics.inc("gemini_calls", mode="stream", outcome=type(e).__name__)
+        print(f"WARNING: Story stream failed. Error: {e}")
+        if first_chunk:
+            yield _get_mock_story(mood)
+        return
+    except BaseException:
+        # The consumer closed the generator mid-stream (Streamlit rerun, SSE client gone):
+        # release a half-open probe, or every later call would be short-circuited.
+        GEMINI_GUARD.breaker.record_abandoned()
+        metrics.inc("gemini_calls", mode="stream", outcome="abandoned")
+        raise
+    GEMINI_GUARD.breaker.record_success()
+    metrics.inc("gemini_calls", mode="stream", outcome="ok")
+    print(f"INFO: Story stream finished in {time.perf_counter() - start:.3f}s")
+    # Only a stream that completed is cached; a cut-off story would be served again and again
+    _cache_store(_story_prompt(mood), STORY_CONFIG, "".join(parts))
+
+
+# --- Async Gemini Path ---
+# The async variants use the client's `aio` interface so independent generations (a story
+# and a tip, or a tip and the local media picks) overlap instead of running back to back.
+
+@metrics.timed()
+async def generate_story_async(mood):
+    """Async version of generate_story."""
+    try:
+        return await _cached_generate_async(*story_request(mood))
+    except GuardError:
+        return _get_mock_story(mood)
+
+@metrics.timed()
+async def generate_contextual_tip_async(mood, user_role):
+    """Async version of generate_contextual_tip."""
+    try:
+        return _clean_tip(await _cached_generate_async(*tip_request(mood, user_role)))
+    except GuardError:
+        return _get_fixed_tip(user_role)
+
+async def generate_story_and_tip_async(mood, user_role):
+    """Generates a story and a tip concurrently; returns (story, tip)."""
+    story, tip = await asyncio.gather(
+        generate_story_async(mood), generate_contextual_tip_async(mood, user_role)
+    )
+    return story, tip
+
+
+# Sync callers (the Streamlit script thread) hand coroutines to one long-lived event loop,
+# so the async client's connection pool is reused instead of being rebuilt per call.
+_ASYNC_LOOP = None
+_ASYNC_LOOP_LOCK = threading.Lock()
+
+def _get_async_loop():
+    global _ASYNC_LOOP
+    with _ASYNC_LOOP_LOCK:
+        if _ASYNC_LOOP is None:
+            _ASYNC_LOOP = asyncio.new_event_loop()
+            threading.Thread(target=_ASYNC_LOOP.run_forever, name="gemini-async-loop", daemon=True).start()
+    return _ASYNC_LOOP
+
+def run_sync(coro):
+    """Runs a coroutine on the shared background loop and blocks until it finishes."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_async_loop()).result()
+
+def generate_story_and_tip(mood, user_role):
+    """Sync wrapper: generates a story and a tip concurrently; returns (story, tip)."""
+    return run_sync(generate_story_and_tip_async(mood, user_role))
+
+
+# --- Pre-Generated Content Pools ---
+# Tips and stories have only a few distinct keys, so a few answers per key are generated in
+# the background (content_pool.py) and served in O(1). The model call is off the hot path;
+# while a buffer is empty the mock story / fixed tip is served instead.
+
+POOL_MOODS = ["Angry", "Sad", "Depressed", "Stressed", "Fear", "Happy", "Neutral", "Cheerful"]
+POOL_ROLES = ["Student", "Working Professional", "General Public"]
+
+
+# Refills call Gemini directly: a cached answer would only repeat one the pool has already
+# served, and the variety rule would drop it. Every fresh answer still goes into the cache.
+def _produce_story(mood):
+    try:
+        return generate_and_cache(*story_request(mood), priority=PRIORITY_BACKGROUND)
+    except GuardError:
+        return None
+
+def _produce_tip(key):
+    mood, user_role = key
+    try:
+        tip = generate_and_cache(*tip_request(mood, user_role), priority=PRIORITY_BACKGROUND)
+    except GuardError:
+        return None
+    # Only well-formed tips go into the pool
+    return tip.split('\n')[0].strip() if _tip_is_valid(tip) else None
+
+
+STORY_POOL = TIP_POOL = None
+if os.getenv("MINDSPARK_CONTENT_POOLS", "1") == "1":
+    STORY_POOL = ContentPool(
+        _produce_story, _get_mock_story,
+        capacity=int(os.getenv("MINDSPARK_POOL_CAPACITY", "3")),
+        ttl=float(os.getenv("MINDSPARK_POOL_TTL", str(6 * 3600))),
+        name="story-pool",
+    )
+    TIP_POOL = ContentPool(
+        _produce_tip, lambda key: _get_fixed_tip(key[1]),
+        capacity=int(os.getenv("MINDSPARK_POOL_CAPACITY", "3")),
+        ttl=float(os.getenv("MINDSPARK_POOL_TTL", str(6 * 3600))),
+        name="tip-pool",
+    )
+    if os.getenv("MINDSPARK_DISABLE_WARMUP", "0") != "1":
+        STORY_POOL.prefill(POOL_MOODS)
+        TIP_POOL.prefill([(mood, role) for mood in POOL_MOODS for role in POOL_ROLES])
+
+
+@metrics.timed()
+def serve_story(mood):
+    """Serves a pre-generated story for the mood (mock story if none is ready yet)."""
+    if STORY_POOL is None:
+        return generate_story(mood)
+    return STORY_POOL.take(mood)
+
+@metrics.timed()
+def serve_contextual_tip(mood, user_role):
+    """Serves a pre-generated tip for the mood and role (fixed tip if none is ready yet)."""
+    if TIP_POOL is None:
+        return generate_contextual_tip(mood, user_role)
+    return TIP_POOL.take((mood, user_role))
 
 
 # --- 4. Retrieval and Main Response Generator (Updated for Gemini Tip) ---
 
-# (Helper functions for media links and exercise suggestions remain the same)
+# --- Resource Snapshot ---
+# mood_media.json, quotes.json and exercises.json are validated and compiled into one
+# immutable snapshot (per-mood media index, mood -> exercise map), cached on disk by content
+# hash and swapped atomically when a file changes, so content updates need no restart.
+
+RESOURCES = ResourceStore(extra_moods={mood for mood, _ in HUGGINGFACE_TO_CHATBOT_MOOD.values()})
+RESOURCES.start_watching()
+
+
 def get_song_link(song_name):
-    if song_name:
-        return f"https://www.youtube.com/results?search_query={song_name.replace(' ', '+')}"
-    return None
+    return youtube_search_link(song_name)
 
 def get_video_link(video_name):
-    if video_name:
-        return f"https://www.youtube.com/results?search_query={video_name.replace(' ', '+')}"
-    return None
+    return youtube_search_link(video_name)
 
 def get_exercise_suggestion(mood):
-    for key, ex in EXERCISES.items():
-        if mood in ex.get("target_moods", []):
-            return ex
-    return None
-
-def get_related_moods(mood):
-    mood_map = {
-        "Sad": ["Sad", "Neutral", "Cheerful"],
-        "Depressed": ["Sad", "Neutral", "Cheerful"],
-        "Angry": ["Angry", "Neutral", "Happy"],
-        "Fear": ["Fear", "Neutral", "Happy"],
-        "Stressed": ["Stressed", "Neutral", "Happy"],
-        "Guilt": ["Guilt", "Neutral", "Happy"],
-        "Lonely": ["Lonely", "Neutral", "Cheerful"]
-    }
-    return mood_map.get(mood, [mood, "Neutral", "Happy"])
+    return RESOURCES.snapshot.exercises_by_mood.get(mood)
 
 
-def get_media_and_tips(mood, user_role="General Public"):
-    """Retrieves motivational media, quotes, and contextual tips based on mood."""
-    
+def reload_resources():
+    """Re-reads the JSON resources now instead of waiting for the file watcher."""
+    return RESOURCES.reload()
+
+
+def _pick_media(mood):
+    snapshot = RESOURCES.snapshot
+    media = snapshot.media_index.get(mood)
+    if media is None:
+        media = build_mood_media(mood, snapshot.media_data, snapshot.quotes)
+
     # 1. Get Quote (ROBUST RETRIEVAL)
-    quote_list = QUOTES.get(mood)
-    if not quote_list:
-        quote_list = QUOTES.get("Neutral")
-    if not quote_list:
-        quote_list = ["Stay positive!", "You are stronger than you think!"]
-        
-    quote = random.choice(quote_list)
+    quote = random.choice(media.quotes)
 
     # 2. Get Media (Broad Selection)
-    related_moods = get_related_moods(mood)
-    all_songs, all_movies, all_videos = [], [], []
-
-    for related_mood in related_moods:
-        if related_mood in MEDIA_DATA:
-            all_songs.extend(MEDIA_DATA[related_mood].get("songs", []))
-            all_movies.extend(MEDIA_DATA[related_mood].get("movies", []))
-            all_videos.extend(MEDIA_DATA[related_mood].get("videos", []))
-
-    all_songs = list(set(all_songs))
-    all_movies = list(set(all_movies))
-    all_videos = list(set(all_videos))
-
-    song_name = random.choice(all_songs) if all_songs else None
-    movie = random.choice(all_movies) if all_movies else None
-    video_name = random.choice(all_videos) if all_videos else None 
-
-    song_link = get_song_link(song_name)
-    video_link = get_video_link(video_name)
-    
-    # 3. Get Contextual Tip (DYNAMICALLY GENERATED by Gemini)
-    contextual_tip = generate_contextual_tip(mood, user_role)
-        
+    song_name, song_link = random.choice(media.songs) if media.songs else (None, None)
+    movie = random.choice(media.movies) if media.movies else None
+    video_name, video_link = random.choice(media.videos) if media.videos else (None, None)
+    return quote, song_link, movie, video_link
+
+
+async def get_media_and_tips_async(mood, user_role="General Public"):
+    """Async version of get_media_and_tips; the tip request runs while media is picked locally."""
+    if TIP_POOL is not None:
+        return get_media_and_tips(mood, user_role)
+
+    # 3. Get Contextual Tip (DYNAMICALLY GENERATED by Gemini), started first so it overlaps
+    tip_task = asyncio.ensure_future(generate_contextual_tip_async(mood, user_role))
+    quote, song_link, movie, video_link = _pick_media(mood)
+    contextual_tip = await tip_task
+    return quote, song_link, movie, contextual_tip, video_link
+
+
+@metrics.timed()
+def get_media_and_tips(mood, user_role="General Public"):
+    """Retrieves motivational media, quotes, and contextual tips based on mood."""
+    if TIP_POOL is None:
+        return run_sync(get_media_and_tips_async(mood, user_role))
+
+    quote, song_link, movie, video_link = _pick_media(mood)
+    # 3. Get Contextual Tip (pre-generated by Gemini in the background)
+    contextual_tip = serve_contextual_tip(mood, user_role)
     return quote, song_link, movie, contextual_tip, video_link
\ No newline at end of file
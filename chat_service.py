@@ -0,0 +1,366 @@
+"""
+Async HTTP service in front of the headless chat engine (chat_engine.py).
+
+A plain ASGI application, so one process serves many concurrent sessions without a Streamlit
+script rerun per message. Run it with
+
+    python -m chat_service --port 8000        (or: uvicorn chat_service:app)
+
+Endpoints (JSON in, JSON out):
+
+    POST /sessions                {"role": "Student"}             -> new session + greeting
+                                  (optional "user_id" keys the mood journal across sessions)
+    GET  /sessions/{id}                                           -> session state (recent window)
+    GET  /sessions/{id}/messages?before=N&limit=M                 -> older messages, paged
+    GET  /sessions/{id}/journal?since=T&bucket=S&limit=M          -> mood journal of the session's
+                                  user (or of the session): history, distribution, recent text
+    POST /sessions/{id}/turn      {"message": "..."}              -> messages this turn added
+                                  {"command": "story", "text": "..."}
+    POST /sessions/{id}/stream    same body as /turn              -> Server-Sent Events: one
+                                  "message" event per message, "story" events with story text
+                                  chunks, then "done"
+    POST /sessions/{id}/story                                     -> SSE of a pending story
+    POST /batch                   {"turns": [{"session_id": ..., "message": ...}, ...]}
+    GET  /health                                                  -> model load states, resource snapshot
+    GET  /metrics                                                 -> Prometheus text (metrics.py)
+
+Sessions are kept in memory and expire after MINDSPARK_SESSION_TTL seconds idle (default 3600),
+at most MINDSPARK_MAX_SESSIONS (default 10000) at a time.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+from urllib.parse import parse_qs
+
+import metrics
+import mood_journal
+from chat_engine import ChatEngine, quick_actions
+from chat_logic import POOL_ROLES, RESOURCES, RESPONSE_CACHE, get_model_status
+from ttl_cache import TTLCache
+
+ENGINE = ChatEngine()
+
+# session_id -> (ChatSession, asyncio.Lock); the lock serializes turns of one session
+SESSIONS = TTLCache(
+    maxsize=int(os.getenv("MINDSPARK_MAX_SESSIONS", "10000")),
+    ttl=float(os.getenv("MINDSPARK_SESSION_TTL", "3600")),
+)
+
+MAX_BODY_BYTES = 64 * 1024
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# --- Request / Response Helpers ---
+
+async def _read_json(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if len(body) > MAX_BODY_BYTES:
+            raise HTTPError(413, "request body too large")
+        if not message.get("more_body"):
+            break
+    if not body:
+        return {}
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPError(400, "request body is not valid JSON")
+    if not isinstance(payload, dict):
+        raise HTTPError(400, "request body must be a JSON object")
+    return payload
+
+
+async def _send_body(send, status, body, content_type):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_json(send, status, payload):
+    await _send_body(send, status, json.dumps(payload).encode("utf-8"), "application/json")
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+async def _send_events(send, events):
+    """Streams (event, data) pairs from an async iterator as Server-Sent Events."""
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache")],
+    })
+    try:
+        async for event, data in events:
+            await send({"type": "http.response.body", "body": _sse(event, data), "more_body": True})
+    except Exception as e:
+        # Headers are already sent, so failures are reported in-band
+        print(f"ERROR: Event stream failed. Error: {e}")
+        await send({"type": "http.response.body", "body": _sse("error", {"error": "internal error"}), "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def _state(session):
+    """The parts of a session a client needs to render its next input."""
+    return {
+        "awaiting_command": session.awaiting_command,
+        "actions": [{"label": label, "command": command, "text": text}
+                    for label, command, text in quick_actions(session.awaiting_command)],
+    }
+
+
+def _turn_payload(session, result):
+    return {"messages": [m.to_dict() for m in result.messages], "reset": result.reset, "story_pending": result.story_pending,
+            **_state(session)}
+
+
+def _get_session(session_id):
+    entry = SESSIONS.get(session_id)
+    if entry is None:
+        raise HTTPError(404, f"unknown or expired session {session_id!r}")
+    SESSIONS.put(session_id, entry)  # refresh the idle timeout
+    return entry
+
+
+def _validate_turn(body):
+    if "command" in body:
+        if not isinstance(body["command"], str):
+            raise HTTPError(400, "'command' must be a string")
+        return
+    message = body.get("message")
+    if not isinstance(message, str) or not message.strip():
+        raise HTTPError(400, "'message' (non-empty string) or 'command' is required")
+
+
+async def _run_turn(session, body):
+    if "command" in body:
+        command = body["command"]
+        return await ENGINE.execute_command_async(session, command, body.get("text") or command)
+    return await ENGINE.handle_message_async(session, body["message"])
+
+
+# --- Handlers ---
+
+async def create_session(send, body):
+    role = body.get("role")
+    if role not in POOL_ROLES:
+        raise HTTPError(400, f"'role' must be one of {POOL_ROLES}")
+    user_id = body.get("user_id")
+    if user_id is not None and not (isinstance(user_id, str) and 0 < len(user_id) <= 128):
+        raise HTTPError(400, "'user_id' must be a string of at most 128 characters")
+    session = ENGINE.start_session(role, user_id=user_id)
+    SESSIONS.put(session.session_id, (session, asyncio.Lock()))
+    await _send_json(send, 201, {**session.to_dict(), **_state(session)})
+
+
+async def get_session(send, session_id):
+    session, lock = _get_session(session_id)
+    async with lock:
+        await _send_json(send, 200, {**session.to_dict(), **_state(session)})
+
+
+async def get_messages(send, session_id, query):
+    params = parse_qs(query)
+    try:
+        before = int(params["before"][0]) if "before" in params else None
+        limit = min(int(params.get("limit", ["20"])[0]), 200)
+    except ValueError:
+        raise HTTPError(400, "'before' and 'limit' must be integers")
+    session, lock = _get_session(session_id)
+    async with lock:
+        total = len(session.messages)
+        before = total if before is None else max(0, min(before, total))
+        messages = session.messages.page(before, limit)
+        await _send_json(send, 200, {
+            "messages": [m.to_dict() for m in messages],
+            "first_index": before - len(messages),
+            "message_count": total,
+        })
+
+
+def _journal_report(session, since, bucket, limit):
+    journal = mood_journal.JOURNAL
+    scope = {"user_id": session.user_id} if session.user_id else {"session_id": session.session_id}
+    return {
+        "history": journal.mood_history(**scope, since=since, limit=limit),
+        "distribution": journal.mood_distribution(**scope, since=since, bucket=bucket),
+        "recent_text": journal.recent_text(**scope, since=since, limit=limit),
+    }
+
+
+async def get_journal(send, session_id, query):
+    if mood_journal.JOURNAL is None:
+        raise HTTPError(404, "the mood journal is disabled (MINDSPARK_JOURNAL_DB is empty)")
+    params = parse_qs(query)
+    try:
+        since = float(params["since"][0]) if "since" in params else None
+        bucket = float(params["bucket"][0]) if "bucket" in params else None
+        limit = min(int(params.get("limit", ["50"])[0]), 500)
+    except ValueError:
+        raise HTTPError(400, "'since', 'bucket' and 'limit' must be numbers")
+    if bucket is not None and bucket <= 0:
+        raise HTTPError(400, "'bucket' must be positive")
+    session, _ = _get_session(session_id)
+    # SQLite reads block, so they run off the event loop
+    report = await asyncio.to_thread(_journal_report, session, since, bucket, limit)
+    await _send_json(send, 200, report)
+
+
+async def turn(send, session_id, body):
+    _validate_turn(body)
+    session, lock = _get_session(session_id)
+    async with lock:
+        result = await _run_turn(session, body)
+        await _send_json(send, 200, _turn_payload(session, result))
+
+
+async def stream_turn(send, session_id, body):
+    _validate_turn(body)
+    session, lock = _get_session(session_id)
+
+    async def events():
+        async with lock:
+            result = await _run_turn(session, body)
+            for message in result.messages:
+                yield "message", message.to_dict()
+            if result.story_pending:
+                async for chunk in ENGINE.stream_story_async(session):
+                    yield "story", {"text": chunk}
+            yield "done", {"reset": result.reset, **_state(session)}
+
+    await _send_events(send, events())
+
+
+async def stream_story(send, session_id):
+    session, lock = _get_session(session_id)
+    if session.pending_story is None:
+        raise HTTPError(409, "no story is pending for this session")
+
+    async def events():
+        async with lock:
+            async for chunk in ENGINE.stream_story_async(session):
+                yield "story", {"text": chunk}
+            yield "done", _state(session)
+
+    await _send_events(send, events())
+
+
+async def batch(send, body):
+    turns = body.get("turns")
+    if not isinstance(turns, list) or not turns:
+        raise HTTPError(400, "'turns' must be a non-empty list")
+    if not all(isinstance(t, dict) and isinstance(t.get("message"), str) and t["message"].strip() for t in turns):
+        raise HTTPError(400, "every turn needs a 'session_id' and a non-empty 'message'")
+    ids = [t.get("session_id") for t in turns]
+    if len(set(ids)) != len(ids):
+        raise HTTPError(400, "each session may appear at most once per batch")
+
+    entries = [_get_session(session_id) for session_id in ids]
+    # Take the locks in a fixed order so concurrent batches cannot deadlock
+    locks = sorted({id(lock): lock for _, lock in entries}.values(), key=id)
+    for lock in locks:
+        await lock.acquire()
+    try:
+        results = await ENGINE.handle_batch_async([(session, t["message"]) for (session, _), t in zip(entries, turns)])
+    finally:
+        for lock in locks:
+            lock.release()
+    await _send_json(send, 200, {"results": [
+        {"session_id": session.session_id, **_turn_payload(session, result)}
+        for (session, _), result in zip(entries, results)
+    ]})
+
+
+async def health(send):
+    await _send_json(send, 200, {"status": "ok", "models": get_model_status(), "resources": RESOURCES.status(),
+                                 "response_cache": RESPONSE_CACHE.status() if RESPONSE_CACHE is not None else None,
+                                 "sessions": len(SESSIONS)})
+
+
+async def metrics_text(send):
+    body = metrics.REGISTRY.render_prometheus().encode("utf-8")
+    await _send_body(send, 200, body, "text/plain; version=0.0.4; charset=utf-8")
+
+
+# --- Routing ---
+
+_SESSION_ROUTE = re.compile(r"^/sessions/(?P<id>[0-9a-f]{32})(?P<action>/turn|/stream|/story|/messages|/journal)?$")
+
+
+async def _dispatch(method, path, query, receive, send):
+    if path == "/health" and method == "GET":
+        return await health(send)
+    if path == "/metrics" and method == "GET":
+        return await metrics_text(send)
+    if path == "/sessions" and method == "POST":
+        return await create_session(send, await _read_json(receive))
+    if path == "/batch" and method == "POST":
+        return await batch(send, await _read_json(receive))
+
+    match = _SESSION_ROUTE.match(path)
+    if match is None:
+        raise HTTPError(404, "not found")
+    session_id, action = match["id"], match["action"]
+    if action is None and method == "GET":
+        return await get_session(send, session_id)
+    if action == "/messages" and method == "GET":
+        return await get_messages(send, session_id, query)
+    if action == "/journal" and method == "GET":
+        return await get_journal(send, session_id, query)
+    if action == "/turn" and method == "POST":
+        return await turn(send, session_id, await _read_json(receive))
+    if action == "/stream" and method == "POST":
+        return await stream_turn(send, session_id, await _read_json(receive))
+    if action == "/story" and method == "POST":
+        return await stream_story(send, session_id)
+    raise HTTPError(405, "method not allowed")
+
+
+async def app(scope, receive, send):
+    """The ASGI entry point."""
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+
+    try:
+        await _dispatch(scope["method"], scope["path"], scope.get("query_string", b"").decode("latin-1"), receive, send)
+    except HTTPError as e:
+        await _send_json(send, e.status, {"error": e.message})
+    except Exception as e:
+        print(f"ERROR: {scope['method']} {scope['path']} failed. Error: {e}")
+        await _send_json(send, 500, {"error": "internal error"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
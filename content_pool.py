@@ -0,0 +1,162 @@
+import atexit
+import threading
+import time
+from collections import deque
+
+_FALLBACK = object()
+
+
+# --- Pre-Generated Content Pools ---
+# Tips and stories only have a handful of distinct keys (mood, or mood x role), so a few
+# ready answers are kept per key. Serving pops one in O(1); background workers top the
+# buffer back up when it drops below the low-water mark. Pools close at interpreter exit, so
+# no refill is started while the executors the producers call into are shutting down.
+
+
+class ContentPool:
+    """Keeps a small buffer of generated answers per key and refills it in the background."""
+
+    def __init__(self, producer, fallback, capacity=3, low_water=2, ttl=6 * 3600,
+                 recent_window=6, max_attempts=4, retry_after=30.0, workers=2, name="content-pool"):
+        # producer(key) returns a fresh answer, or None if generation failed
+        # fallback(key) returns the fixed answer served while the buffer is empty
+        self.producer = producer
+        self.fallback = fallback
+        self.capacity = capacity
+        self.low_water = low_water
+        self.ttl = ttl
+        self.recent_window = recent_window
+        self.max_attempts = max_attempts
+        self.retry_after = retry_after
+        self.name = name
+
+        self._buffers = {}       # key -> deque of (expires_at, text)
+        self._recent = {}        # key -> deque of recently served texts (variety rule)
+        self._failed_at = {}     # key -> monotonic time of the last failed refill
+        self._scheduled = set()  # keys waiting for or being refilled
+        self._closed = False
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "produced": 0, "duplicates": 0, "failures": 0}
+        self._workers = [
+            threading.Thread(target=self._run, name=f"{name}-{i}", daemon=True) for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+        atexit.register(self.close)
+
+    def take(self, key, default=_FALLBACK):
+        """Serves a buffered answer for `key`, or the fallback (or `default`) if none is ready."""
+        now = time.monotonic()
+        with self._lock:
+            buffer = self._buffers.get(key)
+            text = None
+            while buffer:
+                expires_at, candidate = buffer.popleft()
+                if expires_at > now:
+                    text = candidate
+                    break
+                self.stats["expired"] += 1
+
+            if text is None:
+                self.stats["misses"] += 1
+            else:
+                self.stats["hits"] += 1
+                self._recent.setdefault(key, deque(maxlen=self.recent_window)).append(text)
+            self._schedule_locked(key, now)
+
+        if text is not None:
+            return text
+        return self.fallback(key) if default is _FALLBACK else default
+
+    def prefill(self, keys):
+        """Schedules a background refill for every key (e.g. all mood/role combinations at startup)."""
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                self._schedule_locked(key, now)
+
+    def close(self):
+        """Stops scheduling refills; workers exit once their current refill returns."""
+        with self._lock:
+            self._closed = True
+            self._queue.clear()
+            self._wakeup.notify_all()
+
+    def size(self, key):
+        with self._lock:
+            return len(self._buffers.get(key, ()))
+
+    def _schedule_locked(self, key, now):
+        if self._closed or key in self._scheduled:
+            return
+        if len(self._buffers.get(key, ())) >= self.low_water:
+            return
+        failed_at = self._failed_at.get(key)
+        if failed_at is not None and now - failed_at < self.retry_after:
+            return
+        self._scheduled.add(key)
+        self._queue.append(key)
+        self._wakeup.notify()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._queue and not self._closed:
+                    self._wakeup.wait()
+                if self._closed:
+                    return
+                key = self._queue.popleft()
+            try:
+                self._refill(key)
+            finally:
+                with self._lock:
+                    self._scheduled.discard(key)
+
+    def _refill(self, key):
+        attempts = 0
+        while attempts < self.max_attempts:
+            with self._lock:
+                if self._closed:
+                    return
+                buffer = self._buffers.setdefault(key, deque())
+                if len(buffer) >= self.capacity:
+                    return
+            attempts += 1
+
+            try:
+                text = self.producer(key)
+            except RuntimeError as e:
+                # concurrent.futures shuts its executors down before atexit hooks run, so a
+                # refill racing interpreter exit gets "cannot schedule new futures after
+                # shutdown": that is the process stopping, not a failed refill
+                if self._closed or "shutdown" in str(e):
+                    self.close()
+                    return
+                print(f"WARNING: {self.name} refill for {key!r} failed. Error: {e}")
+                text = None
+            except Exception as e:
+                print(f"WARNING: {self.name} refill for {key!r} failed. Error: {e}")
+                text = None
+            if not text:
+                with self._lock:
+                    self.stats["failures"] += 1
+                    self._failed_at[key] = time.monotonic()
+                return
+
+            with self._lock:
+                buffer = self._buffers[key]
+                seen = {candidate for _, candidate in buffer}
+                seen.update(self._recent.get(key, ()))
+                if text in seen:
+                    # Don't buffer an answer the user has just seen or that is already queued
+                    self.stats["duplicates"] += 1
+                    continue
+                buffer.append((time.monotonic() + self.ttl, text))
+                self.stats["produced"] += 1
+                self._failed_at.pop(key, None)
+
+        # Out of attempts (the producer keeps repeating itself): back off like a failure
+        with self._lock:
+            self._failed_at[key] = time.monotonic()
@@ -0,0 +1,84 @@
+import re
+import unicodedata
+
+
+# --- Multi-Pattern Crisis Matcher ---
+# All phrases are merged into a single character trie and compiled into one regular
+# expression. Each position of the input only follows the one trie branch that matches
+# its next character, so the cost of a scan stays flat as the lexicon grows.
+
+# Reflexive pronouns that people often split ("kill my self"); both spellings are matched.
+_SPLIT_COMPOUNDS = {
+    "myself": "my self",
+    "yourself": "your self",
+    "himself": "him self",
+    "herself": "her self",
+    "themselves": "them selves",
+    "ourselves": "our selves",
+}
+
+
+def normalize(text):
+    """Casefolds, strips accents and collapses punctuation/whitespace runs into single spaces."""
+    text = text.casefold()
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return re.sub(r"[\W_]+", " ", text).strip()
+
+
+def _expand(phrase):
+    variants = {phrase}
+    for compound, split in _SPLIT_COMPOUNDS.items():
+        for variant in list(variants):
+            if re.search(rf"\b{compound}\b", variant):
+                variants.add(re.sub(rf"\b{compound}\b", split, variant))
+    return variants
+
+
+def _trie_to_regex(node):
+    # node: {char: child_node}, with "" marking the end of a phrase
+    if not node or (len(node) == 1 and "" in node):
+        return ""
+
+    alternatives = []
+    optional = "" in node
+    for char in sorted(k for k in node if k):
+        alternatives.append(re.escape(char) + _trie_to_regex(node[char]))
+
+    if len(alternatives) == 1 and not optional:
+        return alternatives[0]
+    if all(len(alt) == 1 or (len(alt) == 2 and alt[0] == "\\") for alt in alternatives):
+        # Single characters collapse into a character class
+        body = "[" + "".join(alternatives) + "]"
+    else:
+        body = "(?:" + "|".join(alternatives) + ")"
+    return body + "?" if optional else body
+
+
+class CrisisMatcher:
+    """Finds any lexicon phrase in a text in one pass, on whole-word boundaries."""
+
+    def __init__(self, phrases):
+        self.phrases = sorted({normalize(p) for p in phrases if normalize(p)})
+        trie = {}
+        for phrase in self.phrases:
+            for variant in _expand(phrase):
+                node = trie
+                for char in variant:
+                    node = node.setdefault(char, {})
+                node[""] = {}
+        self._pattern = re.compile(r"(?<!\w)(?:" + _trie_to_regex(trie) + r")(?!\w)") if trie else None
+
+    def find(self, text):
+        """Returns the first matching phrase (normalized form) or None."""
+        if self._pattern is None:
+            return None
+        match = self._pattern.search(normalize(text))
+        return match.group(0) if match else None
+
+    def matches(self, text):
+        return self.find(text) is not None
+
+    def __len__(self):
+        return len(self.phrases)
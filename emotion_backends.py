@@ -0,0 +1,31 @@
+import os
+
+
+# --- Emotion Classifier Backends ---
+# Shared by chat_logic (in-process inference) and mood_server (one copy per node).
+
+EMOTION_MODEL_NAME = "j-hartmann/emotion-english-distilroberta-base"
+
+
+def load_local_detector(backend=None):
+    """
+    Loads the emotion classifier in this process. `backend` is "torch" (transformers
+    pipeline) or "onnx" (quantized export, see onnx_backend.py); defaults to
+    MINDSPARK_EMOTION_BACKEND.
+    """
+    backend = backend or os.getenv("MINDSPARK_EMOTION_BACKEND", "torch")
+    if backend == "onnx":
+        from onnx_backend import DEFAULT_MODEL_DIR, OnnxEmotionClassifier, validation_error
+        model_dir = os.getenv("MINDSPARK_ONNX_MODEL_DIR", DEFAULT_MODEL_DIR)
+        # The quantized export is only used once bench_emotion_backends has recorded that it
+        # matches this model's labels and is faster on it
+        problem = validation_error(model_dir)
+        if problem is None:
+            threads = os.getenv("MINDSPARK_ONNX_THREADS")
+            return OnnxEmotionClassifier(model_dir, intra_op_threads=int(threads) if threads else None)
+        print(f"WARNING: Not using the ONNX emotion model in {model_dir}: {problem}. Run "
+              f"`python -m benchmarks.bench_emotion_backends` to validate it; loading the PyTorch pipeline instead.")
+
+    # transformers/torch are imported here so that importing chat_logic stays fast
+    from transformers import pipeline
+    return pipeline("text-classification", model=EMOTION_MODEL_NAME, return_all_scores=False)
@@ -0,0 +1,265 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+# --- Gemini Call Guard: Deadlines, Hedged Requests and a Circuit Breaker ---
+# Every Gemini request goes through GeminiGuard.call()/call_async(). A call that misses its
+# deadline is abandoned; a call slower than the recent p95 gets a second (hedged) request and
+# the first answer wins; repeated failures open the breaker so callers go straight to their
+# fallbacks until Gemini looks healthy again.
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class GuardError(Exception):
+    """Base class for calls the guard did not complete."""
+
+class CircuitOpenError(GuardError):
+    """Raised without calling upstream while the breaker is open."""
+
+class DeadlineExceededError(GuardError):
+    """Raised when no attempt answered before the deadline."""
+
+class UpstreamError(GuardError):
+    """Raised when every attempt failed; the original exception is chained."""
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and probes again after `reset_timeout`."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_count = 0
+        self.changed_at = time.monotonic()
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def _set_state(self, state):
+        if state != self.state:
+            self.state = state
+            self.changed_at = time.monotonic()
+            if state == OPEN:
+                self.opened_count += 1
+            print(f"INFO: Gemini circuit breaker is now {state}.")
+
+    def allow(self):
+        """Returns True if a call may go upstream (in half-open state only one probe at a time)."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.changed_at >= self.reset_timeout:
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+            self._set_state(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self._set_state(OPEN)
+
+    def record_abandoned(self):
+        """Ends a call that was cancelled before it succeeded or failed; frees a half-open probe."""
+        with self._lock:
+            self._probe_in_flight = False
+
+
+class LatencyTracker:
+    """Keeps the latencies of the last `window` successful calls for percentile estimates."""
+
+    def __init__(self, window=200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, p):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(p / 100.0 * (len(samples) - 1))))
+        return samples[index]
+
+
+class GeminiGuard:
+    """Runs upstream calls with a deadline, an optional hedged retry and a circuit breaker."""
+
+    def __init__(self, deadline=10.0, hedge=True, hedge_percentile=95, hedge_min_samples=20,
+                 min_hedge_delay=0.05, breaker=None, max_workers=32, hedge_budget=None):
+        self.deadline = deadline
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.min_hedge_delay = min_hedge_delay
+        # Optional zero-argument callable asked before each hedge; False skips it (e.g. no rate token left)
+        self.hedge_budget = hedge_budget
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gemini-call")
+        self._lock = threading.Lock()
+        self.counters = {
+            "calls": 0, "successes": 0, "failures": 0, "timeouts": 0,
+            "short_circuited": 0, "hedges_sent": 0, "hedge_wins": 0,
+        }
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def hedge_delay(self):
+        """Seconds to wait before sending a hedged request, or None if hedging is off/uncalibrated."""
+        if not self.hedge or len(self.latency) < self.hedge_min_samples:
+            return None
+        delay = max(self.min_hedge_delay, self.latency.percentile(self.hedge_percentile))
+        return delay if delay < self.deadline else None
+
+    def _may_hedge(self):
+        return self.hedge_budget is None or self.hedge_budget()
+
+    def _admit(self):
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            raise CircuitOpenError("Gemini circuit breaker is open")
+        self._count("calls")
+
+    def _finish(self, latency, hedged_win):
+        self.latency.add(latency)
+        self.breaker.record_success()
+        self._count("successes")
+        if hedged_win:
+            self._count("hedge_wins")
+
+    def _fail(self, error, timed_out):
+        self.breaker.record_failure()
+        if timed_out:
+            self._count("timeouts")
+            raise DeadlineExceededError(f"Gemini call exceeded its {self.deadline:.1f}s deadline")
+        self._count("failures")
+        raise UpstreamError(str(error)) from error
+
+    def _timed(self, fn):
+        start = time.monotonic()
+        result = fn()
+        return result, time.monotonic() - start
+
+    def call(self, fn):
+        """Calls `fn()` (a blocking upstream request) under the deadline, hedge and breaker rules."""
+        self._admit()
+        deadline = time.monotonic() + self.deadline
+        winner, error = None, None
+        try:
+            attempts = [self._executor.submit(self._timed, fn)]
+
+            hedge_delay = self.hedge_delay()
+            if hedge_delay is not None:
+                done, _ = wait(attempts, timeout=hedge_delay)
+                if not done and self._may_hedge():
+                    self._count("hedges_sent")
+                    attempts.append(self._executor.submit(self._timed, fn))
+
+            pending = set(attempts)
+            while pending and winner is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        winner = attempt
+                        break
+                    error = attempt.exception()
+        except BaseException:
+            # Interrupted before any outcome (executor shut down, KeyboardInterrupt): free a
+            # half-open probe, or every later call would be short-circuited
+            self.breaker.record_abandoned()
+            raise
+
+        if winner is not None:
+            result, latency = winner.result()
+            self._finish(latency, hedged_win=winner is not attempts[0])
+            return result
+        # Abandoned attempts keep their worker thread until the HTTP timeout frees it
+        self._fail(error, timed_out=bool(pending))
+
+    async def call_async(self, coro_fn):
+        """Async version of call(); `coro_fn()` must return a new coroutine for each attempt."""
+        self._admit()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+
+        async def _timed():
+            start = loop.time()
+            result = await coro_fn()
+            return result, loop.time() - start
+
+        attempts = [asyncio.ensure_future(_timed())]
+        pending, winner, error = set(attempts), None, None
+        try:
+            hedge_delay = self.hedge_delay()
+            if hedge_delay is not None:
+                done, _ = await asyncio.wait(attempts, timeout=hedge_delay)
+                if not done and self._may_hedge():
+                    self._count("hedges_sent")
+                    attempts.append(asyncio.ensure_future(_timed()))
+                    pending.add(attempts[-1])
+
+            while pending and winner is None:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        winner = attempt
+                        break
+                    error = attempt.exception()
+        except BaseException:
+            # The caller was cancelled (e.g. the client disconnected): free a half-open probe,
+            # or every later call would be short-circuited
+            self.breaker.record_abandoned()
+            raise
+        finally:
+            for attempt in pending:
+                attempt.cancel()
+
+        if winner is not None:
+            result, latency = winner.result()
+            self._finish(latency, hedged_win=winner is not attempts[0])
+            return result
+        self._fail(error, timed_out=bool(pending))
+
+    def metrics(self):
+        """Returns counters, breaker state/timing and latency percentiles as a flat dict."""
+        with self._lock:
+            metrics = dict(self.counters)
+        metrics.update({
+            "breaker_state": self.breaker.state,
+            "breaker_opened_count": self.breaker.opened_count,
+            "breaker_state_seconds": time.monotonic() - self.breaker.changed_at,
+            "breaker_consecutive_failures": self.breaker.consecutive_failures,
+            "latency_p50": self.latency.percentile(50),
+            "latency_p95": self.latency.percentile(95),
+            "hedge_delay": self.hedge_delay(),
+        })
+        return metrics
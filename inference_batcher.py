@@ -0,0 +1,89 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+# --- Cross-Session Micro-Batching ---
+# Every Streamlit session submits its text to one shared queue. A single worker thread
+# waits a few milliseconds to collect more work, then runs the whole batch through the
+# model in one call and hands each caller back its own result.
+
+
+class MicroBatcher:
+    """Collects items from many threads and processes them together with `batch_fn`."""
+
+    def __init__(self, batch_fn, max_batch_size=16, max_wait_ms=5.0, name="micro-batcher"):
+        # batch_fn takes a list of items and must return a list of results in the same order
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self.stats = {"batches": 0, "items": 0, "max_batch": 0, "errors": 0}
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._worker.start()
+
+    def submit(self, item):
+        """Queues one item and returns a Future for its result."""
+        future = Future()
+        self._queue.put((item, future))
+        self._ensure_worker()
+        return future
+
+    def submit_many(self, items):
+        """Queues several items at once so they can share a batch."""
+        futures = []
+        for item in items:
+            future = Future()
+            self._queue.put((item, future))
+            futures.append(future)
+        self._ensure_worker()
+        return futures
+
+    def _collect(self):
+        # Block for the first item, then gather more until the batch is full or the window closes.
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                # Still drain anything that is already waiting
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(items):
+                    raise ValueError(f"batch_fn returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                self.stats["errors"] += 1
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.stats["batches"] += 1
+            self.stats["items"] += len(items)
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(items))
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
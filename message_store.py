@@ -0,0 +1,155 @@
+import os
+import sqlite3
+import threading
+import weakref
+from collections import deque, namedtuple
+from itertools import count, islice
+
+
+# --- Compact, Windowed Chat History ---
+# Messages are slotted (role, content) tuples instead of dicts. Only the most recent `window`
+# messages stay in memory; older ones are spilled in chunks to one temporary SQLite database
+# shared by every store in the process (one file descriptor however many sessions spill; the
+# file is deleted when the process exits) and read back only when the UI pages to them. A
+# store's rows are deleted when it is cleared or garbage collected. Appends, the recent window
+# and memory use stay flat however long a conversation grows.
+
+HISTORY_WINDOW = int(os.getenv("MINDSPARK_HISTORY_WINDOW", "40"))
+
+
+class Message(namedtuple("Message", ["role", "content"])):
+    __slots__ = ()
+
+    def to_dict(self):
+        return {"role": self.role, "content": self.content}
+
+
+class _SpillDatabase:
+    """Process-wide cold storage: rows keyed by (store id, message index) in a private temp database."""
+
+    def __init__(self):
+        self._conn = None
+        self._lock = threading.Lock()
+        self._ids = count()
+
+    def _connection(self):
+        if self._conn is None:
+            # "" is a private on-disk temporary database, removed when the connection closes
+            self._conn = sqlite3.connect("", check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=OFF")
+            self._conn.execute("PRAGMA synchronous=OFF")
+            self._conn.execute("CREATE TABLE spill (store INTEGER, idx INTEGER, role TEXT, content TEXT, "
+                               "PRIMARY KEY (store, idx)) WITHOUT ROWID")
+        return self._conn
+
+    def new_id(self):
+        return next(self._ids)
+
+    def insert(self, store, start, messages):
+        rows = [(store, start + i, role, content) for i, (role, content) in enumerate(messages)]
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany("INSERT INTO spill VALUES (?, ?, ?, ?)", rows)
+
+    def select(self, store, start, stop):
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT role, content FROM spill WHERE store = ? AND idx >= ? AND idx < ? ORDER BY idx",
+                (store, start, stop),
+            ).fetchall()
+        return [Message(*row) for row in rows]
+
+    def delete(self, store):
+        with self._lock:
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute("DELETE FROM spill WHERE store = ?", (store,))
+
+
+_SPILL_DB = _SpillDatabase()
+
+
+class _SpillFile:
+    """Append-only cold storage of one MessageStore, kept in the shared spill database."""
+
+    def __init__(self):
+        self._id = _SPILL_DB.new_id()
+        self._count = 0
+        # Drop the rows once the store is gone; at interpreter exit the whole file goes anyway
+        self._finalizer = weakref.finalize(self, _SPILL_DB.delete, self._id)
+        self._finalizer.atexit = False
+
+    def __len__(self):
+        return self._count
+
+    def extend(self, messages):
+        _SPILL_DB.insert(self._id, self._count, messages)
+        self._count += len(messages)
+
+    def read(self, start, stop):
+        """Returns messages [start, stop) in one range scan."""
+        if start >= stop:
+            return []
+        return _SPILL_DB.select(self._id, start, stop)
+
+    def close(self):
+        self._finalizer()
+
+
+class MessageStore:
+    """
+    Chat history with a bounded in-memory window. Indexes are global (0 = first message ever),
+    so `page(before=...)` keeps working as older messages move to cold storage.
+    """
+
+    def __init__(self, window=None, spill_chunk=10):
+        self.window = window or HISTORY_WINDOW
+        self.spill_chunk = spill_chunk
+        self._hot = deque()
+        self._cold = None
+
+    def __len__(self):
+        return len(self._hot) + (len(self._cold) if self._cold is not None else 0)
+
+    def __iter__(self):
+        # Full history, oldest first (reads cold storage)
+        return iter(self.page(before=len(self), limit=len(self)))
+
+    def append(self, role, content):
+        self._hot.append(Message(role, content))
+        # Spill in chunks so the file is touched once every `spill_chunk` messages
+        if len(self._hot) >= self.window + self.spill_chunk:
+            if self._cold is None:
+                self._cold = _SpillFile()
+            self._cold.extend([self._hot.popleft() for _ in range(self.spill_chunk)])
+
+    def clear(self):
+        self._hot.clear()
+        if self._cold is not None:
+            self._cold.close()
+            self._cold = None
+
+    def recent(self, limit=None):
+        """The last `limit` (default: `window`) messages, from memory."""
+        limit = self.window if limit is None else limit
+        return list(islice(self._hot, max(0, len(self._hot) - limit), None))
+
+    def since(self, index):
+        """Messages from global index `index` onwards (e.g. the ones a turn just added)."""
+        return self.page(before=len(self), limit=len(self) - index)
+
+    def page(self, before=None, limit=None):
+        """Up to `limit` messages ending just before global index `before` (default: the end)."""
+        total = len(self)
+        before = total if before is None else max(0, min(before, total))
+        limit = self.window if limit is None else limit
+        start = max(0, before - limit)
+        hot_start = total - len(self._hot)
+
+        messages = []
+        if start < hot_start:
+            messages.extend(self._cold.read(start, min(before, hot_start)))
+        if before > hot_start:
+            messages.extend(islice(self._hot, max(start, hot_start) - hot_start, before - hot_start))
+        return messages
@@ -0,0 +1,316 @@
+"""
+Lightweight instrumentation for the chat pipeline: per-stage latency spans, histograms,
+counters and a Prometheus text exporter.
+
+Everything is off unless MINDSPARK_METRICS=1. When disabled, `timed` returns the function
+unchanged and `span`/`inc`/`observe` return immediately, so instrumented code pays
+essentially nothing. When enabled:
+
+    MINDSPARK_METRICS_PORT=9464       serve /metrics over HTTP (on MINDSPARK_METRICS_HOST, 127.0.0.1)
+    MINDSPARK_METRICS_FILE=path.prom  rewrite a textfile every MINDSPARK_METRICS_INTERVAL s (15)
+"""
+import asyncio
+import bisect
+import contextlib
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ENABLED = os.getenv("MINDSPARK_METRICS", "0") == "1"
+
+PREFIX = "mindspark_"
+
+# Upper bounds in seconds; covers cache hits (<1 ms) up to Gemini deadlines (10 s)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative Prometheus buckets plus a window of recent samples for live percentiles."""
+
+    def __init__(self, buckets=BUCKETS, window=2048):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def percentiles(self, points=(50, 95, 99)):
+        samples = sorted(self.recent)
+        if not samples:
+            return {p: None for p in points}
+        return {p: samples[min(len(samples) - 1, int(len(samples) * p / 100))] for p in points}
+
+
+class MetricsRegistry:
+    """Thread-safe store of named histograms, counters and gauges, each keyed by its label set."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    def snapshot(self):
+        """Returns {"histograms": [...], "counters": [...], "gauges": [...]} with labels, counts and percentiles."""
+        with self._lock:
+            histograms = [
+                {"name": name, "labels": dict(labels), "count": h.count, "sum": h.sum, **{
+                    f"p{p}": v for p, v in h.percentiles().items()
+                }}
+                for (name, labels), h in sorted(self._histograms.items())
+            ]
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            gauges = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._gauges.items())
+            ]
+        return {"histograms": histograms, "counters": counters, "gauges": gauges}
+
+    def render_prometheus(self):
+        """Returns every metric in the Prometheus text exposition format."""
+        def fmt_labels(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{str(v)}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            seen = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                metric = f"{PREFIX}{name}_total"
+                if metric not in seen:
+                    seen.add(metric)
+                    lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric}{fmt_labels(labels)} {value}")
+
+            for (name, labels), value in sorted(self._gauges.items()):
+                metric = f"{PREFIX}{name}"
+                if metric not in seen:
+                    seen.add(metric)
+                    lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric}{fmt_labels(labels)} {value}")
+
+            for (name, labels), h in sorted(self._histograms.items()):
+                metric = f"{PREFIX}{name}_seconds"
+                if metric not in seen:
+                    seen.add(metric)
+                    lines.append(f"# TYPE {metric} histogram")
+                cumulative = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    lines.append(f"{metric}_bucket{fmt_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{metric}_bucket{fmt_labels(labels, [('le', '+Inf')])} {h.count}")
+                lines.append(f"{metric}_sum{fmt_labels(labels)} {h.sum:.6f}")
+                lines.append(f"{metric}_count{fmt_labels(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+# --- Instrumentation API ---
+
+def inc(name, amount=1, **labels):
+    """Adds `amount` to the counter `name` (exported as mindspark_<name>_total)."""
+    if ENABLED:
+        REGISTRY.inc(name, amount, **labels)
+
+
+def gauge(name, value, **labels):
+    """Sets the gauge `name` to its current `value` (exported as mindspark_<name>)."""
+    if ENABLED:
+        REGISTRY.set(name, value, **labels)
+
+
+def observe(stage, seconds):
+    """Records one latency sample for `stage` (exported as mindspark_stage_seconds)."""
+    if ENABLED:
+        REGISTRY.observe("stage", seconds, stage=stage)
+
+
+class _Span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        REGISTRY.observe("stage", time.perf_counter() - self.start, stage=self.stage)
+        return False
+
+
+_NOOP_SPAN = contextlib.nullcontext()
+
+
+def span(stage):
+    """Context manager timing the enclosed block as one sample of `stage`."""
+    return _Span(stage) if ENABLED else _NOOP_SPAN
+
+
+def timed(stage=None):
+    """
+    Decorator timing every call of a function (sync, async or generator) under `stage`,
+    which defaults to the function name. Exceptions are timed too. Generators are timed
+    until they are exhausted or closed.
+    """
+    def decorator(fn):
+        if not ENABLED:
+            return fn
+        name = stage or fn.__name__
+
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def generator_wrapper(*args, **kwargs):
+                with _Span(name):
+                    yield from fn(*args, **kwargs)
+            return generator_wrapper
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with _Span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def stage_percentiles():
+    """Returns one row per stage: {"stage", "count", "p50_ms", "p95_ms", "p99_ms"}."""
+    rows = []
+    for h in REGISTRY.snapshot()["histograms"]:
+        if h["name"] != "stage":
+            continue
+        row = {"stage": h["labels"]["stage"], "count": h["count"]}
+        for p in (50, 95, 99):
+            value = h[f"p{p}"]
+            row[f"p{p}_ms"] = round(value * 1000, 2) if value is not None else None
+        rows.append(row)
+    return rows
+
+
+def counters():
+    """Returns {"name{label=value,...}": value} for every counter and gauge."""
+    result = {}
+    snapshot = REGISTRY.snapshot()
+    for c in snapshot["counters"] + snapshot["gauges"]:
+        labels = ",".join(f"{k}={v}" for k, v in c["labels"].items())
+        result[f"{c['name']}{{{labels}}}" if labels else c["name"]] = c["value"]
+    return result
+
+
+# --- Exporters ---
+
+def write_textfile(path):
+    """Writes the Prometheus text format to `path` atomically (node_exporter textfile style)."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(REGISTRY.render_prometheus())
+    os.replace(tmp, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_EXPORTER_LOCK = threading.Lock()
+_EXPORTER_STARTED = False
+
+
+def start_exporters():
+    """Starts the HTTP endpoint and/or textfile writer configured by env; safe to call repeatedly."""
+    global _EXPORTER_STARTED
+    if not ENABLED:
+        return
+    with _EXPORTER_LOCK:
+        if _EXPORTER_STARTED:
+            return
+        _EXPORTER_STARTED = True
+
+    port = os.getenv("MINDSPARK_METRICS_PORT")
+    if port:
+        host = os.getenv("MINDSPARK_METRICS_HOST", "127.0.0.1")
+        try:
+            server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+        except OSError as e:
+            print(f"WARNING: Could not start the metrics endpoint on port {port}. Error: {e}")
+        else:
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+            print(f"INFO: Metrics served at http://{host}:{port}/metrics")
+
+    path = os.getenv("MINDSPARK_METRICS_FILE")
+    if path:
+        interval = float(os.getenv("MINDSPARK_METRICS_INTERVAL", "15"))
+
+        def _write_forever():
+            while True:
+                try:
+                    write_textfile(path)
+                except OSError as e:
+                    print(f"WARNING: Could not write metrics to {path}. Error: {e}")
+                time.sleep(interval)
+
+        threading.Thread(target=_write_forever, name="metrics-textfile", daemon=True).start()
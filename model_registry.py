@@ -0,0 +1,114 @@
+import threading
+import time
+
+
+# --- Lazy Model Registry ---
+# Heavy resources (the emotion pipeline, the Gemini client) are registered with a
+# loader function and only built on first use or by the background warmup thread.
+
+PENDING, LOADING, READY, FAILED = "pending", "loading", "ready", "failed"
+
+
+class _Entry:
+    __slots__ = ("name", "loader", "value", "state", "error", "load_time", "event", "lock")
+
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.value = None
+        self.state = PENDING
+        self.error = None
+        self.load_time = None
+        self.event = threading.Event()
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    """Loads registered models on demand and keeps track of their load state."""
+
+    def __init__(self):
+        self._entries = {}
+        self._warmup_thread = None
+        self._background = set()  # names whose load ensure_loading() has started
+        self._lock = threading.Lock()
+
+    def register(self, name, loader):
+        """Registers a zero-argument loader under `name` without calling it."""
+        self._entries[name] = _Entry(name, loader)
+
+    def _load(self, entry):
+        # Only one thread runs the loader; everyone else waits on the event.
+        with entry.lock:
+            if entry.state in (READY, FAILED):
+                return
+            entry.state = LOADING
+            start = time.perf_counter()
+            try:
+                entry.value = entry.loader()
+                if entry.value is None:
+                    entry.error = "loader returned None"
+                entry.state = READY if entry.value is not None else FAILED
+            except Exception as e:
+                entry.error = str(e)
+                entry.state = FAILED
+            entry.load_time = time.perf_counter() - start
+            entry.event.set()
+
+        if entry.state == READY:
+            print(f"INFO: Model '{entry.name}' loaded in {entry.load_time:.2f}s.")
+        else:
+            print(f"WARNING: Model '{entry.name}' failed to load. Error: {entry.error}")
+
+    def get(self, name, wait=True, timeout=None):
+        """
+        Returns the loaded model, or None if it failed to load.
+        With wait=False, returns None immediately while the model is still loading.
+        """
+        entry = self._entries[name]
+        if entry.state == READY:
+            return entry.value
+        if entry.state == FAILED:
+            return None
+        if not wait:
+            return None
+        if entry.state == PENDING and not entry.lock.locked():
+            self._load(entry)
+        else:
+            entry.event.wait(timeout)
+        return entry.value if entry.state == READY else None
+
+    def is_ready(self, name):
+        return self._entries[name].state == READY
+
+    def ensure_loading(self, name):
+        """Starts loading `name` in a daemon thread if nothing has yet; never blocks."""
+        entry = self._entries[name]
+        if entry.state != PENDING:
+            return
+        with self._lock:
+            if name in self._background:
+                return
+            self._background.add(name)
+        threading.Thread(target=self._load, args=(entry,), name=f"model-load-{name}", daemon=True).start()
+
+    def warm_up(self, names=None):
+        """Loads the given models (all by default) in a daemon thread and returns immediately."""
+        if self._warmup_thread is not None:
+            return self._warmup_thread
+
+        targets = [self._entries[n] for n in (names or list(self._entries))]
+
+        def _run():
+            for entry in targets:
+                self._load(entry)
+
+        self._warmup_thread = threading.Thread(target=_run, name="model-warmup", daemon=True)
+        self._warmup_thread.start()
+        return self._warmup_thread
+
+    def status(self):
+        """Returns {name: {"state", "load_time", "error"}} for every registered model."""
+        return {
+            name: {"state": e.state, "load_time": e.load_time, "error": e.error}
+            for name, e in self._entries.items()
+        }
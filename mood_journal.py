@@ -0,0 +1,226 @@
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+
+# --- Persistent Mood Journal ---
+# Every detected mood is appended to a SQLite database in WAL mode. Chat turns only put the
+# entry on an in-memory queue; one writer thread drains it and commits whole batches in a
+# single transaction, so a turn never waits on disk. Readers use their own per-thread
+# connections and, thanks to WAL, are not blocked by the writer.
+
+JOURNAL_DB = os.getenv("MINDSPARK_JOURNAL_DB", "mood_journal.db")  # "" disables the journal
+# The user's message is only kept (for recent_text / the word cloud) when explicitly enabled
+JOURNAL_TEXT = os.getenv("MINDSPARK_JOURNAL_TEXT", "0") == "1"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mood_entries (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    user_id TEXT,
+    session_id TEXT NOT NULL,
+    user_role TEXT,
+    mood TEXT NOT NULL,
+    emoji TEXT,
+    text TEXT
+);
+-- Each index ends in mood, so distribution queries are range scans over the index
+-- alone (covering). History and recent_text scan the same range, then read each
+-- matching row from the table; indexing the message text too would copy it three times
+CREATE INDEX IF NOT EXISTS idx_mood_entries_user_ts ON mood_entries (user_id, ts, mood);
+CREATE INDEX IF NOT EXISTS idx_mood_entries_session_ts ON mood_entries (session_id, ts, mood);
+CREATE INDEX IF NOT EXISTS idx_mood_entries_ts ON mood_entries (ts, mood);
+"""
+
+_INSERT = ("INSERT INTO mood_entries (ts, user_id, session_id, user_role, mood, emoji, text) "
+           "VALUES (?, ?, ?, ?, ?, ?, ?)")
+
+_FLUSH = object()
+
+
+def _where(user_id=None, session_id=None, since=None, until=None):
+    """Builds the WHERE clause shared by the query methods (user/session equality, then a ts range)."""
+    clauses, params = [], []
+    if user_id is not None:
+        clauses.append("user_id = ?")
+        params.append(user_id)
+    if session_id is not None:
+        clauses.append("session_id = ?")
+        params.append(session_id)
+    if since is not None:
+        clauses.append("ts >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("ts < ?")
+        params.append(until)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+class MoodJournal:
+    """Batched, non-blocking writer and indexed query API over the mood journal database."""
+
+    def __init__(self, path, batch_size=256, flush_interval=0.5, max_queue=10000, store_text=JOURNAL_TEXT):
+        self.path = path
+        self.store_text = store_text
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writer = None
+        self._schema_ready = False
+        self.stats = {"queued": 0, "written": 0, "batches": 0, "dropped": 0, "errors": 0}
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL only syncs at checkpoints: a power cut may lose the last batches,
+        # never corrupt the file
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock:
+            if not self._schema_ready:
+                conn.executescript(_SCHEMA)
+                self._schema_ready = True
+        return conn
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # --- Writes ---
+
+    def _ensure_writer(self):
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run, name="mood-journal-writer", daemon=True)
+                self._writer.start()
+
+    def record(self, session_id, mood, emoji=None, text=None, user_id=None, user_role=None, ts=None):
+        """
+        Queues one journal entry. Never blocks: if the writer has fallen far behind, the entry is
+        dropped. `text` is only stored when the journal was created with store_text=True.
+        """
+        if not self.store_text:
+            text = None
+        entry = (ts if ts is not None else time.time(), user_id, session_id, user_role, mood, emoji, text)
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.stats["dropped"] += 1
+            if self.stats["dropped"] == 1:
+                print("WARNING: Mood journal queue is full; dropping entries until the writer catches up.")
+            return
+        self.stats["queued"] += 1
+        self._ensure_writer()
+
+    def flush(self, timeout=5.0):
+        """
+        Blocks until every entry queued so far is committed (for shutdown, scripts and benchmarks).
+        Returns False if that took longer than `timeout`, including waiting for room in a full queue.
+        """
+        if self._writer is None:
+            return True
+        deadline = time.monotonic() + timeout
+        done = threading.Event()
+        try:
+            self._queue.put((_FLUSH, done), timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(max(0.0, deadline - time.monotonic()))
+
+    def _collect(self):
+        # Block for the first entry, then keep taking entries until the batch is full or
+        # flush_interval has passed, so a burst of turns becomes one transaction
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and batch[-1][0] is not _FLUSH:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        conn = None
+        while True:
+            batch = self._collect()
+            rows = [entry for entry in batch if entry[0] is not _FLUSH]
+            if rows:
+                try:
+                    if conn is None:
+                        conn = self._connect()
+                    with conn:
+                        conn.executemany(_INSERT, rows)
+                    self.stats["written"] += len(rows)
+                    self.stats["batches"] += 1
+                except sqlite3.Error as e:
+                    self.stats["errors"] += 1
+                    print(f"ERROR: Mood journal write of {len(rows)} entries failed. Error: {e}")
+            for entry in batch:
+                if entry[0] is _FLUSH:
+                    entry[1].set()
+
+    # --- Queries ---
+
+    def mood_history(self, user_id=None, session_id=None, since=None, until=None, limit=100):
+        """The most recent entries (newest first) as dicts with ts, session_id, mood, emoji and text."""
+        where, params = _where(user_id, session_id, since, until)
+        rows = self._reader().execute(
+            f"SELECT ts, session_id, user_role, mood, emoji, text FROM mood_entries{where} ORDER BY ts DESC LIMIT ?",
+            params + [limit],
+        ).fetchall()
+        keys = ("ts", "session_id", "user_role", "mood", "emoji", "text")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def mood_distribution(self, user_id=None, session_id=None, since=None, until=None, bucket=None):
+        """
+        Mood counts in [since, until). Without `bucket` returns {mood: count}; with `bucket`
+        (seconds, e.g. 86400 for days) returns {bucket_start_ts: {mood: count}}, oldest first.
+        """
+        where, params = _where(user_id, session_id, since, until)
+        conn = self._reader()
+        if bucket is None:
+            rows = conn.execute(f"SELECT mood, COUNT(*) FROM mood_entries{where} GROUP BY mood", params)
+            return dict(rows.fetchall())
+
+        distribution = {}
+        rows = conn.execute(
+            f"SELECT CAST(ts / ? AS INTEGER) AS b, mood, COUNT(*) FROM mood_entries{where} GROUP BY b, mood ORDER BY b",
+            [bucket] + params,
+        )
+        for b, mood, count in rows:
+            distribution.setdefault(b * bucket, {})[mood] = count
+        return distribution
+
+    def recent_text(self, user_id=None, session_id=None, since=None, limit=200):
+        """Text of the most recent entries, newest first (e.g. the input of a word cloud)."""
+        where, params = _where(user_id, session_id, since)
+        where += (" AND " if where else " WHERE ") + "text IS NOT NULL"
+        rows = self._reader().execute(
+            f"SELECT text FROM mood_entries{where} ORDER BY ts DESC LIMIT ?", params + [limit]
+        )
+        return [text for (text,) in rows]
+
+    def close(self):
+        self.flush()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+JOURNAL = MoodJournal(JOURNAL_DB) if JOURNAL_DB else None
+
+if JOURNAL is not None:
+    # Commit whatever is still queued when the process exits normally
+    atexit.register(JOURNAL.flush, 2.0)
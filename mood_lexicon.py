@@ -0,0 +1,136 @@
+import re
+
+
+# --- Weighted Mood Lexicon (first stage of the detect_mood cascade) ---
+# Each term carries a weight toward one mood. Terms ending in "*" also match any word that
+# starts with them ("depress*" -> "depressed", "depressing"). Terms are compiled into a word
+# trie plus a stem map, so scoring is one pass over the words. A negation word up to three
+# words before a term ("not happy", "don't feel angry") moves half of its weight to
+# NEGATED_MOOD instead.
+
+LEXICON = {
+    "Stressed": {
+        "stress*": 3.0, "distress*": 3.0, "overwhelm*": 3.0, "burnout": 3.0, "burnt out": 3.0,
+        "burned out": 3.0, "pressure": 2.0, "deadline*": 1.5, "exam*": 1.0, "overwork*": 2.5,
+        "exhausted": 2.0, "swamped": 2.5, "frazzled": 2.5, "tense": 2.0, "too much": 1.5,
+        "cant cope": 3.0, "no time": 1.5, "workload": 2.0,
+    },
+    "Depressed": {
+        "sad*": 3.0, "depress*": 3.0, "hopeless*": 3.0, "miserable": 3.0, "empty": 2.0,
+        "worthless": 3.0, "unhappy": 3.0, "heartbroken": 3.0, "grief": 3.0, "griev*": 3.0,
+        "cry*": 2.5, "cried": 2.5, "tears": 2.0, "lonely": 2.5, "alone": 1.5, "numb": 2.0,
+        "down": 1.0, "low": 1.0, "blue": 1.0, "gloomy": 2.5, "upset": 2.0, "lost": 1.0,
+        "broken": 2.0, "miss": 1.0, "misses": 1.0, "missing": 1.0,
+    },
+    "Happy": {
+        "happy": 3.0, "happi*": 3.0, "joy*": 3.0, "glad": 3.0, "great": 2.0, "awesome": 2.5,
+        "amazing": 2.5, "wonderful": 2.5, "excited": 3.0, "exciting": 2.0, "thrilled": 3.0,
+        "delighted": 3.0, "cheerful": 3.0, "grateful": 2.5, "thankful": 2.5, "proud": 2.5,
+        "love": 1.5, "loving": 1.5, "fantastic": 2.5, "celebrat*": 2.5, "good": 1.0,
+        "fine": 0.5, "relaxed": 1.5, "yay": 3.0, "won": 1.5,
+    },
+    "Angry": {
+        "angry": 3.0, "anger": 3.0, "furious": 3.0, "mad": 2.5, "rage": 3.0, "raging": 3.0,
+        "pissed": 3.0, "annoy*": 2.0, "irritat*": 2.0, "frustrat*": 2.5, "infuriat*": 3.0,
+        "hate": 2.5, "hated": 2.5, "livid": 3.0, "outraged": 3.0, "resent*": 2.5,
+        "disgust*": 2.5, "fed up": 2.5,
+    },
+    "Fear": {
+        "afraid": 3.0, "scared": 3.0, "fear*": 3.0, "terrified": 3.0, "terrifying": 3.0,
+        "frighten*": 3.0, "panic*": 3.0, "anxious": 3.0, "anxiety": 3.0, "nervous": 2.5,
+        "worried": 2.5, "worry": 2.0, "worrying": 2.0, "dread*": 2.5, "uneasy": 2.0,
+        "what if": 1.0,
+    },
+}
+
+MOOD_EMOJI = {
+    "Stressed": "😫", "Depressed": "😔", "Sad": "😔", "Happy": "😀",
+    "Angry": "😡", "Fear": "😨", "Neutral": "😐",
+}
+
+NEGATIONS = ["not", "never", "no", "dont", "don't", "isnt", "isn't", "wasnt", "wasn't",
+             "arent", "aren't", "cant", "can't", "cannot", "hardly", "barely", "aint", "ain't"]
+
+# "not happy" leans sad; "not angry"/"not stressed" only leans neutral
+NEGATED_MOOD = {"Happy": "Depressed"}
+
+
+_WORD = re.compile(r"[\w']+")
+
+
+def _compile(lexicon):
+    # Token trie: {word: {"": (mood, weight), next_word: {...}}}; stems live in a separate
+    # {prefix: (mood, weight)} map checked against each word's leading characters.
+    trie, stems = {}, {}
+    for mood, weights in lexicon.items():
+        for term, weight in weights.items():
+            if term.endswith("*"):
+                stems[term[:-1]] = (mood, weight)
+                continue
+            node = trie
+            for word in term.split():
+                node = node.setdefault(word, {})
+            node[""] = (mood, weight)
+    stem_lengths = sorted({len(stem) for stem in stems}, reverse=True)
+    return trie, stems, stem_lengths
+
+
+class MoodLexicon:
+    """Scores a text against the weighted lexicon in a single pass over its words."""
+
+    def __init__(self, lexicon=LEXICON, negation_window=3):
+        self._trie, self._stems, self._stem_lengths = _compile(lexicon)
+        self._negations = {n.replace("'", "") for n in NEGATIONS}
+        self.negation_window = negation_window
+
+    def _match_at(self, words, i):
+        # Longest multi-word term starting at words[i], then the longest matching stem
+        node, found, end = self._trie, None, i
+        for j in range(i, len(words)):
+            node = node.get(words[j])
+            if node is None:
+                break
+            if "" in node:
+                found, end = node[""], j + 1
+        if found is not None:
+            return found, end
+        word = words[i]
+        for length in self._stem_lengths:
+            if length <= len(word):
+                hit = self._stems.get(word[:length])
+                if hit is not None:
+                    return hit, i + 1
+        return None, i + 1
+
+    def scores(self, text):
+        """Returns {mood: score} for every mood with at least one matching term."""
+        words = [w.replace("'", "") for w in _WORD.findall(text.lower())]
+        scores = {}
+        last_negation = -self.negation_window - 1
+        i = 0
+        while i < len(words):
+            hit, next_i = self._match_at(words, i)
+            if hit is None and words[i] in self._negations:
+                # Negation words can still start a term of their own ("cant cope", "no time")
+                last_negation = i
+            elif hit is not None:
+                mood, weight = hit
+                if i - last_negation <= self.negation_window:
+                    mood, weight = NEGATED_MOOD.get(mood, "Neutral"), weight / 2
+                scores[mood] = scores.get(mood, 0.0) + weight
+            i = next_i
+        return scores
+
+    def classify(self, text):
+        """
+        Returns (mood, emoji, confidence) for the best-scoring mood, or None if nothing matched.
+        Confidence grows with the winning score and shrinks when another mood is close behind.
+        """
+        scores = self.scores(text)
+        if not scores:
+            return None
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        mood, top = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        confidence = (top - runner_up) / (top + 1.0)
+        return mood, MOOD_EMOJI.get(mood, "😐"), confidence
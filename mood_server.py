@@ -0,0 +1,218 @@
+"""
+Shared emotion model server for multi-worker deployments.
+
+Loads the emotion classifier once per node and serves every Streamlit worker process over a
+Unix socket, batching requests from all connections together. Start it with
+
+    python -m mood_server --socket /tmp/mindspark-emotion.sock
+
+and point the workers at it with MINDSPARK_EMOTION_SERVER=/tmp/mindspark-emotion.sock. If the
+server is unreachable, workers fall back to loading the model in-process.
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+
+from inference_batcher import MicroBatcher
+
+DEFAULT_SOCKET = "/tmp/mindspark-emotion.sock"
+
+# --- Wire Protocol ---
+# Each message is a 4-byte big-endian length followed by a UTF-8 JSON object.
+#   {"texts": [...]}  ->  {"results": [{"label": ..., "score": ...}, ...]}
+#   {"ping": true}    ->  {"ok": true, "backend": ...}
+# Errors come back as {"error": "..."}.
+
+_HEADER = struct.Struct(">I")
+
+
+def _recv_exact(sock, size):
+    chunks, remaining = [], size
+    while remaining:
+        chunk = sock.recv(remaining)
+        if not chunk:
+            raise ConnectionError("connection closed")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def send_message(sock, payload):
+    body = json.dumps(payload).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(body)) + body)
+
+
+def recv_message(sock):
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    return json.loads(_recv_exact(sock, size))
+
+
+# --- Server ---
+
+def _first_result(result):
+    return result[0] if isinstance(result, list) else result
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server = self.server
+        while True:
+            try:
+                request = recv_message(self.request)
+            except (ConnectionError, OSError):
+                return
+            try:
+                if request.get("ping"):
+                    response = {"ok": True, "backend": server.backend}
+                else:
+                    # Texts from every connection share the batcher, so concurrent workers
+                    # are classified together in one padded forward pass.
+                    futures = server.batcher.submit_many(request["texts"])
+                    response = {"results": [future.result() for future in futures]}
+            except Exception as e:
+                response = {"error": str(e)}
+            try:
+                send_message(self.request, response)
+            except OSError:
+                return
+
+
+class MoodServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    # Every worker thread of every app process may connect at once
+    request_queue_size = 128
+
+    def __init__(self, socket_path, detector, backend, max_batch_size=32, max_wait_ms=5.0):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, _Handler)
+        os.chmod(socket_path, 0o660)
+        self.backend = backend
+
+        def _classify(texts):
+            return [_first_result(r) for r in detector(texts, batch_size=len(texts), padding=True, truncation=True)]
+
+        self.batcher = MicroBatcher(_classify, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms,
+                                    name="mood-server-batcher")
+
+
+# --- Client ---
+
+class RemoteEmotionClassifier:
+    """
+    Calls the shared model server; behaves like the local pipeline (a list of texts in,
+    one {"label", "score"} dict per text out). When the server can't be reached it loads
+    the model in-process with `fallback_loader` and retries the server every `retry_after` s.
+    """
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, fallback_loader=None, timeout=10.0, retry_after=30.0):
+        self.socket_path = socket_path
+        self.fallback_loader = fallback_loader
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._local = threading.local()
+        self._fallback = None
+        self._fallback_lock = threading.Lock()
+        self._down_since = None
+
+    def _connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+
+    def _drop_connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def _request(self, payload):
+        # One reconnect attempt covers a server restart between calls
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                send_message(sock, payload)
+                response = recv_message(sock)
+                break
+            except (ConnectionError, OSError):
+                self._drop_connection()
+                if attempt:
+                    raise
+        if "error" in response:
+            raise RuntimeError(f"mood server error: {response['error']}")
+        return response
+
+    def ping(self):
+        """Returns True if the server answers."""
+        try:
+            return bool(self._request({"ping": True}).get("ok"))
+        except (ConnectionError, OSError, RuntimeError):
+            return False
+
+    def _get_fallback(self):
+        with self._fallback_lock:
+            if self._fallback is None:
+                print("WARNING: Emotion model server unavailable; loading the model in-process.")
+                self._fallback = self.fallback_loader()
+        return self._fallback
+
+    def __call__(self, texts, **kwargs):
+        if isinstance(texts, str):
+            texts = [texts]
+        server_down = self._down_since is not None and time.monotonic() - self._down_since < self.retry_after
+        if not server_down:
+            try:
+                results = self._request({"texts": list(texts)})["results"]
+                self._down_since = None
+                return results
+            except (ConnectionError, OSError, RuntimeError) as e:
+                if self.fallback_loader is None:
+                    raise
+                print(f"WARNING: Emotion model server call failed. Error: {e}")
+                self._down_since = time.monotonic()
+        return [_first_result(r) for r in self._get_fallback()(texts, **kwargs)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=os.getenv("MINDSPARK_EMOTION_SERVER", DEFAULT_SOCKET))
+    parser.add_argument("--backend", default=os.getenv("MINDSPARK_EMOTION_BACKEND", "torch"), choices=["torch", "onnx"])
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    from emotion_backends import load_local_detector
+
+    start = time.perf_counter()
+    detector = load_local_detector(args.backend)
+    print(f"INFO: Emotion model ({args.backend}) loaded in {time.perf_counter() - start:.2f}s.")
+
+    server = MoodServer(args.socket, detector, args.backend, args.max_batch_size, args.max_wait_ms)
+    print(f"INFO: Mood server listening on {args.socket}")
+    # Exit through the finally block (and remove the socket file) on SIGTERM as well
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
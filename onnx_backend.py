@@ -0,0 +1,189 @@
+"""
+Quantized ONNX Runtime backend for the emotion classifier.
+
+Runs an int8-quantized ONNX export of j-hartmann/emotion-english-distilroberta-base with
+ONNX Runtime and the `tokenizers` library, so neither PyTorch nor the transformers pipeline
+is loaded at serving time. Export the model once with:
+
+    python -m onnx_backend export --output models/emotion-onnx-int8
+
+validate it against the PyTorch model with
+
+    python -m benchmarks.bench_emotion_backends
+
+and select it with MINDSPARK_EMOTION_BACKEND=onnx (see chat_logic.py). An export that has no
+passing validation record is not used; the PyTorch pipeline is loaded instead.
+"""
+import argparse
+import hashlib
+import json
+import os
+
+DEFAULT_MODEL_NAME = "j-hartmann/emotion-english-distilroberta-base"
+DEFAULT_MODEL_DIR = os.path.join("models", "emotion-onnx-int8")
+
+# Written into the export directory by benchmarks/bench_emotion_backends.py
+VALIDATION_FILE = "validation.json"
+# Share of the benchmark corpus that must map to the same chatbot mood as the PyTorch model
+MIN_MOOD_AGREEMENT = 0.95
+
+
+class OnnxEmotionClassifier:
+    """
+    Drop-in replacement for the transformers text-classification pipeline: called with a
+    string or a list of strings, it returns one {"label", "score"} dict per text.
+    """
+
+    def __init__(self, model_dir=DEFAULT_MODEL_DIR, intra_op_threads=None, max_length=512):
+        import numpy as np
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self._np = np
+        model_path = self._find_model(model_dir)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+        with open(os.path.join(model_dir, "config.json"), "r", encoding="utf-8") as f:
+            config = json.load(f)
+        self.id2label = {int(i): label for i, label in config["id2label"].items()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        pad_token = "<pad>"
+        special_tokens_path = os.path.join(model_dir, "special_tokens_map.json")
+        if os.path.exists(special_tokens_path):
+            with open(special_tokens_path, "r", encoding="utf-8") as f:
+                pad = json.load(f).get("pad_token", pad_token)
+            pad_token = pad["content"] if isinstance(pad, dict) else pad
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id(pad_token), pad_token=pad_token)
+        self.tokenizer.enable_truncation(max_length=max_length)
+
+    @staticmethod
+    def _find_model(model_dir):
+        # Prefer the quantized export when both are present
+        for name in ("model_quantized.onnx", "model.onnx"):
+            path = os.path.join(model_dir, name)
+            if os.path.exists(path):
+                return path
+        raise FileNotFoundError(f"No ONNX model found in {model_dir}. Run `python -m onnx_backend export` first.")
+
+    def __call__(self, texts, **kwargs):
+        # Pipeline keyword arguments (batch_size, padding, truncation) are accepted and ignored:
+        # every call is already one padded, truncated batch.
+        if isinstance(texts, str):
+            texts = [texts]
+        np = self._np
+
+        encodings = self.tokenizer.encode_batch(texts)
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+        }
+        inputs = {name: value for name, value in inputs.items() if name in self._input_names}
+        logits = self.session.run(None, inputs)[0]
+
+        logits = logits - logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+        best = probs.argmax(axis=1)
+        return [{"label": self.id2label[int(i)], "score": float(probs[row, i])} for row, i in enumerate(best)]
+
+
+# --- Validation Record ---
+# The quantized model only serves traffic once the benchmark has shown, on the production
+# model, that it agrees with the PyTorch labels and is faster. The record is tied to the exact
+# .onnx file, so a re-export needs a new benchmark run.
+
+def model_digest(model_dir):
+    """Hex SHA-256 of the ONNX file OnnxEmotionClassifier would load from `model_dir`."""
+    h = hashlib.sha256()
+    with open(OnnxEmotionClassifier._find_model(model_dir), "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def write_validation(model_dir, reference_model, label_agreement, mood_agreement, results):
+    """Records a benchmark run in `model_dir`; returns the record (with "passed")."""
+    torch_p50, onnx_p50 = results["torch"]["single_p50_ms"], results["onnx"]["single_p50_ms"]
+    record = {
+        "reference_model": reference_model,
+        "model_sha256": model_digest(model_dir),
+        "label_agreement": label_agreement,
+        "mood_agreement": mood_agreement,
+        "torch_single_p50_ms": torch_p50,
+        "onnx_single_p50_ms": onnx_p50,
+        "torch_batched_msgs_per_s": results["torch"]["batched_msgs_per_s"],
+        "onnx_batched_msgs_per_s": results["onnx"]["batched_msgs_per_s"],
+        "passed": (reference_model == DEFAULT_MODEL_NAME and mood_agreement >= MIN_MOOD_AGREEMENT
+                   and onnx_p50 < torch_p50),
+    }
+    with open(os.path.join(model_dir, VALIDATION_FILE), "w", encoding="utf-8") as f:
+        json.dump(record, f, indent=2)
+    return record
+
+
+def validation_error(model_dir):
+    """Returns why the export in `model_dir` may not be used yet, or None if it passed validation."""
+    path = os.path.join(model_dir, VALIDATION_FILE)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            record = json.load(f)
+        digest = model_digest(model_dir)
+    except FileNotFoundError as e:
+        return f"{e.filename or path} not found"
+    except (OSError, ValueError) as e:
+        return f"{path} could not be read ({e})"
+    if record.get("reference_model") != DEFAULT_MODEL_NAME:
+        return f"it was validated against {record.get('reference_model')!r}, not {DEFAULT_MODEL_NAME}"
+    if record.get("model_sha256") != digest:
+        return "the model was re-exported after it was validated"
+    if not record.get("passed"):
+        return (f"validation failed (mood agreement {record.get('mood_agreement', 0.0):.1%}, p50 "
+                f"{record.get('onnx_single_p50_ms', 0.0):.1f} ms vs {record.get('torch_single_p50_ms', 0.0):.1f} ms for PyTorch)")
+    return None
+
+
+def export_quantized(model_name=DEFAULT_MODEL_NAME, output_dir=DEFAULT_MODEL_DIR):
+    """Exports the model to ONNX and applies dynamic int8 quantization (needs optimum + torch)."""
+    import tempfile
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    with tempfile.TemporaryDirectory() as export_dir:
+        model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True)
+        model.save_pretrained(export_dir)
+
+        quantizer = ORTQuantizer.from_pretrained(export_dir)
+        # Dynamic quantization: weights stored as int8, activations quantized on the fly
+        qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=output_dir, quantization_config=qconfig)
+
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(output_dir)
+    model.config.save_pretrained(output_dir)
+    print(f"INFO: Quantized ONNX model written to {output_dir}")
+    return output_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export = subparsers.add_parser("export", help="export and quantize the emotion model")
+    export.add_argument("--model", default=DEFAULT_MODEL_NAME)
+    export.add_argument("--output", default=DEFAULT_MODEL_DIR)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_quantized(args.model, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+
+import metrics
+from gemini_guard import GuardError
+
+
+# --- Gemini Request Gate: Single-Flight Coalescing and Admission Control ---
+# Sits in front of GeminiGuard. Identical requests already in flight are merged into one
+# upstream call whose result (or error) goes to every caller. Calls that do go upstream must
+# first be admitted: a token bucket caps the request rate, a counter caps concurrency, and
+# waiting calls are served highest priority first. A call that would wait longer than its
+# max_wait is rejected with AdmissionRejectedError, so the caller's fallback runs at once
+# instead of queueing behind a burst.
+
+PRIORITY_INTERACTIVE = 0   # a user is waiting on the answer
+PRIORITY_BACKGROUND = 10   # content pool refills
+
+
+class AdmissionRejectedError(GuardError):
+    """Raised when a call would wait longer than its max_wait for a rate or concurrency slot."""
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `burst`. A rate <= 0 means unlimited."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = max(1.0, burst if burst is not None else rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready(self):
+        return self.rate <= 0 or self.tokens >= 1
+
+    def take(self):
+        if self.rate > 0:
+            self.tokens -= 1
+
+    def seconds_until(self, count):
+        """Seconds until `count` tokens will have accumulated (0 if unlimited or already there)."""
+        if self.rate <= 0:
+            return 0.0
+        return max(0.0, (count - self.tokens) / self.rate)
+
+
+class _Waiter:
+    __slots__ = ("priority", "notify", "granted")
+
+    def __init__(self, priority, notify):
+        self.priority = priority
+        self.notify = notify
+        self.granted = False
+
+
+class RequestGate:
+    """Coalesces identical in-flight calls and admits the rest by rate, concurrency and priority."""
+
+    def __init__(self, max_concurrent=16, rate=0.0, burst=None, max_wait=1.0, max_queue=256):
+        self.max_concurrent = max_concurrent
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self._bucket = TokenBucket(rate, burst)
+        self._lock = threading.Lock()
+        self._queue = []  # heap of (priority, seq, _Waiter)
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._flights = {}  # key -> {priority: Future shared by every caller that joined it}
+        self.stats = {
+            "admitted": 0, "queued": 0, "rejected": 0, "timed_out": 0, "hedges_denied": 0,
+            "leaders": 0, "coalesced": 0, "max_queue_depth": 0, "wait_seconds": 0.0,
+        }
+
+    # --- Admission ---
+
+    def _dispatch_locked(self):
+        # Grant waiting calls in priority order while both a token and a slot are free
+        self._bucket.refill(time.monotonic())
+        while self._queue and self._in_flight < self.max_concurrent and self._bucket.ready():
+            _, _, waiter = heapq.heappop(self._queue)
+            self._in_flight += 1
+            self._bucket.take()
+            waiter.granted = True
+            waiter.notify()
+        metrics.gauge("gemini_queue_depth", len(self._queue))
+
+    def _enqueue(self, priority, max_wait, notify):
+        with self._lock:
+            ahead = sum(1 for p, _, _ in self._queue if p <= priority)
+            # Reject up front when the rate limit alone would keep this call waiting too long
+            if ahead >= self.max_queue or self._bucket.seconds_until(ahead + 1) > max_wait:
+                self.stats["rejected"] += 1
+                metrics.inc("gemini_admission", outcome="rejected")
+                raise AdmissionRejectedError(f"Gemini admission would wait longer than {max_wait:.2f}s ({ahead} calls ahead)")
+            waiter = _Waiter(priority, notify)
+            heapq.heappush(self._queue, (priority, next(self._seq), waiter))
+            self._dispatch_locked()
+            if not waiter.granted:
+                self.stats["queued"] += 1
+                self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], len(self._queue))
+            return waiter
+
+    def _retry_delay(self):
+        # Nothing else wakes a waiter when tokens refill, so poll on the refill schedule
+        with self._lock:
+            return max(0.001, self._bucket.seconds_until(1)) if not self._bucket.ready() else None
+
+    def _give_up(self, waiter):
+        """Drops a waiter that timed out; returns True if it was granted in the meantime."""
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._queue = [entry for entry in self._queue if entry[2] is not waiter]
+            heapq.heapify(self._queue)
+            self.stats["timed_out"] += 1
+            metrics.gauge("gemini_queue_depth", len(self._queue))
+        metrics.inc("gemini_admission", outcome="timed_out")
+        return False
+
+    def _admitted(self, start):
+        waited = time.monotonic() - start
+        with self._lock:
+            self.stats["admitted"] += 1
+            self.stats["wait_seconds"] += waited
+        metrics.inc("gemini_admission", outcome="admitted")
+        if waited > 0.001:
+            metrics.observe("gemini_admission_wait", waited)
+
+    def acquire(self, priority=PRIORITY_INTERACTIVE, max_wait=None):
+        """Blocks until the call may go upstream; raises AdmissionRejectedError after `max_wait` seconds."""
+        max_wait = self.max_wait if max_wait is None else max_wait
+        start = time.monotonic()
+        event = threading.Event()
+        waiter = self._enqueue(priority, max_wait, event.set)
+        try:
+            while not waiter.granted:
+                remaining = start + max_wait - time.monotonic()
+                if remaining <= 0:
+                    if not self._give_up(waiter):
+                        raise AdmissionRejectedError(f"No Gemini slot within {max_wait:.2f}s")
+                    break
+                retry = self._retry_delay()
+                event.wait(remaining if retry is None else min(remaining, retry))
+                with self._lock:
+                    self._dispatch_locked()
+        except AdmissionRejectedError:
+            raise
+        except BaseException:
+            if self._give_up(waiter):
+                self.release()
+            raise
+        self._admitted(start)
+
+    async def acquire_async(self, priority=PRIORITY_INTERACTIVE, max_wait=None):
+        """Async version of acquire()."""
+        max_wait = self.max_wait if max_wait is None else max_wait
+        loop = asyncio.get_running_loop()
+        start = time.monotonic()
+        granted = loop.create_future()
+
+        def notify():
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(True))
+
+        waiter = self._enqueue(priority, max_wait, notify)
+        try:
+            while not waiter.granted:
+                remaining = start + max_wait - time.monotonic()
+                if remaining <= 0:
+                    if not self._give_up(waiter):
+                        raise AdmissionRejectedError(f"No Gemini slot within {max_wait:.2f}s")
+                    break
+                retry = self._retry_delay()
+                await asyncio.wait([granted], timeout=remaining if retry is None else min(remaining, retry))
+                with self._lock:
+                    self._dispatch_locked()
+        except AdmissionRejectedError:
+            raise
+        except BaseException:
+            # Cancelled while queued (e.g. the client went away): leave the queue or hand the slot back
+            if self._give_up(waiter):
+                self.release()
+            raise
+        self._admitted(start)
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+            self._dispatch_locked()
+
+    def try_take_token(self):
+        """Takes a rate token without queueing (for hedged retries); False if none is left."""
+        with self._lock:
+            self._bucket.refill(time.monotonic())
+            if self._bucket.ready():
+                self._bucket.take()
+                return True
+            self.stats["hedges_denied"] += 1
+            return False
+
+    # --- Single-Flight ---
+
+    def _join(self, key, priority):
+        """Returns (flight, is_leader); the leader makes the upstream call for everyone."""
+        with self._lock:
+            flights = self._flights.setdefault(key, {})
+            # Only join a flight at least as urgent as this call: a chat turn riding on a queued
+            # pool refill would wait for the refill's much longer max_wait instead of its own
+            for flight_priority, flight in flights.items():
+                if flight_priority <= priority:
+                    self.stats["coalesced"] += 1
+                    metrics.inc("gemini_coalesced")
+                    return flight, False
+            flight = flights[priority] = Future()
+            # A running Future cannot be cancelled by one impatient waiter
+            flight.set_running_or_notify_cancel()
+            self.stats["leaders"] += 1
+            return flight, True
+
+    def _land(self, key, priority, flight, result=None, error=None):
+        with self._lock:
+            flights = self._flights.get(key, {})
+            flights.pop(priority, None)
+            if not flights:
+                self._flights.pop(key, None)
+        if error is not None:
+            # A cancelled leader must not cancel the waiters; they fall back instead
+            flight.set_exception(error if isinstance(error, Exception) else GuardError("coalesced call was cancelled"))
+        else:
+            flight.set_result(result)
+
+    def call(self, key, fn, priority=PRIORITY_INTERACTIVE, max_wait=None):
+        """Runs `fn()` once per `key` at a time under admission control; concurrent callers share the result."""
+        flight, leader = self._join(key, priority)
+        if not leader:
+            return flight.result()
+        try:
+            self.acquire(priority, max_wait)
+            try:
+                result = fn()
+            finally:
+                self.release()
+        except BaseException as e:
+            self._land(key, priority, flight, error=e)
+            raise
+        self._land(key, priority, flight, result)
+        return result
+
+    async def call_async(self, key, coro_fn, priority=PRIORITY_INTERACTIVE, max_wait=None):
+        """Async version of call(); sync and async callers of the same key share one flight."""
+        flight, leader = self._join(key, priority)
+        if not leader:
+            return await asyncio.shield(asyncio.wrap_future(flight))
+        try:
+            await self.acquire_async(priority, max_wait)
+            try:
+                result = await coro_fn()
+            finally:
+                self.release()
+        except BaseException as e:
+            self._land(key, priority, flight, error=e)
+            raise
+        self._land(key, priority, flight, result)
+        return result
+
+    def metrics(self):
+        """Returns queue depth, in-flight calls and admission/coalescing counters as a flat dict."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats.update({"queue_depth": len(self._queue), "in_flight": self._in_flight,
+                          "coalescing_keys": len(self._flights)})
+        admitted = stats["admitted"]
+        stats["mean_wait_seconds"] = stats.pop("wait_seconds") / admitted if admitted else 0.0
+        return stats
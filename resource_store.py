@@ -0,0 +1,351 @@
+import hashlib
+import json
+import marshal
+import os
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+import metrics
+
+
+# --- Compiled Resource Snapshots ---
+# mood_media.json, quotes.json and exercises.json are validated once and compiled into a
+# ResourceSnapshot: read-only mappings plus everything derived from them (the per-mood media
+# index and the mood -> exercise map). Compiled snapshots are marshalled (plain dicts, tuples
+# and strings only; unlike pickle, loading one never runs code) to a cache directory keyed by
+# the SHA-256 of the raw files, so a restart with unchanged files skips parsing and compiling.
+# A watcher thread polls the files' mtimes and swaps in a new snapshot when they change;
+# readers grab `store.snapshot` once and see one consistent version.
+
+RESOURCE_DIR = os.getenv("MINDSPARK_RESOURCE_DIR", os.path.dirname(os.path.abspath(__file__)))
+RESOURCE_FILES = {
+    "media": os.path.join("resources", "mood_media.json"),
+    "quotes": os.path.join("resources", "quotes.json"),
+    "exercises": "exercises.json",
+}
+# Bump when the compiled layout changes so stale cached snapshots are ignored
+SNAPSHOT_VERSION = 2
+
+DEFAULT_QUOTES = ("Stay positive!", "You are stronger than you think!")
+
+RELATED_MOODS = {
+    "Sad": ["Sad", "Neutral", "Cheerful"],
+    "Depressed": ["Sad", "Neutral", "Cheerful"],
+    "Angry": ["Angry", "Neutral", "Happy"],
+    "Fear": ["Fear", "Neutral", "Happy"],
+    "Stressed": ["Stressed", "Neutral", "Happy"],
+    "Guilt": ["Guilt", "Neutral", "Happy"],
+    "Lonely": ["Lonely", "Neutral", "Cheerful"]
+}
+
+MoodMedia = namedtuple("MoodMedia", ["quotes", "songs", "movies", "videos"])
+
+ResourceSnapshot = namedtuple("ResourceSnapshot", [
+    "media_data",         # {mood: {"songs": (...), "movies": (...), "videos": (...)}}
+    "quotes",             # {mood: (quote, ...)}
+    "exercises",          # {key: {"title": str, "steps": (...), "target_moods": (...)}}
+    "media_index",        # {mood: MoodMedia}
+    "exercises_by_mood",  # {mood: first exercise targeting it}
+    "digest",             # SHA-256 of the raw files the snapshot was compiled from
+])
+
+MEDIA_KINDS = ("songs", "movies", "videos")
+
+
+class ResourceError(ValueError):
+    """A resource file is not valid JSON or does not have the expected shape."""
+
+
+def get_related_moods(mood):
+    return RELATED_MOODS.get(mood, [mood, "Neutral", "Happy"])
+
+
+def youtube_search_link(name):
+    if name:
+        return f"https://www.youtube.com/results?search_query={name.replace(' ', '+')}"
+    return None
+
+
+# --- Validation ---
+# Each validator returns a normalized copy (lists become tuples, unknown keys are dropped)
+# or raises ResourceError naming the offending entry.
+
+def _string_list(value, where):
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ResourceError(f"{where} must be a list of strings")
+    return tuple(value)
+
+
+def _object(value, where):
+    if not isinstance(value, dict):
+        raise ResourceError(f"{where} must be a JSON object")
+    return value
+
+
+def validate_media(data, name="mood_media.json"):
+    media = {}
+    for mood, entry in _object(data, name).items():
+        entry = _object(entry, f"{name}: {mood!r}")
+        media[mood] = {kind: _string_list(entry.get(kind, []), f"{name}: {mood}.{kind}") for kind in MEDIA_KINDS}
+    return media
+
+
+def validate_quotes(data, name="quotes.json"):
+    return {mood: _string_list(quotes, f"{name}: {mood!r}") for mood, quotes in _object(data, name).items()}
+
+
+def validate_exercises(data, name="exercises.json"):
+    exercises = {}
+    for key, entry in _object(data, name).items():
+        entry = _object(entry, f"{name}: {key!r}")
+        if not isinstance(entry.get("title"), str):
+            raise ResourceError(f"{name}: {key}.title must be a string")
+        exercises[key] = {
+            "title": entry["title"],
+            "steps": _string_list(entry.get("steps"), f"{name}: {key}.steps"),
+            "target_moods": _string_list(entry.get("target_moods", []), f"{name}: {key}.target_moods"),
+        }
+    return exercises
+
+
+_VALIDATORS = {"media": validate_media, "quotes": validate_quotes, "exercises": validate_exercises}
+
+
+# --- Compilation ---
+# Related moods are merged, deduplicated and turned into YouTube links once per mood, so a
+# request only makes O(1) random picks from ready-made tuples.
+
+def build_mood_media(mood, media_data, quotes):
+    quote_list = quotes.get(mood) or quotes.get("Neutral") or DEFAULT_QUOTES
+
+    songs, movies, videos = {}, {}, {}
+    for related_mood in get_related_moods(mood):
+        media = media_data.get(related_mood, {})
+        songs.update(dict.fromkeys(media.get("songs", ())))
+        movies.update(dict.fromkeys(media.get("movies", ())))
+        videos.update(dict.fromkeys(media.get("videos", ())))
+
+    return MoodMedia(
+        quotes=tuple(quote_list),
+        songs=tuple((name, youtube_search_link(name)) for name in songs if name),
+        movies=tuple(name for name in movies if name),
+        videos=tuple((name, youtube_search_link(name)) for name in videos if name),
+    )
+
+
+def _compile(media_data, quotes, exercises, extra_moods):
+    moods = set(media_data) | set(quotes) | set(RELATED_MOODS) | set(extra_moods)
+    exercises_by_mood = {}
+    for key, exercise in exercises.items():
+        for mood in exercise["target_moods"]:
+            # The first exercise in file order wins, as with the old linear scan
+            exercises_by_mood.setdefault(mood, key)
+    return {
+        "media_data": media_data,
+        "quotes": quotes,
+        "exercises": exercises,
+        "media_index": {mood: build_mood_media(mood, media_data, quotes) for mood in moods},
+        "exercises_by_mood": exercises_by_mood,
+    }
+
+
+_COMPILED_KEYS = {"media_data", "quotes", "exercises", "media_index", "exercises_by_mood"}
+
+
+def _freeze(compiled, digest):
+    """Wraps the compiled (plain, marshallable) data in read-only mappings."""
+    exercises = MappingProxyType({key: MappingProxyType(ex) for key, ex in compiled["exercises"].items()})
+    return ResourceSnapshot(
+        media_data=MappingProxyType({mood: MappingProxyType(m) for mood, m in compiled["media_data"].items()}),
+        quotes=MappingProxyType(compiled["quotes"]),
+        exercises=exercises,
+        media_index=MappingProxyType({mood: MoodMedia(*m) for mood, m in compiled["media_index"].items()}),
+        exercises_by_mood=MappingProxyType({mood: exercises[key] for mood, key in compiled["exercises_by_mood"].items()}),
+        digest=digest,
+    )
+
+
+class ResourceStore:
+    """Holds the current ResourceSnapshot and rebuilds it when the resource files change."""
+
+    def __init__(self, base_dir=None, cache_dir=None, extra_moods=(), poll_interval=None):
+        self.base_dir = base_dir or RESOURCE_DIR
+        self.paths = {name: os.path.join(self.base_dir, rel) for name, rel in RESOURCE_FILES.items()}
+        if cache_dir is None:
+            cache_dir = os.getenv("MINDSPARK_RESOURCE_CACHE_DIR", os.path.join(self.base_dir, "resources", ".cache"))
+        self.cache_dir = cache_dir  # "" disables the snapshot cache
+        self.extra_moods = tuple(sorted(extra_moods))
+        self.poll_interval = float(os.getenv("MINDSPARK_RESOURCE_POLL", "2")) if poll_interval is None else poll_interval
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stamps = None
+        self._missing = set()  # files absent from the current snapshot
+        self.stats = {"loads": 0, "cache_hits": 0, "reloads": 0, "errors": 0, "last_error": None, "source": None}
+        self.snapshot = self._load(initial=True)
+
+    def _file_stamps(self):
+        stamps = {}
+        for name, path in self.paths.items():
+            try:
+                st = os.stat(path)
+                stamps[name] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                stamps[name] = None
+        return stamps
+
+    def _read_raw(self, initial):
+        raw = {}
+        for name, path in self.paths.items():
+            try:
+                with open(path, "rb") as f:
+                    raw[name] = f.read()
+            except FileNotFoundError:
+                # A file deleted at runtime is a broken edit like any other: keep the snapshot
+                if not initial and name not in self._missing:
+                    raise ResourceError(f"{path}: file not found") from None
+                if initial:
+                    print(f"ERROR: Resource file not found: {path}. Check your file structure.")
+                raw[name] = None
+        return raw
+
+    def _digest(self, raw):
+        h = hashlib.sha256(f"v{SNAPSHOT_VERSION}|{','.join(self.extra_moods)}".encode("utf-8"))
+        for name in sorted(raw):
+            data = raw[name]
+            h.update(f"|{name}:{-1 if data is None else len(data)}|".encode("utf-8"))
+            h.update(data or b"")
+        return h.hexdigest()
+
+    def _cache_path(self, digest):
+        return os.path.join(self.cache_dir, f"snapshot-{digest[:32]}.marshal")
+
+    def _read_cache(self, digest):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._cache_path(digest), "rb") as f:
+                compiled = marshal.load(f)
+            if not isinstance(compiled, dict) or set(compiled) != _COMPILED_KEYS:
+                raise ValueError("unexpected snapshot layout")
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"WARNING: Ignoring unreadable resource snapshot {self._cache_path(digest)}. Error: {e}")
+            return None
+        self.stats["cache_hits"] += 1
+        return compiled
+
+    def _write_cache(self, digest, compiled):
+        if not self.cache_dir:
+            return
+        path = self._cache_path(digest)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            # marshal only takes exact built-in types: store the MoodMedia namedtuples as tuples
+            plain = dict(compiled, media_index={mood: tuple(m) for mood, m in compiled["media_index"].items()})
+            with open(tmp, "wb") as f:
+                marshal.dump(plain, f)
+            os.replace(tmp, path)
+            # Keep only the few most recent snapshots
+            old = sorted((os.path.join(self.cache_dir, n) for n in os.listdir(self.cache_dir)
+                          if n.startswith("snapshot-") and not n.endswith(".tmp")),
+                         key=os.path.getmtime)
+            for stale in old[:-3]:
+                os.remove(stale)
+        except OSError as e:
+            print(f"WARNING: Could not write the resource snapshot cache in {self.cache_dir}. Error: {e}")
+
+    def _compile_raw(self, raw, initial):
+        """Validates and compiles the raw files; returns (compiled, True if every file was valid)."""
+        validated, valid = {}, True
+        for name, data in raw.items():
+            if data is None:
+                validated[name] = {}
+                continue
+            path = self.paths[name]
+            try:
+                validated[name] = _VALIDATORS[name](json.loads(data), path)
+                continue
+            except json.JSONDecodeError as e:
+                error = ResourceError(f"{path}: {e}")
+            except ResourceError as e:
+                error = e
+            if not initial:
+                raise error
+            # At startup there is nothing to keep, so serve the other files without this one
+            print(f"ERROR: Invalid resource file. Error: {error}")
+            self.stats["errors"] += 1
+            self.stats["last_error"] = str(error)
+            validated[name] = {}
+            valid = False
+        return _compile(validated["media"], validated["quotes"], validated["exercises"], self.extra_moods), valid
+
+    def _load(self, initial=False):
+        stamps = self._file_stamps()
+        raw = self._read_raw(initial)
+        digest = self._digest(raw)
+        compiled = self._read_cache(digest)
+        source = "cache"
+        if compiled is None:
+            compiled, valid = self._compile_raw(raw, initial)
+            if valid:
+                self._write_cache(digest, compiled)
+            source = "json"
+        self._stamps = stamps
+        self._missing = {name for name, data in raw.items() if data is None}
+        self.stats["loads"] += 1
+        self.stats["source"] = source
+        return _freeze(compiled, digest)
+
+    def reload(self):
+        """
+        Rebuilds the snapshot from disk and swaps it in. If a file is invalid the current
+        snapshot stays in place and ResourceError is raised. Returns True if the content changed.
+        """
+        with self._lock:
+            start = time.perf_counter()
+            snapshot = self._load()
+            changed = snapshot.digest != self.snapshot.digest
+            self.snapshot = snapshot
+        if changed:
+            self.stats["reloads"] += 1
+            metrics.inc("resource_reloads", outcome="ok")
+            print(f"INFO: Resources reloaded from {self.stats['source']} in {time.perf_counter() - start:.3f}s "
+                  f"(snapshot {snapshot.digest[:12]}).")
+        return changed
+
+    def check_for_changes(self):
+        """Reloads if any resource file's mtime or size changed since the last load."""
+        if self._file_stamps() == self._stamps:
+            return False
+        try:
+            return self.reload()
+        except ResourceError as e:
+            # Don't retry the same broken file every poll; wait for the next edit
+            self._stamps = self._file_stamps()
+            self.stats["errors"] += 1
+            self.stats["last_error"] = str(e)
+            metrics.inc("resource_reloads", outcome="invalid")
+            print(f"ERROR: Keeping the current resources; reload failed. Error: {e}")
+            return False
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.check_for_changes()
+            except Exception as e:
+                print(f"ERROR: Resource watcher failed. Error: {e}")
+
+    def start_watching(self):
+        """Starts the background mtime poller (no-op if polling is disabled or already running)."""
+        if self.poll_interval <= 0 or self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._watch, name="resource-watcher", daemon=True)
+        self._watcher.start()
+
+    def status(self):
+        return {"digest": self.snapshot.digest[:12], **self.stats}
@@ -0,0 +1,288 @@
+"""
+Persistent cache of generated Gemini responses, shared by every process on the host.
+
+Stories and tips are fully determined by their prompt and generation settings, so a response
+generated once can be served again after a restart or by another replica. Entries are keyed
+on the normalized prompt, model, temperature and system instruction. Each key keeps up to
+`variants` different responses (served at random, so users do not always see the same story).
+Entries expire after `ttl` seconds, and the oldest are evicted past `max_entries`.
+
+Pre-populate the cache for every mood/role combination before a deploy:
+
+    python -m response_cache warmup --variants 3
+    python -m response_cache stats
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+
+# --- Persistent Response Cache ---
+# SQLite in WAL mode, so processes sharing the file read concurrently while one writes.
+# Lookups are a primary-key range read on one connection per thread. Writes happen only
+# after a real Gemini call, which costs far more than the insert.
+
+RESPONSE_CACHE_DB = os.getenv("MINDSPARK_RESPONSE_CACHE_DB", "response_cache.db")  # "" disables the cache
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    created REAL NOT NULL,
+    model TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (key, digest)
+);
+CREATE INDEX IF NOT EXISTS idx_responses_created ON responses (created);
+"""
+
+
+def normalize_prompt(prompt):
+    """Collapses whitespace and case so trivially different prompts share an entry."""
+    return " ".join(str(prompt).split()).lower()
+
+
+def cache_key(prompt, model, temperature=None, system_instruction=None):
+    """Hex SHA-256 of everything that decides what the model returns for the prompt."""
+    material = json.dumps([normalize_prompt(prompt), model, temperature, system_instruction or ""])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Disk-backed, multi-variant cache of generated text with TTL and size-bounded eviction."""
+
+    def __init__(self, path, ttl=7 * 86400, max_entries=10000, variants=3):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.variants = max(1, variants)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._schema_ready = False
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "rejected": 0, "evicted": 0, "errors": 0}
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock:
+            if not self._schema_ready:
+                conn.executescript(_SCHEMA)
+                self._schema_ready = True
+        return conn
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def _error(self, action, e):
+        # A broken or locked cache file must never break a chat turn: report and carry on uncached
+        self._count("errors")
+        print(f"WARNING: Response cache {action} failed. Error: {e}")
+
+    # --- Lookups ---
+
+    def variants_for(self, key):
+        """Returns the unexpired responses stored under `key`, oldest first."""
+        rows = self._conn().execute(
+            "SELECT text FROM responses WHERE key = ? AND created >= ? ORDER BY created",
+            (key, time.time() - self.ttl),
+        ).fetchall()
+        return [text for (text,) in rows]
+
+    def get(self, prompt, model, temperature=None, system_instruction=None):
+        """
+        Returns one cached response for the prompt at random, or None on a miss. A key that holds
+        fewer than `variants` responses is a miss too, so callers keep generating new variants
+        instead of serving the first answer over and over.
+        """
+        try:
+            texts = self.variants_for(cache_key(prompt, model, temperature, system_instruction))
+        except sqlite3.Error as e:
+            self._error("lookup", e)
+            return None
+        if len(texts) < self.variants:
+            self._count("misses")
+            metrics.inc("response_cache", outcome="miss")
+            return None
+        self._count("hits")
+        metrics.inc("response_cache", outcome="hit")
+        return random.choice(texts)
+
+    # --- Writes ---
+
+    def put(self, prompt, model, temperature, system_instruction, text, accept=None):
+        """
+        Stores a response as one of the key's variants; the oldest variant makes room once the key
+        is full. Returns False without storing if `accept(text)` rejects it (e.g. a malformed tip).
+        """
+        if not text or not text.strip() or (accept is not None and not accept(text)):
+            self._count("rejected")
+            metrics.inc("response_cache", outcome="rejected")
+            return False
+        key = cache_key(prompt, model, temperature, system_instruction)
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        now = time.time()
+        try:
+            conn = self._conn()
+            with conn:
+                # The same text again only refreshes its age instead of taking a second variant slot
+                conn.execute("INSERT OR REPLACE INTO responses (key, digest, created, model, prompt, text) "
+                             "VALUES (?, ?, ?, ?, ?, ?)", (key, digest, now, model, normalize_prompt(prompt), text))
+                conn.execute("DELETE FROM responses WHERE key = ? AND digest NOT IN "
+                             "(SELECT digest FROM responses WHERE key = ? ORDER BY created DESC LIMIT ?)",
+                             (key, key, self.variants))
+                evicted = self._evict(conn, now)
+        except sqlite3.Error as e:
+            self._error("write", e)
+            return False
+        self._count("stored")
+        if evicted:
+            self._count("evicted", evicted)
+        metrics.inc("response_cache", outcome="stored")
+        return True
+
+    def _evict(self, conn, now):
+        """Drops expired entries, then the oldest ones beyond max_entries; returns how many went."""
+        evicted = conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,)).rowcount
+        (count,) = conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        if count > self.max_entries:
+            evicted += conn.execute("DELETE FROM responses WHERE rowid IN "
+                                    "(SELECT rowid FROM responses ORDER BY created LIMIT ?)",
+                                    (count - self.max_entries,)).rowcount
+        return evicted
+
+    def clear(self):
+        """Deletes every entry; returns how many there were."""
+        conn = self._conn()
+        with conn:
+            return conn.execute("DELETE FROM responses").rowcount
+
+    def status(self):
+        """Returns the hit/miss counters plus the entry and key counts on disk."""
+        stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        try:
+            entries, keys = self._conn().execute(
+                "SELECT COUNT(*), COUNT(DISTINCT key) FROM responses WHERE created >= ?",
+                (time.time() - self.ttl,)).fetchone()
+            stats.update({"entries": entries, "keys": keys})
+        except sqlite3.Error as e:
+            self._error("status", e)
+        return stats
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+RESPONSE_CACHE = ResponseCache(
+    RESPONSE_CACHE_DB,
+    ttl=float(os.getenv("MINDSPARK_RESPONSE_CACHE_TTL", str(7 * 86400))),
+    max_entries=int(os.getenv("MINDSPARK_RESPONSE_CACHE_MAX", "10000")),
+    variants=int(os.getenv("MINDSPARK_RESPONSE_CACHE_VARIANTS", "3")),
+) if RESPONSE_CACHE_DB else None
+
+
+# --- Warmup Command ---
+
+def warmup(variants=None, concurrency=4, refresh=False):
+    """Generates stories and tips for every pool mood/role until each key holds `variants` responses."""
+    # Only the Gemini side of chat_logic is needed: no pools, no warmup of their own
+    os.environ.setdefault("MINDSPARK_DISABLE_WARMUP", "1")
+    os.environ.setdefault("MINDSPARK_CONTENT_POOLS", "0")
+    import chat_logic
+    from gemini_guard import GuardError
+
+    # chat_logic's instance, not this module's: under `python -m` this file is loaded twice
+    cache = chat_logic.RESPONSE_CACHE
+    if chat_logic.get_gemini_client() is None:
+        print("ERROR: Gemini client is not available; nothing to warm up.")
+        return None
+    if refresh:
+        cache.clear()
+    jobs = [chat_logic.story_request(mood) for mood in chat_logic.POOL_MOODS]
+    jobs += [chat_logic.tip_request(mood, role) for mood in chat_logic.POOL_MOODS for role in chat_logic.POOL_ROLES]
+    target = variants or cache.variants
+    results = {"keys": len(jobs), "generated": 0, "already_cached": 0, "failed": 0}
+    lock = threading.Lock()
+
+    def fill(job):
+        contents, config, accept = job
+        key = cache_key(contents, chat_logic.GEMINI_MODEL, config.temperature, config.system_instruction)
+        have = count = len(cache.variants_for(key))
+        failed = 0
+        # One key at a time per worker: concurrent identical requests would be coalesced into one
+        # upstream call and return the same text, not a new variant. A repeated answer only
+        # refreshes its entry, so allow a few extra attempts per missing variant.
+        for _ in range(3 * max(0, target - have)):
+            if count >= target:
+                break
+            try:
+                chat_logic.generate_and_cache(contents, config, accept)
+            except GuardError:
+                failed += 1
+            count = len(cache.variants_for(key))
+        with lock:
+            results["generated"] += count - have
+            results["already_cached"] += have
+            results["failed"] += failed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(fill, jobs))
+    results["elapsed_s"] = time.perf_counter() - start
+    results["cache"] = cache.status()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    warm = commands.add_parser("warmup", help="pre-generate responses for every mood/role combination")
+    warm.add_argument("--variants", type=int, default=None, help="responses per key (default: MINDSPARK_RESPONSE_CACHE_VARIANTS)")
+    warm.add_argument("--concurrency", type=int, default=4, help="keys generated in parallel")
+    warm.add_argument("--refresh", action="store_true", help="clear the cache first and regenerate everything")
+    commands.add_parser("stats", help="print entry counts")
+    commands.add_parser("clear", help="delete every cached response")
+    args = parser.parse_args()
+
+    if RESPONSE_CACHE is None:
+        print("ERROR: The response cache is disabled (MINDSPARK_RESPONSE_CACHE_DB is empty).")
+        sys.exit(2)
+    if args.command == "warmup":
+        results = warmup(args.variants, args.concurrency, args.refresh)
+        if results is None:
+            sys.exit(1)
+        print(f"INFO: Warmed {results['keys']} keys in {results['elapsed_s']:.1f}s: {results['generated']} responses generated, "
+              f"{results['already_cached']} already cached, {results['failed']} calls failed.")
+        print(json.dumps(results["cache"], indent=2))
+        if results["failed"]:
+            sys.exit(1)
+        return
+    if args.command == "clear":
+        print(f"INFO: Deleted {RESPONSE_CACHE.clear()} cached responses from {RESPONSE_CACHE.path}.")
+    print(json.dumps(RESPONSE_CACHE.status(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
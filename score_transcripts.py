@@ -0,0 +1,258 @@
+"""
+Offline bulk scoring of conversation logs with the app's own crisis check and mood cascade.
+
+Reads a JSONL file (one message per line) as a stream, scores the lines in chunks across a
+process pool (each worker loads the emotion model once and classifies a chunk in batched
+forward passes), and writes one label per message plus aggregate mood/crisis statistics:
+
+    python -m score_transcripts logs.jsonl --output labels.jsonl --workers 4
+
+Each output line is {"line": N, "id": ..., "mood": ..., "emoji": ..., "crisis": bool}.
+The text is taken from the first of --text-fields present in the record; records with a
+"role" other than "user" (assistant replies in a transcript) are skipped unless --all-roles.
+
+Progress is checkpointed to OUTPUT.checkpoint after every chunk. Re-running the same command
+after an interruption resumes from the last checkpoint instead of starting over (--restart
+ignores it). --compare OLD_STATS prints how the mood distribution moved against an earlier
+run, e.g. after a model or lexicon change.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_TEXT_FIELDS = "message,text,content,body"
+
+
+# --- Worker Side ---
+# Runs in the pool processes. chat_logic is imported here, not at module level, so the
+# parent process never loads the model.
+
+_THRESHOLD = None
+
+
+def _init_worker(threshold):
+    global _THRESHOLD
+    _THRESHOLD = threshold
+    import chat_logic
+    # Wait for the model up front: detect_mood_batch falls back to the lexicon while the
+    # model is still loading, which would silently change the labels of the first chunks
+    if chat_logic.MODELS.get("emotion") is None:
+        print(f"WARNING: Worker {os.getpid()} could not load the emotion model; moods fall back to the lexicon.")
+
+
+def _score_chunk(first_line, lines, text_fields, all_roles):
+    """Scores one chunk of raw JSONL lines; returns (output text, mood counts, crisis, skipped, invalid)."""
+    from chat_logic import check_for_crisis, detect_mood_batch
+
+    records, texts, skipped, invalid = [], [], 0, 0
+    for line_number, raw in enumerate(lines, first_line):
+        if not raw.strip():
+            continue
+        try:
+            record = json.loads(raw)
+        except ValueError:
+            invalid += 1
+            continue
+        if not isinstance(record, dict):
+            invalid += 1
+            continue
+        if not all_roles and record.get("role", "user") != "user":
+            skipped += 1
+            continue
+        text = next((record[f] for f in text_fields if isinstance(record.get(f), str)), None)
+        if not text or not text.strip():
+            skipped += 1
+            continue
+        records.append((line_number, record.get("id")))
+        texts.append(text)
+
+    moods = detect_mood_batch(texts, _THRESHOLD) if texts else []
+    out, counts, crisis_count = [], {}, 0
+    for (line_number, record_id), text, (mood, emoji) in zip(records, texts, moods):
+        crisis = check_for_crisis(text)
+        crisis_count += crisis
+        counts[mood] = counts.get(mood, 0) + 1
+        out.append(json.dumps({"line": line_number, "id": record_id, "mood": mood, "emoji": emoji, "crisis": crisis},
+                              ensure_ascii=False))
+    return "".join(line + "\n" for line in out), counts, crisis_count, skipped, invalid
+
+
+# --- Parent Side ---
+
+def _read_chunks(path, offset, first_line, chunk_size):
+    """Yields (first line number, raw lines, byte offset after the chunk) from `offset` onwards."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        lines = []
+        for raw in f:
+            lines.append(raw.decode("utf-8", errors="replace"))
+            offset += len(raw)
+            if len(lines) == chunk_size:
+                yield first_line, lines, offset
+                first_line += len(lines)
+                lines = []
+        if lines:
+            yield first_line, lines, offset
+
+
+def _new_stats():
+    return {"lines": 0, "scored": 0, "skipped": 0, "invalid": 0, "crisis": 0, "moods": {}, "elapsed_s": 0.0}
+
+
+def _save_checkpoint(path, checkpoint):
+    # Write-then-rename, so an interruption never leaves a half-written checkpoint
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+
+def _load_checkpoint(path, input_path, output_path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("input") != os.path.abspath(input_path):
+        print(f"ERROR: Checkpoint {path} belongs to {checkpoint.get('input')}; use --restart to start over.")
+        sys.exit(2)
+    if os.path.getsize(input_path) < checkpoint["input_offset"]:
+        print(f"ERROR: {input_path} is shorter than when {path} was written; use --restart to start over.")
+        sys.exit(2)
+    # Labels written before the checkpoint are not scored again, so they must all still be there
+    if not os.path.exists(output_path) or os.path.getsize(output_path) < checkpoint["output_offset"]:
+        print(f"ERROR: {output_path} is missing or shorter than when {path} was written; use --restart to start over.")
+        sys.exit(2)
+    return checkpoint
+
+
+def _finish_stats(stats):
+    scored = stats["scored"]
+    stats["crisis_rate"] = stats["crisis"] / scored if scored else 0.0
+    stats["mood_share"] = {mood: n / scored for mood, n in sorted(stats["moods"].items())} if scored else {}
+    stats["messages_per_s"] = scored / stats["elapsed_s"] if stats["elapsed_s"] else 0.0
+    return stats
+
+
+def _print_drift(old_path, stats):
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    old_share, new_share = old.get("mood_share", {}), stats["mood_share"]
+    print(f"\nMood distribution vs {old_path}:")
+    print(f"  {'mood':<12} {'before':>8} {'now':>8} {'change':>8}")
+    for mood in sorted(set(old_share) | set(new_share)):
+        before, now = old_share.get(mood, 0.0), new_share.get(mood, 0.0)
+        print(f"  {mood:<12} {before:>8.1%} {now:>8.1%} {now - before:>+8.1%}")
+    # Total variation distance: the share of labels that would have to move to match the old run
+    distance = sum(abs(new_share.get(m, 0.0) - old_share.get(m, 0.0)) for m in set(old_share) | set(new_share)) / 2
+    print(f"  total variation distance {distance:.3f}, crisis rate {old.get('crisis_rate', 0.0):.2%} -> {stats['crisis_rate']:.2%}")
+
+
+def score_file(args):
+    output = args.output or os.path.splitext(args.input)[0] + ".labels.jsonl"
+    checkpoint_path = output + ".checkpoint"
+    stats_path = args.stats or output + ".stats.json"
+    text_fields = [f.strip() for f in args.text_fields.split(",") if f.strip()]
+
+    checkpoint = None if args.restart else _load_checkpoint(checkpoint_path, args.input, output)
+    if checkpoint:
+        stats = checkpoint["stats"]
+        input_offset, next_line = checkpoint["input_offset"], checkpoint["next_line"]
+        # Drop anything written after the last checkpoint; those chunks are scored again
+        out = open(output, "r+b")
+        out.truncate(checkpoint["output_offset"])
+        out.seek(checkpoint["output_offset"])
+        print(f"INFO: Resuming {args.input} at line {next_line} ({stats['scored']} messages already scored).")
+    else:
+        stats, input_offset, next_line = _new_stats(), 0, 1
+        out = open(output, "wb")
+
+    # Workers import chat_logic: no Gemini warmup or content pools, just the mood pipeline
+    os.environ.setdefault("MINDSPARK_DISABLE_WARMUP", "1")
+    os.environ.setdefault("MINDSPARK_CONTENT_POOLS", "0")
+    os.environ["MINDSPARK_BATCH_SIZE"] = str(args.batch_size)
+
+    start = time.perf_counter()
+    base_elapsed, last_report = stats["elapsed_s"], start
+    chunks = _read_chunks(args.input, input_offset, next_line, args.chunk_size)
+    with out, ProcessPoolExecutor(args.workers, initializer=_init_worker, initargs=(args.threshold,)) as pool:
+        # Keep a bounded number of chunks in flight so memory stays flat on any input size;
+        # results are consumed in input order, which keeps the output and checkpoints in order
+        in_flight = deque()
+
+        def submit_next():
+            chunk = next(chunks, None)
+            if chunk is not None:
+                first_line, lines, end_offset = chunk
+                future = pool.submit(_score_chunk, first_line, lines, text_fields, args.all_roles)
+                in_flight.append((future, first_line + len(lines), end_offset, len(lines)))
+
+        for _ in range(args.workers * 2):
+            submit_next()
+        while in_flight:
+            future, next_line, end_offset, line_count = in_flight.popleft()
+            text, counts, crisis, skipped, invalid = future.result()
+            submit_next()
+
+            out.write(text.encode("utf-8"))
+            out.flush()
+            stats["lines"] += line_count
+            stats["scored"] += sum(counts.values())
+            stats["crisis"] += crisis
+            stats["skipped"] += skipped
+            stats["invalid"] += invalid
+            for mood, n in counts.items():
+                stats["moods"][mood] = stats["moods"].get(mood, 0) + n
+            stats["elapsed_s"] = base_elapsed + time.perf_counter() - start
+            _save_checkpoint(checkpoint_path, {
+                "input": os.path.abspath(args.input), "input_offset": end_offset, "next_line": next_line,
+                "output_offset": out.tell(), "stats": stats,
+            })
+
+            now = time.perf_counter()
+            if now - last_report >= args.progress_every:
+                print(f"INFO: {stats['scored']} messages scored, {stats['scored'] / stats['elapsed_s']:.0f} msg/s")
+                last_report = now
+
+    stats = _finish_stats(stats)
+    with open(stats_path, "w", encoding="utf-8") as f:
+        json.dump(stats, f, indent=2)
+    # The run is complete, so a later run of the same command starts fresh
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return output, stats_path, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file, one message per line")
+    parser.add_argument("--output", help="per-message labels (default: INPUT.labels.jsonl)")
+    parser.add_argument("--stats", help="aggregate statistics JSON (default: OUTPUT.stats.json)")
+    parser.add_argument("--text-fields", default=DEFAULT_TEXT_FIELDS, help="record fields to take the text from, in order")
+    parser.add_argument("--all-roles", action="store_true", help="also score records whose role is not 'user'")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=256, help="lines per pool task")
+    parser.add_argument("--batch-size", type=int, default=32, help="texts per model forward pass")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="lexicon confidence needed to skip the model (default: the app's; >1 = model only)")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    parser.add_argument("--compare", metavar="OLD_STATS", help="print the mood distribution shift against an earlier run")
+    parser.add_argument("--progress-every", type=float, default=10.0, help="seconds between progress lines")
+    args = parser.parse_args()
+
+    output, stats_path, stats = score_file(args)
+    print(f"\nScored {stats['scored']} messages ({stats['skipped']} skipped, {stats['invalid']} invalid lines) "
+          f"in {stats['elapsed_s']:.1f}s: {stats['messages_per_s']:.0f} messages/s")
+    for mood, share in sorted(stats["mood_share"].items(), key=lambda item: -item[1]):
+        print(f"  {mood:<12} {stats['moods'][mood]:>8} {share:>7.1%}")
+    print(f"  crisis flags {stats['crisis']} ({stats['crisis_rate']:.2%})")
+    print(f"INFO: Labels written to {output}, statistics to {stats_path}")
+    if args.compare:
+        _print_drift(args.compare, stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,7 @@
 import streamlit as st
-from chat_logic import (
-    detect_mood, 
-    check_for_crisis,
-    ai_response,
-    get_media_and_tips,
-    generate_story, 
-    get_exercise_suggestion, 
-    CRISIS_MESSAGE
-)
+from chat_engine import ChatEngine, quick_actions
+import metrics
+import os
 import random
 
 # --- 1. Streamlit UI Setup: Purple & Black Theme ---
@@ -100,24 +94,44 @@ header {{ visibility: hidden; }}
 st.markdown('<p class="big-font">MindSpark Companion 💜</p>', unsafe_allow_html=True)
 st.caption("Your friend for emotional support and mood boosting. **Wellness focused, always here to listen.**")
 
-# --- 2. Initialize Session State (NO FUNCTIONALITY CHANGE) ---
-if "messages" not in st.session_state:
-    st.session_state.messages = []
-if "user_role" not in st.session_state:
-    st.session_state.user_role = None
-if "last_mood" not in st.session_state:
-    st.session_state.last_mood = ("Neutral", "😐")
-if "awaiting_command" not in st.session_state:
-    st.session_state.awaiting_command = None
+# --- 2. Initialize Session State ---
+# All conversation state lives in one ChatSession (chat_engine.py); this script only renders it.
+@st.cache_resource
+def get_engine():
+    """One engine per server process, shared by every browser session."""
+    return ChatEngine()
+
+ENGINE = get_engine()
+
+if "chat" not in st.session_state:
+    st.session_state.chat = None
+# Older messages shown on top of the recent window after "Load earlier" clicks
+if "history_extra" not in st.session_state:
+    st.session_state.history_extra = 0
+
+HISTORY_PAGE = int(os.getenv("MINDSPARK_HISTORY_PAGE", "20"))
+
+
+# --- Admin Metrics Panel (MINDSPARK_ADMIN=1) ---
+if os.getenv("MINDSPARK_ADMIN", "0") == "1":
+    with st.sidebar:
+        st.subheader("⚙️ Pipeline Latency")
+        if not metrics.ENABLED:
+            st.caption("Set MINDSPARK_METRICS=1 to collect stage timings.")
+        else:
+            st.button("Refresh", use_container_width=True)
+            st.dataframe(metrics.stage_percentiles(), hide_index=True, use_container_width=True)
+            st.caption("Counters")
+            st.json(metrics.counters(), expanded=False)
 
 
 # --- 3. Role Selection and Initialization ---
 
 def set_role(role):
-    st.session_state.user_role = role
-    st.session_state.messages = [{"role": "assistant", "content": f"Hello! I see you've identified as a **{role}**. How are you feeling right now? I'm here to listen."}]
+    st.session_state.chat = ENGINE.start_session(role)
+    st.session_state.history_extra = 0
 
-if st.session_state.user_role is None:
+if st.session_state.chat is None:
     st.header("Who are you talking to?")
     col1, col2, col3 = st.columns(3)
     
@@ -130,161 +144,84 @@ if st.session_state.user_role is None:
         
     st.stop()
 
+chat = st.session_state.chat
 
-# --- 4. Suggestion/Command Execution (NO FUNCTIONALITY CHANGE) ---
 
-def execute_suggestion(command, display_text):
-    """Executes the media/exercise command based on the last detected mood."""
-    
-    # 1. Acknowledge the user's button click
-    st.session_state.messages.append({"role": "user", "content": display_text})
-    
-    # 2. Reset the awaiting command state
-    st.session_state.awaiting_command = None
-    
-    # 3. Proceed with execution
-    mood, _ = st.session_state.last_mood
-    
-    # Command 1: Story (Uses Gemini API/Fallback)
-    if command == "story":
-        st.session_state.messages.append({"role": "assistant", "content": f"That's a lovely idea! Let me tell you a story for your **{mood}** mood..."})
-        story = generate_story(mood) 
-        st.session_state.messages.append({"role": "assistant", "content": f"📖 **Story Time:**\n\n{story}"})
-        
-    # Command 2: Exercise
-    elif command == "exercise":
-        exercise = get_exercise_suggestion("Stressed")
-        if exercise:
-            st.session_state.messages.append({"role": "assistant", "content": f"Absolutely! Let's try the **{exercise['title']}** technique to recenter ourselves:"})
-            exercise_steps = "\n".join(exercise['steps'])
-            st.session_state.messages.append({"role": "suggestion", "content": f"🧘 **Exercise Steps**:\n\n{exercise_steps}"})
-        else:
-            st.session_state.messages.append({"role": "assistant", "content": "I'm sorry, I don't have a specific exercise right now, but a simple stretch or getting a glass of water can always help!"})
-            
-    # Command 3, 4, 5: Media (Song, Video, or General Yes)
-    elif command in ["song", "video", "movie", "yes"]:
-        quote, song_link, movie, contextual_tip, video_link = get_media_and_tips(mood, st.session_state.user_role)
-        
-        st.session_state.messages.append({"role": "assistant", "content": f"Here is a suggestion to help shift your **{mood}** mood:"})
-        
-        suggestions = f"**{quote}**"
-        if contextual_tip:
-            suggestions += f" | {contextual_tip}"
-        
-        if video_link:
-            mood_action = 'calmer' if mood in ['Angry', 'Stressed', 'Fear'] else 'happier'
-            suggestions += f"\n\n💡 **Mood Shifter:** Try watching **[This Video on YouTube]({video_link})** to help you feel {mood_action}."
-        elif song_link and movie:
-            suggestions += f"\n\n💡 **Try a mood boost:** Maybe watch **{movie}** or listen to **[This Song on YouTube]({song_link})**."
+# --- 4. Suggestion/Command Execution ---
 
-        st.session_state.messages.append({"role": "suggestion", "content": suggestions})
-        
-    # Note: st.rerun() is intentionally REMOVED from the callback to avoid the warning
+@metrics.timed()
+def execute_suggestion(command, display_text):
+    """Button callback: runs a quick-action command (no st.rerun() needed inside a callback)."""
+    ENGINE.execute_command(st.session_state.chat, command, display_text)
 
 
 # --- 5. Main Chat Loop ---
 
+@metrics.timed()
 def handle_user_input(prompt):
-    """Processes user input and generates the assistant's response."""
-    
-    # 1. CRISIS CHECK
-    if check_for_crisis(prompt):
-        st.session_state.messages.append({"role": "user", "content": prompt})
-        st.session_state.messages.append({"role": "suggestion", "content": CRISIS_MESSAGE})
-        st.session_state.awaiting_command = None
-        st.rerun()
-        return
-
-    # 2. Handle System Commands
-    if prompt.lower() == "role":
-        st.session_state.user_role = None
-        st.session_state.messages = []
-        st.rerun()
-        return
-    
-    # 3. Handle Previous Command Request (from text input)
-    if st.session_state.awaiting_command and any(cmd in prompt.lower() for cmd in ["story", "exercise", "song", "video", "yes"]):
-        command = next((c for c in ["story", "exercise", "song", "video", "yes"] if c in prompt.lower()), "yes")
-        execute_suggestion(command, prompt)
-        return
-
-    # 4. Standard Flow: Process new input
-    st.session_state.messages.append({"role": "user", "content": prompt})
-    mood, emoji = detect_mood(prompt)
-    st.session_state.last_mood = (mood, emoji)
-    
-    # 5. Decide Next Step (Dialogue and Prompt)
-    
-    # Negative Moods: Offer direct intervention (Story or Exercise)
-    if mood in ["Angry", "Sad", "Depressed"]:
-        reply = ai_response(f"chat: responded to {mood}")
-        st.session_state.messages.append({"role": "assistant", "content": reply})
-        
-        st.session_state.messages.append({"role": "assistant", "content": "I'm here for you. Take a moment, and let's find something to lift your spirits."})
-        st.session_state.awaiting_command = mood
-
-    # Stress/Fear Moods: Offer a quick solution
-    elif mood in ["Stressed", "Fear"]:
-        reply = ai_response(f"chat: responded to {mood}")
-        st.session_state.messages.append({"role": "assistant", "content": reply})
-        
-        st.session_state.messages.append({"role": "assistant", "content": "That sounds rough. Let's find a way to center your mind right now."})
-        st.session_state.awaiting_command = mood
-
-    # Neutral/Positive Moods: Ask if they want a suggestion
-    else:
-        reply = ai_response(f"chat: responded to {mood}")
-        st.session_state.messages.append({"role": "assistant", "content": reply})
-        
-        st.session_state.messages.append({"role": "assistant", "content": f"That's great! Let's boost that wonderful **{mood}** feeling even more."})
-        st.session_state.awaiting_command = mood
-    
+    """Processes user input through the engine, then reruns to show the new messages."""
+    result = ENGINE.handle_message(chat, prompt)
+    if result.reset:
+        st.session_state.chat = None
     st.rerun() # Trigger a rerun to show the new chat message and the buttons
 
 
 # --- 6. Display Chat History ---
-for message in st.session_state.messages:
-    if message["role"] == "user":
-        mood_text, emoji = st.session_state.last_mood
+# Only the recent window is rendered, so a rerun costs the same on turn 5 and turn 500.
+# Older messages come back from the session's cold storage a page at a time.
+
+def load_earlier():
+    st.session_state.history_extra += HISTORY_PAGE
+
+history = chat.messages
+visible = history.page(limit=history.window + st.session_state.history_extra)
+hidden = len(history) - len(visible)
+if hidden:
+    st.button(f"⬆️ Load earlier messages ({hidden} more)", on_click=load_earlier, use_container_width=True)
+
+for message in visible:
+    if message.role == "user":
+        mood_text, emoji = chat.last_mood
         with st.chat_message("user"):
-            st.markdown(f"{message['content']} {emoji}")
-    elif message["role"] == "assistant":
+            st.markdown(f"{message.content} {emoji}")
+    elif message.role == "assistant":
         with st.chat_message("assistant"):
-            st.markdown(message["content"])
-    elif message["role"] == "suggestion":
+            st.markdown(message.content)
+    elif message.role == "suggestion":
         with st.container():
-             st.markdown(f'<div class="suggestion-box">{message["content"]}</div>', unsafe_allow_html=True)
+             st.markdown(f'<div class="suggestion-box">{message.content}</div>', unsafe_allow_html=True)
 
 
 # --- 7. Dynamic Input and Buttons ---
 
-prompt = st.chat_input(f"Chat as a {st.session_state.user_role}...")
+@metrics.timed()
+def render_pending_story():
+    """Streams a requested story into the assistant bubble; the engine saves it to the history."""
+    with st.chat_message("assistant"):
+        placeholder = st.empty()
+        story = ""
+        for chunk in ENGINE.stream_story(chat):
+            story += chunk
+            placeholder.markdown(f"📖 **Story Time:**\n\n{story}")
+
+
+prompt = st.chat_input(f"Chat as a {chat.user_role}...")
 
 if prompt:
     handle_user_input(prompt)
 
+if chat.pending_story:
+    render_pending_story()
+
 # Display dynamic buttons for quick interaction if a command is awaited
-if st.session_state.awaiting_command:
-    mood = st.session_state.awaiting_command
+if chat.awaiting_command:
+    actions = quick_actions(chat.awaiting_command)
     
     with st.container():
         st.write("---")
         st.markdown("##### 💜 Quick Actions:")
         
-        if mood in ["Angry", "Sad", "Depressed"]:
-            cols = st.columns(3)
-            cols[0].button("Story 📖", on_click=execute_suggestion, args=("story", "I need a story."), use_container_width=True)
-            cols[1].button("Exercise 🧘", on_click=execute_suggestion, args=("exercise", "I'll try an exercise."), use_container_width=True)
-            cols[2].button("Song/Video ▶️", on_click=execute_suggestion, args=("song", "I'd like a song or video."), use_container_width=True)
-
-        elif mood in ["Stressed", "Fear"]:
-            cols = st.columns(3)
-            cols[0].button("Calming Video 📽️", on_click=execute_suggestion, args=("video", "I need a calming video."), use_container_width=True)
-            cols[1].button("Exercise 🧘", on_click=execute_suggestion, args=("exercise", "I'll try an exercise."), use_container_width=True)
-            cols[2].button("Quick Tip 🧠", on_click=execute_suggestion, args=("yes", "Give me a quick tip."), use_container_width=True)
-
-        elif mood in ["Happy", "Neutral", "Cheerful"]:
-            cols = st.columns(3)
-            cols[0].button("Song 🎶", on_click=execute_suggestion, args=("song", "Yes, recommend a song."), use_container_width=True)
-            cols[1].button("Movie 🎬", on_click=execute_suggestion, args=("movie", "Yes, recommend a movie."), use_container_width=True)
-            cols[2].button("Story 📝", on_click=execute_suggestion, args=("story", "Yes, tell me a story."), use_container_width=True)
\ No newline at end of file
+        if actions:
+            cols = st.columns(len(actions))
+            for col, (label, command, display_text) in zip(cols, actions):
+                col.button(label, on_click=execute_suggestion, args=(command, display_text), use_container_width=True)
\ No newline at end of file